@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+
+
+#---------------------------------------------------------------------------------------------------
+
+import logging
+logger = logging.getLogger(__name__)
+
+import time
+
+#---------------------------------------------------------------------------------------------------
+
+# Outlook constants we use, valid for every backend.
+
+olFolderCalendar    = 9
+
+olAppointmentItem   = 1
+olMeetingDeclined   = 4
+
+olRecursDaily       = 0
+olRecursWeekly      = 1
+olRecursMonthly     = 2
+olRecursMonthNth    = 3
+olRecursYearly      = 5
+olRecursYearNth     = 6
+
+olFree              = 0
+olBusy              = 2
+
+olNonMeeting        = 0
+olMeeting           = 1
+olMeetingReceived   = 3
+olMeetingCanceled   = 5
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_backend:
+
+    '''
+    The interface between the engine and a calendar store. All calendar I/O goes via here,
+    so the engine can run against Outlook (cb_backend_outlook) as well as against an
+    in-memory stand-in (cb_backend_memory).
+
+    Appointments handed out by a backend look like Outlook AppointmentItems : at least
+    Start, End, Duration and Subject are there.
+    '''
+
+    def open(self):
+
+        '''
+        Called on the thread that is going to use the backend, before using it.
+        '''
+
+        pass
+
+    #-----------------------------------------------------------------------------------------------
+
+    def close(self):
+
+        '''
+        Called on the thread that used the backend, when done with it.
+        '''
+
+        pass
+
+    #-----------------------------------------------------------------------------------------------
+
+    def stats(self):
+
+        '''
+        A one-line summary of the backend's counters, for the log.
+        '''
+
+        return ""
+
+    #-----------------------------------------------------------------------------------------------
+
+    def query_range(self, dt_begin, dt_end, subject=None, not_subject=None):
+
+        '''
+        All appointments (recurrences expanded) with Start >= dt_begin and End < dt_end,
+        sorted on Start. Only those with Subject subject, or other than not_subject, if
+        given : the store filters, so the others do not even get enumerated.
+        '''
+
+        raise NotImplementedError
+
+    #-----------------------------------------------------------------------------------------------
+
+    def free_busy(self, dt_begin, nr_days, slot_minutes):
+
+        '''
+        The free/busy of nr_days days as of dt_begin (a midnight), one character per slot of
+        slot_minutes (see cb_free_busy). None if the store cannot tell.
+        '''
+
+        return None
+
+    #-----------------------------------------------------------------------------------------------
+
+    def create(self, dt_start, duration, subject):
+
+        '''
+        Creates and saves an appointment of duration minutes. Returns it.
+        '''
+
+        raise NotImplementedError
+
+    #-----------------------------------------------------------------------------------------------
+
+    def find(self, entry_id, dt_start):
+
+        '''
+        The appointment with entry_id, or for a series its occurrence at dt_start.
+        None if it is not there (anymore).
+        '''
+
+        raise NotImplementedError
+
+    #-----------------------------------------------------------------------------------------------
+
+    def delete(self, app):
+
+        raise NotImplementedError
+
+    #-----------------------------------------------------------------------------------------------
+
+    def respond(self, app, response):
+
+        '''
+        Responds (e.g. olMeetingDeclined) to a meeting we were invited to.
+        Returns the response item to be sent or None if there is nothing to respond to
+        (e.g. we are the organizer).
+        '''
+
+        raise NotImplementedError
+
+    #-----------------------------------------------------------------------------------------------
+
+    def send(self, item, message):
+
+        '''
+        Sends a response item as obtained from respond(), with message as body.
+        '''
+
+        raise NotImplementedError
+
+    #-----------------------------------------------------------------------------------------------
+
+    def cancel(self, app, message):
+
+        '''
+        Cancels a meeting we organize (or removes an appointment), notifying with message.
+        '''
+
+        raise NotImplementedError
+
+    #-----------------------------------------------------------------------------------------------
+
+    def mark_stale(self, days):
+
+        '''
+        For a backend keeping a copy of the store (cb_backend_mirror) : forgets what it holds
+        of days (dates), as these were written to past it.
+        '''
+
+        pass
+
+    #-----------------------------------------------------------------------------------------------
+
+    def subscribe(self, listener):
+
+        '''
+        From now on, calls listener.on_item_changed(entry_id, dt_start) when an item gets
+        added or changed and listener.on_item_removed() when an item gets removed.
+        Returns False if the backend cannot notify changes.
+        '''
+
+        return False
+
+    #-----------------------------------------------------------------------------------------------
+
+    def wait_for_events(self, seconds):
+
+        '''
+        Waits for seconds, meanwhile delivering events to subscribed listeners.
+        For when there is no (Qt) event loop doing that, i.e. when headless.
+        '''
+
+        time.sleep(seconds)
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_delegating_backend(cb_backend):
+
+    '''
+    Wraps a backend, passing every call on to it. For the wrappers adding something to some
+    of the calls (cb_metered_backend, cb_own_writes_backend, cb_backend_mirror) : they only
+    override those.
+    '''
+
+    def __init__(self, backend):
+
+        self.backend = backend
+
+    #-----------------------------------------------------------------------------------------------
+
+    def open(self):
+
+        self.backend.open()
+
+    #-----------------------------------------------------------------------------------------------
+
+    def close(self):
+
+        self.backend.close()
+
+    #-----------------------------------------------------------------------------------------------
+
+    def stats(self):
+
+        return self.backend.stats()
+
+    #-----------------------------------------------------------------------------------------------
+
+    def query_range(self, dt_begin, dt_end, subject=None, not_subject=None):
+
+        return self.backend.query_range(dt_begin, dt_end, subject, not_subject)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def free_busy(self, dt_begin, nr_days, slot_minutes):
+
+        return self.backend.free_busy(dt_begin, nr_days, slot_minutes)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def create(self, dt_start, duration, subject):
+
+        return self.backend.create(dt_start, duration, subject)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def find(self, entry_id, dt_start):
+
+        return self.backend.find(entry_id, dt_start)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def delete(self, app):
+
+        return self.backend.delete(app)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def respond(self, app, response):
+
+        return self.backend.respond(app, response)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def send(self, item, message):
+
+        return self.backend.send(item, message)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def cancel(self, app, message):
+
+        return self.backend.cancel(app, message)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def mark_stale(self, days):
+
+        return self.backend.mark_stale(days)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def subscribe(self, listener):
+
+        return self.backend.subscribe(listener)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def wait_for_events(self, seconds):
+
+        return self.backend.wait_for_events(seconds)
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,468 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+
+
+#---------------------------------------------------------------------------------------------------
+
+import logging
+logger = logging.getLogger(__name__)
+
+import bisect
+import datetime
+import itertools
+import threading
+import time
+
+from cb_backend   import cb_backend
+from cb_backend   import olBusy
+from cb_backend   import olMeetingCanceled
+from cb_backend   import olMeetingReceived
+from cb_backend   import olNonMeeting
+from cb_free_busy import render_free_busy
+from cb_table     import cb_memory_table
+from cb_table     import cb_row
+from cb_table     import project
+from cb_table     import read_rows
+from cb_trace     import traced
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_memory_appointment:
+
+    '''
+    Stand-in for an Outlook AppointmentItem. Only what the engine touches is foreseen.
+    '''
+
+    __slots__ = ("Start", "End", "Duration", "Subject", "Body", "BusyStatus", "MeetingStatus",
+                 "EntryID", "LastModificationTime")
+
+    def __init__(self, dt_start, duration, subject, meeting_status=olNonMeeting, entry_id=None):
+
+        self.Start         = dt_start
+        self.End           = dt_start + datetime.timedelta(minutes=duration)
+        self.Duration      = duration
+        self.Subject       = subject
+        self.Body          = ""
+        self.BusyStatus    = olBusy
+        self.MeetingStatus = meeting_status
+        self.EntryID       = entry_id
+
+        self.LastModificationTime = datetime.datetime.now()
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_memory_response:
+
+    '''
+    Stand-in for the MeetingItem Respond() gives back.
+    '''
+
+    __slots__ = ("app", "response", "Body")
+
+    def __init__(self, app, response):
+
+        self.app      = app
+        self.response = response
+        self.Body     = ""
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_backend_memory(cb_backend):
+
+    '''
+    An in-memory stand-in for the Outlook calendar, meant for running, profiling and
+    load-testing the engine without Outlook. The appointments are kept sorted on Start
+    (with the starts in a parallel list), so a range query is a bisect and holding
+    100k+ appointments is no problem.
+
+    It counts the queries and the writes it gets so one can verify how often the engine
+    goes to the store. One instance can be shared by several threads (as cb_clearing does
+    with its backends).
+
+    With projected, queries go through a stand-in Table (see cb_table) and hand out cb_rows,
+    as cb_backend_outlook does.
+
+    Recurring series (see load_series) are kept as their masters, cb_series with their
+    exceptions, and expanded when queried as cb_backend_outlook does. Their occurrences
+    are cb_rows either way.
+
+    Events are delivered as Outlook does : not from within the write causing them, but
+    later, in wait_for_events (as the message loop would).
+    '''
+
+    @traced
+    def __init__(self, projected=False):
+
+        self.projected    = projected
+
+        self.starts       = []
+        self.appointments = []
+        self.series       = {}
+        self.sent         = []
+        self.listeners    = []
+        self.events       = []
+        self.entry_ids    = itertools.count(1)
+        self.lock         = threading.RLock()
+
+        self.nr_queries   = 0
+        self.nr_creates   = 0
+        self.nr_deletes   = 0
+        self.nr_responds  = 0
+        self.nr_sends     = 0
+
+    #-----------------------------------------------------------------------------------------------
+
+    @property
+    def nr_writes(self):
+
+        return self.nr_creates + self.nr_deletes + self.nr_sends
+
+    #-----------------------------------------------------------------------------------------------
+
+    def stats(self):
+
+        return f"queries: {self.nr_queries}, creates: {self.nr_creates}, " \
+               f"deletes: {self.nr_deletes}, responds: {self.nr_responds}, sends: {self.nr_sends}"
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced(log_args=False)
+    def load(self, apps):
+
+        '''
+        Bulk load of cb_memory_appointments (e.g. a synthetic calendar). Not counted as writes.
+        '''
+
+        for app in apps:
+            if app.EntryID is None:
+                app.EntryID = f"{next(self.entry_ids):016X}"
+        self.appointments.extend(apps)
+        self.appointments.sort(key=lambda app: app.Start)
+        self.starts = [app.Start for app in self.appointments]
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced(log_args=False)
+    def load_series(self, series):
+
+        '''
+        Bulk load of recurring masters (cb_series, exceptions included). Not counted as
+        writes.
+        '''
+
+        with self.lock:
+            for one_series in series:
+                self.series[one_series.entry_id] = one_series
+
+    #-----------------------------------------------------------------------------------------------
+
+    def occurrences(self, dt_begin, dt_end, subject=None, not_subject=None):
+
+        '''
+        The occurrences of the series with Start >= dt_begin and End < dt_end. Filtered on
+        the subject of the master, as Outlook's restriction on the masters does.
+        '''
+
+        with self.lock:
+            return [occurrence for one_series in self.series.values()
+                    if (subject is None or one_series.subject == subject)
+                    and (not_subject is None or one_series.subject != not_subject)
+                    for occurrence in one_series.occurrences(dt_begin, dt_end)]
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def query_range(self, dt_begin, dt_end, subject=None, not_subject=None):
+
+        with self.lock:
+            self.nr_queries += 1
+            i_begin = bisect.bisect_left(self.starts, dt_begin)
+            i_end   = bisect.bisect_left(self.starts, dt_end, i_begin)
+            apps    = self.appointments[i_begin:i_end]
+
+        apps = [app for app in apps if app.End < dt_end
+                and (subject is None or app.Subject == subject)
+                and (not_subject is None or app.Subject != not_subject)]
+
+        if self.projected:
+            table = cb_memory_table(apps)
+            project(table)
+            apps = read_rows(table, cb_row)
+
+        occurrences = self.occurrences(dt_begin, dt_end, subject, not_subject)
+        if occurrences:
+            apps = sorted(apps + occurrences, key=lambda app: app.Start)
+
+        return apps
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def free_busy(self, dt_begin, nr_days, slot_minutes):
+
+        '''
+        Rendered from the appointments, as Outlook would (see render_free_busy). Appointments
+        starting over a month before dt_begin are not looked at.
+        '''
+
+        dt_end = dt_begin + datetime.timedelta(days=nr_days)
+
+        with self.lock:
+            self.nr_queries += 1
+            i_begin = bisect.bisect_left(self.starts, dt_begin - datetime.timedelta(days=31))
+            i_end   = bisect.bisect_left(self.starts, dt_end, i_begin)
+            apps    = [app for app in self.appointments[i_begin:i_end] if app.End > dt_begin]
+
+        apps += [occurrence for occurrence in self.occurrences(
+                dt_begin - datetime.timedelta(days=31), dt_end + datetime.timedelta(days=31))
+                if occurrence.Start < dt_end and occurrence.End > dt_begin]
+
+        return render_free_busy(apps, dt_begin, nr_days, slot_minutes)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def create(self, dt_start, duration, subject):
+
+        self.nr_creates += 1
+
+        app = cb_memory_appointment(dt_start, duration, subject,
+                entry_id=f"{next(self.entry_ids):016X}")
+        self.insert(app)
+        self.fire_changed(app)
+
+        return app
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def find(self, entry_id, dt_start):
+
+        with self.lock:
+            one_series = self.series.get(entry_id)
+            if one_series is not None:
+                return one_series.occurrence_at(dt_start)
+            i = bisect.bisect_left(self.starts, dt_start)
+            while i < len(self.appointments) and self.starts[i] == dt_start:
+                if self.appointments[i].EntryID == entry_id:
+                    return self.appointments[i]
+                i += 1
+
+        return None
+
+    #-----------------------------------------------------------------------------------------------
+
+    def real_item(self, app):
+
+        '''
+        The stored appointment of app, which could be a cb_row. None if gone.
+        '''
+
+        if isinstance(app, cb_row):
+            return self.find(app.EntryID, app.Start)
+        return app
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced(log_args=False)
+    def delete(self, app):
+
+        self.nr_deletes += 1
+        app = self.real_item(app)
+        if app is not None:
+            self.remove(app)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced(log_args=False)
+    def respond(self, app, response):
+
+        with self.lock:
+            self.nr_responds += 1
+
+        app = self.real_item(app)
+        if app is None or app.MeetingStatus != olMeetingReceived:
+            return None
+        return cb_memory_response(app, response)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced(log_args=False)
+    def send(self, item, message):
+
+        with self.lock:
+            self.nr_sends += 1
+            self.sent.append(item)
+
+        item.Body = message
+        # A declined meeting disappears from our calendar.
+        self.remove(item.app)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced(log_args=False)
+    def cancel(self, app, message):
+
+        with self.lock:
+            self.nr_sends += 1
+            self.sent.append(app)
+
+        app = self.real_item(app)
+        if app is None:
+            return
+        app.MeetingStatus = olMeetingCanceled
+        app.Body = message
+        self.remove(app)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def subscribe(self, listener):
+
+        self.listeners.append(listener)
+
+        return True
+
+    #-----------------------------------------------------------------------------------------------
+
+    def wait_for_events(self, seconds):
+
+        with self.lock:
+            events, self.events = self.events, []
+
+        for entry_id, dt_start in events:
+            for listener in self.listeners:
+                if entry_id is None:
+                    listener.on_item_removed()
+                else:
+                    listener.on_item_changed(entry_id, dt_start)
+
+        time.sleep(seconds)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def fire_changed(self, app):
+
+        with self.lock:
+            if self.listeners:
+                self.events.append((app.EntryID, app.Start))
+
+    #-----------------------------------------------------------------------------------------------
+
+    def fire_removed(self):
+
+        with self.lock:
+            if self.listeners:
+                self.events.append((None, None))
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced(log_args=False)
+    def add(self, app):
+
+        '''
+        Adds app as a user (or another program) would, firing the event Outlook would.
+        Not counted as a write.
+        '''
+
+        if app.EntryID is None:
+            app.EntryID = f"{next(self.entry_ids):016X}"
+        self.insert(app)
+        self.fire_changed(app)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced(log_args=False)
+    def modify(self, app, dt_start=None, duration=None, subject=None):
+
+        '''
+        Changes app as a user (or another program) would, firing the event Outlook would.
+        Not counted as a write.
+        '''
+
+        self.take_out(app)
+        if dt_start is not None:
+            app.Start = dt_start
+        if duration is not None:
+            app.Duration = duration
+        if subject is not None:
+            app.Subject = subject
+        app.End = app.Start + datetime.timedelta(minutes=app.Duration)
+        app.LastModificationTime = datetime.datetime.now()
+        self.insert(app)
+        self.fire_changed(app)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def insert(self, app):
+
+        with self.lock:
+            i = bisect.bisect_right(self.starts, app.Start)
+            self.starts.insert(i, app.Start)
+            self.appointments.insert(i, app)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def take_out(self, app):
+
+        '''
+        Takes app out of the store, if still in there. Returns whether it was. An occurrence
+        of a series goes as a deleted exception, its master being modified by that.
+        '''
+
+        with self.lock:
+            one_series = self.series.get(app.EntryID)
+            if one_series is not None:
+                if not one_series.delete_occurrence(app.Start):
+                    return False
+                one_series.last_modified = datetime.datetime.now()
+                return True
+            i = bisect.bisect_left(self.starts, app.Start)
+            while i < len(self.appointments) and self.starts[i] == app.Start:
+                if self.appointments[i] is app:
+                    del self.starts[i]
+                    del self.appointments[i]
+                    return True
+                i += 1
+
+        return False
+
+    #-----------------------------------------------------------------------------------------------
+
+    def remove(self, app):
+
+        '''
+        Takes app out of the store, firing the event Outlook would.
+        '''
+
+        if self.take_out(app):
+            self.fire_removed()
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,514 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+
+
+#---------------------------------------------------------------------------------------------------
+
+import logging
+logger = logging.getLogger(__name__)
+
+import datetime
+import pythoncom
+import pywintypes
+import time
+import win32com.client
+
+from cb_backend    import cb_backend
+from cb_backend    import olAppointmentItem
+from cb_backend    import olFolderCalendar
+from cb_backend    import olMeetingCanceled
+from cb_metrics    import phase
+from cb_query      import compile_restriction
+from cb_recurrence import cb_series
+from cb_table      import cb_row
+from cb_table      import project
+from cb_table      import read_rows
+from cb_trace      import traced
+from cb_util       import myself
+
+#---------------------------------------------------------------------------------------------------
+
+def naive(dt):
+
+    '''
+    A datetime from COM as a plain naive one, in local time as Outlook shows it.
+    '''
+
+    return datetime.datetime(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+
+#---------------------------------------------------------------------------------------------------
+
+def read_series(master):
+
+    '''
+    The cb_series of a recurring master : its pattern and its exceptions.
+    '''
+
+    pattern = master.GetRecurrencePattern()
+
+    exceptions = {}
+    for exception in pattern.Exceptions:
+        original = naive(exception.OriginalDate).date()
+        if exception.Deleted:
+            exceptions[original] = None
+        else:
+            app = exception.AppointmentItem
+            exceptions[original] = (naive(app.Start), naive(app.End), app.Subject)
+
+    return cb_series(master.EntryID, naive(master.LastModificationTime), master.Subject,
+            master.MeetingStatus, master.BusyStatus, pattern.RecurrenceType,
+            pattern.Interval, pattern.DayOfWeekMask, pattern.DayOfMonth, pattern.Instance,
+            pattern.MonthOfYear, naive(pattern.PatternStartDate).date(),
+            None if pattern.NoEndDate else naive(pattern.PatternEndDate).date(),
+            naive(pattern.StartTime).time(), pattern.Duration, exceptions)
+
+#---------------------------------------------------------------------------------------------------
+
+# HRESULTs telling the connection to Outlook went stale (Outlook restarted e.g.).
+
+stale_hresults = {
+    -2147023174,    # RPC_S_SERVER_UNAVAILABLE
+    -2147417848,    # RPC_E_DISCONNECTED
+    -2147417849,    # RPC_E_SERVER_DIED
+    -2147418094,    # RPC_E_SERVER_DIED_DNE
+    -2147221503,    # CO_E_OBJNOTCONNECTED
+    }
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_outlook_session:
+
+    '''
+    A long-lived connection to Outlook : the Application, the MAPI namespace and the
+    calendar folder. All is made once and reused across runs.
+    It is only rebuilt when a com_error shows the connection went stale.
+
+    The calendar folder is our default one, or the one shared by mailbox (a name or
+    address Outlook can resolve) if given. Connecting (first or again) is timed as the
+    connection phase into metrics, if given (a cb_metrics) : it happens lazily, in the
+    first run talking to Outlook.
+    '''
+
+    @traced
+    def __init__(self, mailbox=None, metrics=None):
+
+        self.mailbox         = mailbox
+        self.metrics         = metrics
+        self.application     = None
+        self.namespace       = None
+        self.recipient       = None
+        self.folder          = None
+
+        self.nr_hits       = 0
+        self.nr_misses     = 0
+        self.nr_reconnects = 0
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def connect(self):
+
+        self.application     = win32com.client.Dispatch('Outlook.Application')
+        self.namespace       = self.application.GetNamespace('MAPI')
+        if self.mailbox:
+            self.recipient = self.namespace.CreateRecipient(self.mailbox)
+            if not self.recipient.Resolve():
+                raise ValueError(f"cannot resolve mailbox '{self.mailbox}'")
+            self.folder = self.namespace.GetSharedDefaultFolder(self.recipient, olFolderCalendar)
+        else:
+            self.recipient = self.namespace.CurrentUser
+            self.folder = self.namespace.GetDefaultFolder(olFolderCalendar)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def get(self):
+
+        if self.application is None:
+            self.nr_misses += 1
+            with phase(self.metrics, "connection"):
+                self.connect()
+        else:
+            self.nr_hits += 1
+
+        return self
+
+    #-----------------------------------------------------------------------------------------------
+
+    def run(self, action, recheck=None):
+
+        '''
+        Returns action(session). If the connection turns out to be stale, it is rebuilt and
+        action is run once more : a retry, for a read. A write (given with recheck) may have
+        gone through before the connection broke : recheck(session) looks for it first, and
+        what it finds (if not None) is returned instead. Other com_errors are not ours to
+        handle.
+        '''
+
+        try:
+            return action(self.get())
+        except pywintypes.com_error as e:
+            if e.hresult not in stale_hresults:
+                raise
+            logger.warning(f"{myself()}: stale connection to Outlook ({e.hresult}), reconnecting")
+            self.nr_reconnects += 1
+            self.application = None
+
+        session = self.get()
+        if recheck is not None:
+            done = recheck(session)
+            if done is not None:
+                logger.warning(f"{myself()}: found done before the connection broke")
+                return done
+
+        return action(session)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def stats(self):
+
+        return f"session hits: {self.nr_hits}, misses: {self.nr_misses}, " \
+               f"reconnects: {self.nr_reconnects}"
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_outlook_items_events:
+
+    '''
+    Event sink for the Items of the calendar folder (see DispatchWithEvents).
+    cb_listener is set right after construction.
+    '''
+
+    cb_listener = None
+
+    def OnItemAdd(self, item):
+
+        self.cb_listener.on_item_changed(item.EntryID, item.Start)
+
+    def OnItemChange(self, item):
+
+        self.cb_listener.on_item_changed(item.EntryID, item.Start)
+
+    def OnItemRemove(self):
+
+        self.cb_listener.on_item_removed()
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_backend_outlook(cb_backend):
+
+    '''
+    The calendar as it lives in Outlook, talked to over COM via a long-lived session.
+    Our own default calendar, or the one shared by mailbox if given. metrics is for the
+    session, see cb_outlook_session.
+    '''
+
+    @traced
+    def __init__(self, mailbox=None, metrics=None):
+
+        self.session    = cb_outlook_session(mailbox, metrics)
+        self.nr_queries = 0
+        self.sinks      = []
+
+        # The recurring series by EntryID, see query_range.
+        self.series        = {}
+        self.nr_expansions = 0
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def open(self):
+
+        '''
+        COM needs an apartment on each thread using it. The session is made lazily on it.
+        '''
+
+        pythoncom.CoInitialize()
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def close(self):
+
+        self.sinks = []
+        self.session.application = None
+        self.session.namespace   = None
+        self.session.recipient   = None
+        self.session.folder      = None
+        pythoncom.CoUninitialize()
+
+    #-----------------------------------------------------------------------------------------------
+
+    def stats(self):
+
+        return f"queries: {self.nr_queries}, series expanded: {self.nr_expansions}, " \
+               f"{self.session.stats()}"
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def query_range(self, dt_begin, dt_end, subject=None, not_subject=None):
+
+        '''
+        All appointments (recurrences expanded) in [dt_begin, dt_end[, sorted on start.
+        Outlook only gets queried for the single appointments in the range and for the
+        recurring masters, both via a Table with only the columns we need (see cb_table),
+        read in bulk. The series are expanded here, and only read again (pattern and
+        exceptions) when their master was modified since. What is handed out are cb_rows,
+        not Outlook items : no COM reference outlives the query.
+        '''
+
+        def row(entry_id, dt_start, dt_end, subject, busy_status, meeting_status,
+                last_modified):
+            return cb_row(entry_id, naive(dt_start), naive(dt_end), subject, busy_status,
+                    meeting_status, naive(last_modified))
+
+        def action(session):
+
+            restriction = compile_restriction(dt_begin, dt_end, subject, not_subject, False)
+            table = session.folder.GetTable(restriction)
+            project(table)
+            singles = read_rows(table, row)
+
+            restriction = compile_restriction(None, None, subject, not_subject, True)
+            table = session.folder.GetTable(restriction)
+            project(table, ("EntryID", "LastModificationTime"))
+            masters = read_rows(table)
+            # Let go of the Table before going back to Outlook for the masters.
+            del table
+
+            series = [self.series_of(session, entry_id, naive(last_modified))
+                    for entry_id, last_modified in masters]
+
+            return singles, series
+
+        self.nr_queries += 1
+
+        singles, series = self.session.run(action)
+        apps = [(app.Start, app) for app in singles]
+        for one_series in series:
+            apps.extend((occurrence.Start, occurrence)
+                    for occurrence in one_series.occurrences(dt_begin, dt_end))
+        apps.sort(key=lambda start_app: start_app[0])
+
+        return [app for _, app in apps]
+
+    #-----------------------------------------------------------------------------------------------
+
+    def series_of(self, session, entry_id, last_modified):
+
+        '''
+        The cb_series with entry_id, as cached unless its master was modified since.
+        Only then the master itself is fetched from Outlook.
+        '''
+
+        series = self.series.get(entry_id)
+        if series is None or series.last_modified != last_modified:
+            self.nr_expansions += 1
+            master = session.namespace.GetItemFromID(entry_id, session.folder.StoreID)
+            series = read_series(master)
+            self.series[entry_id] = series
+
+        return series
+
+    #-----------------------------------------------------------------------------------------------
+
+    def real_item(self, app):
+
+        '''
+        The Outlook item of app, which could be a cb_row. None if gone.
+        '''
+
+        if isinstance(app, cb_row):
+            return self.find(app.EntryID, app.Start)
+        return app
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def free_busy(self, dt_begin, nr_days, slot_minutes):
+
+        '''
+        Via Recipient.FreeBusy, asked again as of where the previous answer stopped until
+        the window is covered. Outlook only knows the free/busy it publishes (see
+        published_days) : what lies beyond reads as free.
+        '''
+
+        slots_per_day = 24*60 // slot_minutes
+
+        def action(session):
+
+            text = ""
+            while len(text) < nr_days * slots_per_day:
+                dt_from = dt_begin + datetime.timedelta(days=len(text) // slots_per_day)
+                more = session.recipient.FreeBusy(dt_from, slot_minutes, True)
+                # Whole days only, so the next one starts at a midnight again.
+                more = more[:len(more) // slots_per_day * slots_per_day]
+                if not more:
+                    return None
+                text += more
+
+            return text[:nr_days * slots_per_day]
+
+        self.nr_queries += 1
+
+        return self.session.run(action)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def create(self, dt_start, duration, subject):
+
+        '''
+        Returns the cb_row of the saved item : its times as Outlook gives them back are not
+        naive.
+        '''
+
+        def row_of(app):
+            return cb_row(app.EntryID, naive(app.Start), naive(app.End), app.Subject,
+                    app.BusyStatus, app.MeetingStatus, naive(app.LastModificationTime))
+
+        def action(session):
+
+            # Via the folder, so it lands in a shared calendar if that is what we work on.
+            app = session.folder.Items.Add(olAppointmentItem)
+            app.Start = dt_start
+            app.Duration = duration
+            app.Subject = subject
+            app.Save()
+
+            return row_of(app)
+
+        def recheck(session):
+
+            # Saved before the connection broke : the item is there already.
+            dt_end = dt_start + datetime.timedelta(minutes=duration + 1)
+            restriction = compile_restriction(dt_start, dt_end, subject, None, False)
+            for app in session.folder.Items.Restrict(restriction):
+                if naive(app.Start) == dt_start and app.Duration == duration:
+                    return row_of(app)
+
+            return None
+
+        return self.session.run(action, recheck)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def subscribe(self, listener):
+
+        '''
+        Events are delivered via the message loop of the thread calling this.
+        The sink (and the Items it listens to) must be kept alive, hence self.sinks.
+        '''
+
+        def action(session):
+
+            sink = win32com.client.DispatchWithEvents(session.folder.Items,
+                    cb_outlook_items_events)
+            sink.cb_listener = listener
+            return sink
+
+        self.sinks.append(self.session.run(action))
+
+        return True
+
+    #-----------------------------------------------------------------------------------------------
+
+    def wait_for_events(self, seconds):
+
+        deadline = time.monotonic() + seconds
+        while True:
+            pythoncom.PumpWaitingMessages()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 0.1))
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def find(self, entry_id, dt_start):
+
+        def action(session):
+
+            try:
+                item = session.namespace.GetItemFromID(entry_id, session.folder.StoreID)
+                if item.IsRecurring:
+                    item = item.GetRecurrencePattern().GetOccurrence(dt_start)
+            except pywintypes.com_error as e:
+                if e.hresult in stale_hresults:
+                    raise
+                return None
+
+            return item
+
+        return self.session.run(action)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced(log_args=False)
+    def delete(self, app):
+
+        app = self.real_item(app)
+        if app is not None:
+            app.Delete()
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced(log_args=False)
+    def respond(self, app, response):
+
+        app = self.real_item(app)
+        if app is None:
+            return None
+        return app.Respond(response, True, True)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced(log_args=False)
+    def send(self, item, message):
+
+        item.Body = message
+        item.Send()
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced(log_args=False)
+    def cancel(self, app, message):
+
+        app = self.real_item(app)
+        if app is None:
+            return
+        app.MeetingStatus = olMeetingCanceled
+        app.Body = message
+        app.Save()
+        app.Send()
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+# Benchmarks the blocking and the clearing against synthetic calendars (see cb_synthetic) in
+# cb_backend_memory, and compares with a stored baseline.
+#
+#   cb_benchmark.py [--scenario NAME]... [--repeat N] [--tolerance PERCENT]
+#                   [--baseline FILE] [--save-baseline] [--projected]
+#
+# Exits with 1 if something regressed : a throughput that dropped more than the tolerance,
+# or a number of writes that changed. Throughput depends on the machine, so a baseline is
+# best saved on the machine it is compared on.
+
+import sys
+assert sys.version_info >= (3,6)
+
+import logging
+logger = logging.getLogger(__name__)
+
+import argparse
+import datetime
+import json
+import os
+import tempfile
+import time
+
+from cb_backend_memory  import cb_backend_memory
+from cb_clearing        import cb_clearing
+from cb_engine          import cb_engine
+from cb_fingerprints    import cb_fingerprints
+from cb_occupancy       import cb_occupancy
+from cb_synthetic       import synthetic_calendar
+
+#---------------------------------------------------------------------------------------------------
+
+default_baseline_filename = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        "cb_benchmark_baseline.json")
+
+dt_begin = datetime.datetime(2030, 1, 7)  # a Monday
+
+focus_string = "cb_outlook: focus"
+
+# The defaults : 30 minute slots, 8:30 - 17:30, 6 free slots (see working_slots).
+config = (30, 17, 35, 12, focus_string)
+
+scenarios = {
+    "quiet"     : dict(nr_days=365,  density=0.3),
+    "busy"      : dict(nr_days=365,  density=0.8),
+    "recurring" : dict(nr_days=365,  density=0.7, recurring=0.8),
+    "messy"     : dict(nr_days=365,  density=0.7, all_day=0.2, overlap=0.4, multi_day=0.1),
+    "decade"    : dict(nr_days=3650, density=0.6),
+    }
+
+# The days cleared, as for a holiday.
+nr_clearing_days = 14
+
+#---------------------------------------------------------------------------------------------------
+
+def best_of(repeat, run):
+
+    '''
+    Runs run() (returning (seconds, writes)) repeat times, gives the fastest.
+    '''
+
+    return min((run() for _ in range(repeat)), key=lambda result: result[0])
+
+#---------------------------------------------------------------------------------------------------
+
+def bench_scenario(name, repeat, projected=False):
+
+    '''
+    The metrics of one scenario : {metric : {"per_second" : ..., "writes" : ...}}.
+    '''
+
+    parameters = dict(scenarios[name])
+    nr_days = parameters.pop("nr_days")
+
+    def make_backend():
+        backend = cb_backend_memory(projected)
+        backend.load(synthetic_calendar(dt_begin, nr_days, **parameters))
+        return backend
+
+    metrics = {}
+
+    # The occupancy calculation on its own.
+    apps = make_backend().query_range(dt_begin, dt_begin + datetime.timedelta(days=nr_days))
+
+    def run_occupancy():
+        t_begin = time.perf_counter()
+        occupancy = cb_occupancy(dt_begin, nr_days)
+        occupancy.paint_all(apps, focus_string)
+        occupancy.overbooked_days(*config[1:4], config[0])
+        return time.perf_counter() - t_begin, 0
+
+    seconds, writes = best_of(repeat, run_occupancy)
+    metrics["occupancy"] = {"per_second": nr_days / seconds, "writes": writes}
+
+    # Blocking, from scratch and then again without anything changed.
+    with tempfile.TemporaryDirectory() as directory:
+
+        cold = []
+        warm = []
+
+        def run_block():
+            backend = make_backend()
+            fingerprints_filename = os.path.join(directory, f"{name}.json")
+            if os.path.exists(fingerprints_filename):
+                os.remove(fingerprints_filename)
+            engine = cb_engine(backend, lambda text: None,
+                    cb_fingerprints(fingerprints_filename))
+            engine.configure(*config)
+            for results in (cold, warm):
+                nr_writes = backend.nr_writes
+                t_begin = time.perf_counter()
+                engine.block(dt_begin, nr_days)
+                results.append((time.perf_counter() - t_begin, backend.nr_writes - nr_writes))
+            return cold[-1]
+
+        best_of(repeat, run_block)
+
+    seconds, writes = min(cold)
+    metrics["block cold"] = {"per_second": nr_days / seconds, "writes": writes}
+    seconds, writes = min(warm)
+    metrics["block warm"] = {"per_second": nr_days / seconds, "writes": writes}
+
+    # Clearing, without rate limit : measures our side only.
+    def run_clearing():
+        backend = make_backend()
+        clearing = cb_clearing(lambda: backend, lambda text: None, per_second=0,
+                retry_seconds=0)
+        t_begin = time.perf_counter()
+        clearing.run(backend, dt_begin,
+                dt_begin + datetime.timedelta(days=nr_clearing_days), "benchmark")
+        return time.perf_counter() - t_begin, backend.nr_writes
+
+    seconds, writes = best_of(repeat, run_clearing)
+    metrics["clearing"] = {"per_second": nr_clearing_days / seconds, "writes": writes}
+
+    return metrics
+
+#---------------------------------------------------------------------------------------------------
+
+def compare(results, baseline, tolerance):
+
+    '''
+    The regressions of results against baseline, as text lines.
+    '''
+
+    regressions = []
+    for name, metrics in results.items():
+        for metric, result in metrics.items():
+            base = baseline.get(name, {}).get(metric)
+            if base is None:
+                continue
+            if result["per_second"] < base["per_second"] * (1.0 - tolerance / 100.0):
+                regressions.append(f"{name} / {metric}: {result['per_second']:.0f} days/s, "
+                        f"was {base['per_second']:.0f}")
+            if result["writes"] != base["writes"]:
+                regressions.append(f"{name} / {metric}: {result['writes']} writes, "
+                        f"was {base['writes']}")
+
+    return regressions
+
+#---------------------------------------------------------------------------------------------------
+
+def cb_parse_args(argv):
+
+    parser = argparse.ArgumentParser(prog="cb_benchmark",
+            description="Benchmarks blocking and clearing against synthetic calendars.")
+    parser.add_argument("--scenario", action="append", choices=sorted(scenarios),
+            help="the scenario(s) to run (default : all)")
+    parser.add_argument("--repeat", type=int, default=5,
+            help="runs per measurement, the fastest counts (default : 5)")
+    parser.add_argument("--tolerance", type=float, default=30.0,
+            help="percent of throughput that may be lost before it is a regression "
+                 "(default : 30)")
+    parser.add_argument("--baseline", default=default_baseline_filename,
+            help="the baseline file (default : cb_benchmark_baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true",
+            help="store the results as the baseline")
+    parser.add_argument("--projected", action="store_true",
+            help="query through the stand-in Table, as done with Outlook (see cb_table)")
+
+    return parser.parse_args(argv)
+
+#---------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__' :
+
+    args = cb_parse_args(sys.argv[1:])
+
+    logging.basicConfig(level=logging.WARNING)
+
+    results = {}
+    for name in args.scenario or scenarios:
+        results[name] = bench_scenario(name, args.repeat, args.projected)
+        for metric, result in results[name].items():
+            print(f"{name:10} {metric:12} {result['per_second']:10.0f} days/s "
+                  f"{result['writes']:8} writes")
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print(f"saved as baseline in {args.baseline}")
+        sys.exit(0)
+
+    try:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"no baseline in {args.baseline}, save one with --save-baseline")
+        sys.exit(0)
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print("no regressions")
+
+    sys.exit(1 if regressions else 0)
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
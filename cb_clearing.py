@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+import logging
+logger = logging.getLogger(__name__)
+
+import concurrent.futures
+import datetime
+import threading
+import time
+import traceback
+
+from cb_backend import olMeetingCanceled
+from cb_backend import olMeetingDeclined
+from cb_trace   import traced
+from cb_util    import myself
+
+#---------------------------------------------------------------------------------------------------
+
+# Meetings starting in a window are fetched up to this many days beyond it : the store only
+# hands out what ends before the end of a query, so one running past the end of its window
+# (overnight e.g.) would not be cleared.
+spill_days = 7
+
+# What a write returns when it turned out to have gone through after all (see cb_clearing.write).
+already_cleared = object()
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_rate_limiter:
+
+    '''
+    Spaces calls to wait() at least 1/per_second apart, over all threads together.
+    per_second 0 means no limit.
+    '''
+
+    def __init__(self, per_second, clock=time.monotonic, sleep=time.sleep):
+
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self.clock    = clock
+        self.sleep    = sleep
+        self.next     = 0.0
+        self.lock     = threading.Lock()
+
+    #-----------------------------------------------------------------------------------------------
+
+    def wait(self):
+
+        with self.lock:
+            now = self.clock()
+            at  = max(now, self.next)
+            self.next = at + self.interval
+
+        if at > now:
+            self.sleep(at - now)
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_clearing:
+
+    '''
+    Declines (or cancels when we are the organizer) everything in a date range, as for a
+    holiday.
+
+    The range goes window by window (of window_days), so however long it is, only one
+    window of appointments is held at a time. The appointments of a window are queried once
+    and split in batches of batch_size. The batches are handled in parallel by max_workers
+    threads, each with a backend of its own (as made by make_backend(), opened and closed on
+    that thread), which looks its batch up again by EntryID and Start : Outlook items can not
+    be handed from one thread to another. Whatever goes to the server (a respond, a send, a
+    cancel) is rate limited to per_second over all threads together. Lookups are retried up
+    to max_attempts times; writes are tried again only if they did not go through (see
+    write).
+
+    Progress goes to progress(nr_days_done, nr_days), if given, per window, and a summary to
+    log at the end.
+    '''
+
+    @traced(log_args=False)
+    def __init__(self, make_backend, log, progress=None, batch_size=10, max_workers=3,
+            per_second=2.0, max_attempts=3, retry_seconds=2.0, window_days=7):
+
+        self.make_backend  = make_backend
+        self.log           = log
+        self.progress      = progress
+        self.batch_size    = max(1, batch_size)
+        self.max_workers   = max(1, max_workers)
+        self.max_attempts  = max(1, max_attempts)
+        self.retry_seconds = retry_seconds
+        self.window_days   = max(1, window_days)
+        self.limiter       = cb_rate_limiter(per_second)
+
+        self.lock          = threading.Lock()
+        self.nr_total      = 0
+        self.nr_done       = 0
+        self.nr_declined   = 0
+        self.nr_canceled   = 0
+        self.nr_gone       = 0
+        self.nr_retries    = 0
+        self.failed        = []
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def run(self, backend, dt_begin, dt_end, message):
+
+        '''
+        Clears [dt_begin, dt_end[, notifying with message. backend (already opened, on the
+        calling thread) is only used to find what is to be cleared; the clearing goes past
+        it, so the days of the range are marked stale on it afterwards (see
+        cb_backend.mark_stale). Returns the summary.
+        '''
+
+        t_begin = time.perf_counter()
+
+        nr_days = (dt_end - dt_begin).days
+        self.cb_progress(0, nr_days)
+
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers,
+                    thread_name_prefix="cb_clearing") as executor:
+                for dt_window, keys in self.windows(backend, dt_begin, dt_end):
+                    self.nr_total += len(keys)
+                    batches = (keys[i:i + self.batch_size]
+                            for i in range(0, len(keys), self.batch_size))
+                    for future in [executor.submit(self.run_batch, batch, message)
+                            for batch in batches]:
+                        future.result()
+                    self.cb_progress(min((dt_window - dt_begin).days + self.window_days,
+                            nr_days), nr_days)
+        finally:
+            backend.mark_stale([dt_begin.date() + datetime.timedelta(days=i)
+                    for i in range(nr_days)])
+
+        summary = f"declined {self.nr_declined}, canceled {self.nr_canceled}, " \
+                  f"already gone {self.nr_gone}, failed {len(self.failed)} " \
+                  f"(of {self.nr_total}, {self.nr_retries} retries) " \
+                  f"in {time.perf_counter() - t_begin:.1f}s"
+        self.log(summary)
+        for dt_start, subject in self.failed:
+            self.log(f"failed to clear {dt_start}: {subject}")
+
+        return summary
+
+    #-----------------------------------------------------------------------------------------------
+
+    def windows(self, backend, dt_begin, dt_end):
+
+        '''
+        Per window of [dt_begin, dt_end[ : its begin and the keys (EntryID, Start, End,
+        Subject) of what starts in it, lazily. What starts in a window is fetched up to
+        spill_days beyond it.
+        '''
+
+        dt_window = dt_begin
+        while dt_window < dt_end:
+            dt_next  = min(dt_window + datetime.timedelta(days=self.window_days), dt_end)
+            dt_spill = min(dt_next + datetime.timedelta(days=spill_days), dt_end)
+            yield dt_window, [(app.EntryID, app.Start, app.End, app.Subject)
+                    for app in backend.query_range(dt_window, dt_spill) if app.Start < dt_next]
+            dt_window = dt_next
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced(log_args=False)
+    def run_batch(self, keys, message):
+
+        '''
+        Clears one batch, on a thread of the pool. Never raises : what fails is counted.
+        '''
+
+        nr_handled = 0
+        backend = self.make_backend()
+        try:
+            backend.open()
+
+            dt_begin = min(key[1] for key in keys)
+            dt_end   = max(key[2] for key in keys) + datetime.timedelta(minutes=1)
+            apps = {(app.EntryID, app.Start): app for app in self.attempt(
+                    lambda: backend.query_range(dt_begin, dt_end))}
+
+            for entry_id, dt_start, _, subject in keys:
+                app = apps.get((entry_id, dt_start))
+                if app is None:
+                    outcome = "gone"
+                else:
+                    try:
+                        outcome = self.clear(backend, app, message)
+                    except Exception:
+                        logger.error(f"{myself()}: {dt_start}\n{traceback.format_exc()}")
+                        outcome = "failed"
+                nr_handled += 1
+                self.cb_done(outcome, (dt_start, subject))
+
+        except Exception:
+            # No session or no query : the rest of the batch fails.
+            logger.error(f"{myself()}\n{traceback.format_exc()}")
+            for _, dt_start, _, subject in keys[nr_handled:]:
+                self.cb_done("failed", (dt_start, subject))
+        finally:
+            backend.close()
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced(log_args=False)
+    def clear(self, backend, app, message):
+
+        '''
+        Declines app, or cancels it when we are the organizer. Returns which of both.
+        '''
+
+        new_app = self.write(backend, app, lambda: backend.respond(app, olMeetingDeclined))
+        if new_app is already_cleared:
+            return "gone"
+        if not new_app:
+            self.log(f"canceling {app.Start}: {app.Subject}")
+            self.write(backend, app, lambda: backend.cancel(app, message))
+            return "canceled"
+
+        self.log(f"declining {app.Start}: {app.Subject}")
+        self.write(backend, app, lambda: backend.send(new_app, message))
+        return "declined"
+
+    #-----------------------------------------------------------------------------------------------
+
+    def attempt(self, action):
+
+        '''
+        action() (a lookup), rate limited, retried (after retry_seconds, and more each time)
+        when it raises, up to max_attempts times.
+        '''
+
+        for i_attempt in range(1, self.max_attempts + 1):
+            self.limiter.wait()
+            try:
+                return action()
+            except Exception as e:
+                if i_attempt == self.max_attempts:
+                    raise
+                self.cb_retry(i_attempt, e)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def write(self, backend, app, action):
+
+        '''
+        action() (a respond, send or cancel of app), rate limited. A write that raises may
+        have gone through nonetheless, so it is not simply run again : only if app is still
+        there and not canceled (see is_cleared), up to max_attempts times. Returns what
+        action() returns, already_cleared if it turned out to have gone through.
+        '''
+
+        for i_attempt in range(1, self.max_attempts + 1):
+            self.limiter.wait()
+            try:
+                return action()
+            except Exception as e:
+                if i_attempt == self.max_attempts:
+                    raise
+                self.cb_retry(i_attempt, e)
+                if self.is_cleared(backend, app):
+                    return already_cleared
+
+    #-----------------------------------------------------------------------------------------------
+
+    def is_cleared(self, backend, app):
+
+        '''
+        Whether app is gone (a decline sent takes it out of the calendar) or canceled.
+        '''
+
+        real_app = self.attempt(lambda: backend.find(app.EntryID, app.Start))
+
+        return real_app is None or real_app.MeetingStatus == olMeetingCanceled
+
+    #-----------------------------------------------------------------------------------------------
+
+    def cb_retry(self, i_attempt, e):
+
+        logger.warning(f"{myself()}: attempt {i_attempt} failed : {e!r}")
+        with self.lock:
+            self.nr_retries += 1
+        time.sleep(self.retry_seconds * i_attempt)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def cb_done(self, outcome, what):
+
+        with self.lock:
+            self.nr_done += 1
+            if outcome == "declined":
+                self.nr_declined += 1
+            elif outcome == "canceled":
+                self.nr_canceled += 1
+            elif outcome == "gone":
+                self.nr_gone += 1
+            else:
+                self.failed.append(what)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def cb_progress(self, nr_days_done, nr_days):
+
+        if self.progress:
+            self.progress(nr_days_done, nr_days)
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,453 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+
+
+#---------------------------------------------------------------------------------------------------
+
+# What the GUI and the headless cb_outlook_cli have in common. Only QtCore in here, so the
+# headless one does not need to load the widgets.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import io
+import os
+import sys
+import time
+import traceback
+
+from PySide2.QtCore     import QCoreApplication
+from PySide2.QtCore     import QStandardPaths
+from PySide2.QtCore     import QTime
+
+from cb_util            import myself
+
+#---------------------------------------------------------------------------------------------------
+
+program_name    = "cb_outlook"
+program_version = "1.0.2"
+company_name    = "cb_soft"
+domain_name     = "camiel.bouchier.be"
+
+QCoreApplication.setApplicationName(program_name)
+QCoreApplication.setOrganizationName(company_name)
+QCoreApplication.setOrganizationDomain(domain_name)
+
+home_location = QStandardPaths.writableLocation(QStandardPaths.HomeLocation)
+data_location = f"{home_location}/{program_name}"
+
+try:
+    os.makedirs(data_location)
+except FileExistsError:
+    pass
+
+log_filename = f"{data_location}/{program_name}.log"
+usersettings_filename = f"{data_location}/{program_name}.ini"
+fingerprints_filename = f"{data_location}/fingerprints.json"
+focus_index_filename = f"{data_location}/focus_index.json"
+
+trace_filename = f"{data_location}/trace.json"
+mirror_filename = f"{data_location}/mirror.sqlite"
+
+metrics_filenames = (f"{data_location}/metrics.prom", f"{data_location}/metrics.json")
+
+def target_fingerprints_filename(target):
+    return f"{data_location}/fingerprints_{target.safe_name()}.json"
+
+def target_focus_index_filename(target):
+    return f"{data_location}/focus_index_{target.safe_name()}.json"
+
+#---------------------------------------------------------------------------------------------------
+
+# Defaults for the usersettings.
+
+default_slot_minutes   = 30
+default_start_of_day   = QTime(8, 30)
+default_end_of_day     = QTime(17, 30)
+default_free_slots     = 6
+default_lookahead_days = 7
+default_focus_string   = "cb_outlook: focus"
+
+# Clearing a date range (see cb_clearing).
+default_clearing_config = {
+    "batch_size"    : 10,
+    "max_workers"   : 3,
+    "per_second"    : 2.0,
+    "max_attempts"  : 3,
+    "retry_seconds" : 2.0,
+    "window_days"   : 7,
+    }
+
+#---------------------------------------------------------------------------------------------------
+
+def working_slots(slot_minutes, start_of_day, end_of_day, free_slots):
+
+    '''
+    The slots of the working hours (start_of_day and end_of_day in minutes since midnight)
+    for slots of slot_minutes : (start_slot, end_slot, max_nr_occupied_slots).
+    A slot started is a slot counted, at the begin as well as at the end of the day.
+    '''
+
+    start_slot = -(-start_of_day // slot_minutes)
+    end_slot   = -(-end_of_day // slot_minutes)
+
+    return start_slot, end_slot, end_slot - start_slot - free_slots
+
+#---------------------------------------------------------------------------------------------------
+
+def minutes_of_day(value):
+
+    '''
+    Minutes since midnight of a QTime, or of a "HH:MM" string (as is easier to type in the
+    ini by hand).
+    '''
+
+    if isinstance(value, str):
+        hours, minutes = value.split(":")
+        return int(hours) * 60 + int(minutes)
+    return value.hour() * 60 + value.minute()
+
+#---------------------------------------------------------------------------------------------------
+
+def read_raw_settings(usersettings, fallback=None):
+
+    '''
+    The blocking related usersettings (at the current group/array index of usersettings),
+    as a dict. What is not in there is taken from fallback (a dict as returned by this
+    function) or else from the defaults.
+    '''
+
+    if fallback is None:
+        fallback = {
+            "slot_minutes"   : default_slot_minutes,
+            "start_of_day"   : minutes_of_day(default_start_of_day),
+            "end_of_day"     : minutes_of_day(default_end_of_day),
+            "free_slots"     : default_free_slots,
+            "lookahead_days" : default_lookahead_days,
+            "focus_string"   : default_focus_string,
+            }
+
+    raw = dict(fallback)
+    for key in fallback:
+        if usersettings.contains(key):
+            raw[key] = usersettings.value(key)
+    for key in ("slot_minutes", "free_slots", "lookahead_days"):
+        raw[key] = int(raw[key])
+    for key in ("start_of_day", "end_of_day"):
+        if not isinstance(raw[key], int):
+            raw[key] = minutes_of_day(raw[key])
+
+    return raw
+
+#---------------------------------------------------------------------------------------------------
+
+def engine_config(raw):
+
+    '''
+    The engine configuration (as for cb_engine.configure) and the lookahead days, from a
+    dict as returned by read_raw_settings.
+    '''
+
+    start_slot, end_slot, max_nr_occupied_slots = working_slots(raw["slot_minutes"],
+            raw["start_of_day"], raw["end_of_day"], raw["free_slots"])
+
+    config = (raw["slot_minutes"], start_slot, end_slot, max_nr_occupied_slots,
+            raw["focus_string"])
+
+    return config, raw["lookahead_days"]
+
+#---------------------------------------------------------------------------------------------------
+
+def read_engine_config(usersettings):
+
+    '''
+    The engine configuration (as for cb_engine.configure) and the lookahead days, as in the
+    usersettings (a QSettings).
+    '''
+
+    return engine_config(read_raw_settings(usersettings))
+
+#---------------------------------------------------------------------------------------------------
+
+def write_metrics(metrics):
+
+    '''
+    Writes metrics (a cb_metrics) in the Prometheus text format as well as in json.
+    '''
+
+    for filename in metrics_filenames:
+        metrics.write(filename)
+
+#---------------------------------------------------------------------------------------------------
+
+def read_mirror_max_age(usersettings):
+
+    '''
+    The seconds after which a day in the local mirror (see cb_mirror) gets synced again,
+    None if the mirror is not to be used. In the ini : use_mirror=1, mirror_max_age_minutes.
+    '''
+
+    if not int(usersettings.value("use_mirror", 0)):
+        return None
+
+    return 60 * int(usersettings.value("mirror_max_age_minutes", 60))
+
+#---------------------------------------------------------------------------------------------------
+
+def read_use_free_busy(usersettings):
+
+    '''
+    Whether full runs screen the days on free/busy first (see cb_engine.screen_free_busy).
+    In the ini : use_free_busy=1.
+    '''
+
+    return bool(int(usersettings.value("use_free_busy", 0)))
+
+#---------------------------------------------------------------------------------------------------
+
+def read_ignore_free(usersettings):
+
+    '''
+    Whether appointments marked free do not occupy (see cb_occupancy). Screening on
+    free/busy (see read_use_free_busy) needs it, free/busy not showing them. In the ini :
+    ignore_free=1.
+    '''
+
+    return bool(int(usersettings.value("ignore_free", 0)))
+
+#---------------------------------------------------------------------------------------------------
+
+def read_clearing_config(usersettings):
+
+    '''
+    The keyword arguments for cb_clearing, as in the "clearing" group of the usersettings.
+    '''
+
+    config = {}
+    usersettings.beginGroup("clearing")
+    for key, default in default_clearing_config.items():
+        config[key] = type(default)(usersettings.value(key, default))
+    usersettings.endGroup()
+
+    return config
+
+#---------------------------------------------------------------------------------------------------
+
+def read_targets(usersettings):
+
+    '''
+    The extra calendars (e.g. shared ones managed by an assistant) to block, as cb_targets.
+    In the ini these are the "targets" array, e.g.
+
+        [targets]
+        size=1
+        1\\name=alice
+        1\\mailbox=alice@example.com
+        1\\start_of_day=09:00
+        1\\focus_string=focus (by assistant)
+
+    Each target can have its own slot_minutes, start_of_day, end_of_day, free_slots,
+    lookahead_days and focus_string. What it does not have is taken from our own settings.
+    The mailbox it must have : without, it would be our own calendar, so it is skipped.
+    '''
+
+    from cb_targets import cb_target
+
+    main_raw = read_raw_settings(usersettings)
+
+    targets = []
+    nr_targets = usersettings.beginReadArray("targets")
+    for i in range(nr_targets):
+        usersettings.setArrayIndex(i)
+        name    = usersettings.value("name", f"target_{i+1}")
+        mailbox = usersettings.value("mailbox", "")
+        if not mailbox:
+            logger.error(f"{myself()}: target {name} has no mailbox, skipped")
+            continue
+        config, lookahead_days = engine_config(read_raw_settings(usersettings, main_raw))
+        targets.append(cb_target(name, mailbox, config, lookahead_days))
+    usersettings.endArray()
+
+    return targets
+
+#---------------------------------------------------------------------------------------------------
+
+def make_backend(metrics, mailbox=None):
+
+    '''
+    The backend talking to Outlook, for our own calendar or the one shared by mailbox,
+    timed into metrics (a cb_metrics). Outlook is only loaded here, on the thread using it.
+    '''
+
+    from cb_backend_outlook import cb_backend_outlook
+    from cb_metrics         import cb_metered_backend
+
+    return cb_metered_backend(cb_backend_outlook(mailbox, metrics), metrics)
+
+#---------------------------------------------------------------------------------------------------
+
+def make_engine(log, metrics, entry_days, collectors=(), mirror_changes=None,
+        mirror_max_age=None, use_free_busy=False, ignore_free=False, progress=None):
+
+    '''
+    The engine for our own calendar, skipping days that did not change. Our own writes
+    come back as events : these are dropped for the collectors (cb_change_collectors over
+    entry_days). With mirror_max_age (see read_mirror_max_age) the reads go via the local
+    mirror, kept up to date by mirror_changes.
+    '''
+
+    from cb_engine          import cb_engine
+    from cb_events          import cb_own_writes_backend
+    from cb_fingerprints    import cb_fingerprints
+    from cb_focus_index     import cb_focus_index
+
+    fingerprints = cb_fingerprints(fingerprints_filename)
+    focus_index  = cb_focus_index(focus_index_filename)
+
+    backend = cb_own_writes_backend(make_backend(metrics), collectors)
+    if mirror_max_age is not None:
+        from cb_mirror import cb_backend_mirror
+        from cb_mirror import cb_mirror
+        backend = cb_backend_mirror(backend, cb_mirror(mirror_filename), mirror_changes,
+                mirror_max_age)
+
+    engine = cb_engine(backend, log, fingerprints, progress, metrics, focus_index)
+    engine.entry_days    = entry_days
+    engine.use_free_busy = use_free_busy
+    engine.ignore_free   = ignore_free
+
+    return engine
+
+#---------------------------------------------------------------------------------------------------
+
+def make_target_engine(target, log, metrics):
+
+    '''
+    The engine for one of the other calendars (a cb_target), with fingerprints and focus
+    index of its own.
+    '''
+
+    from cb_engine          import cb_engine
+    from cb_fingerprints    import cb_fingerprints
+    from cb_focus_index     import cb_focus_index
+
+    fingerprints = cb_fingerprints(target_fingerprints_filename(target))
+    focus_index  = cb_focus_index(target_focus_index_filename(target))
+
+    return cb_engine(make_backend(metrics, target.mailbox), log, fingerprints,
+            metrics=metrics, focus_index=focus_index)
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_startup_trace:
+
+    '''
+    The time spent per startup phase. mark(phase) ends phase, started at the previous mark
+    (or at t_start, a time.perf_counter()).
+    '''
+
+    def __init__(self, t_start, is_verbose=False):
+
+        self.t_start    = t_start
+        self.t_last     = t_start
+        self.phases     = []
+        self.is_verbose = is_verbose
+        self.is_ended   = False
+
+    def mark(self, phase):
+
+        t = time.perf_counter()
+        self.phases.append((phase, t - self.t_last))
+        self.t_last = t
+
+    def done(self):
+
+        self.is_ended = True
+
+    def is_done(self):
+
+        return self.is_ended
+
+    def report(self):
+
+        phases = ", ".join(f"{phase} {seconds*1000:.0f} ms" for phase, seconds in self.phases)
+        return f"{phases}, total {(self.t_last - self.t_start)*1000:.0f} ms"
+
+#---------------------------------------------------------------------------------------------------
+
+def cb_excepthook(exception_type, exception_value, traceback_object) :
+
+    """
+    Catch unhandled exceptions.
+    """
+
+    # Construct stack trace.
+    traceback_info_file = io.StringIO()
+    traceback.print_tb(traceback_object, None, traceback_info_file)
+    traceback_info_file.seek(0)
+    traceback_info = traceback_info_file.read()
+
+    # Construct error message.
+    error_message = f"{exception_type} :\n\n{exception_value}\n"
+    stack_trace   = f"Stack trace :\n{traceback_info}"
+
+    logger.critical(error_message)
+    logger.debug(stack_trace)    # Auto stack trace of exception only works in exception block.
+
+    sys.exit()
+
+#---------------------------------------------------------------------------------------------------
+
+def cb_install_logger(console_level=logging.DEBUG) :
+
+    """
+    Install logger
+    """
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.DEBUG)
+
+    file_handler = logging.FileHandler(log_filename, mode='a', encoding="utf8")
+    file_handler.setLevel(logging.DEBUG)
+    file_formatter = logging.Formatter(
+            "%(asctime)s - %(levelname)10s - %(filename)32s:%(lineno)5s : %(message)s")
+    file_handler.setFormatter(file_formatter)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(console_level)
+    console_formatter = logging.Formatter("%(filename)32s:%(lineno)5s : %(message)s")
+    console_handler.setFormatter(console_formatter)
+
+    root_logger.addHandler(file_handler)
+    root_logger.addHandler(console_handler)
+
+    logger.debug(f"logging in '{log_filename}'")
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
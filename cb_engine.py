@@ -0,0 +1,497 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+
+
+#---------------------------------------------------------------------------------------------------
+
+import logging
+logger = logging.getLogger(__name__)
+
+import datetime
+import time
+
+from cb_fingerprints import fingerprint
+from cb_free_busy    import cb_free_busy_occupancy
+from cb_free_busy    import published_days
+from cb_metrics      import phase
+from cb_occupancy    import cb_occupancy
+from cb_occupancy    import day_of
+from cb_trace        import traced
+from cb_util         import myself
+
+#---------------------------------------------------------------------------------------------------
+
+def bucket_per_day(apps, dt_begin, nr_days):
+
+    '''
+    Distributes the appointments of a window over its days, in one single pass.
+    Returns a list (one entry per day) of lists of the appointments of that day (see day_of).
+    '''
+
+    d_begin = dt_begin.date()
+    apps_per_day = [[] for i in range(nr_days)]
+
+    for app in apps:
+        i = day_of(app, d_begin)
+        if i is not None and 0 <= i < nr_days:
+            apps_per_day[i].append(app)
+
+    return apps_per_day
+
+#---------------------------------------------------------------------------------------------------
+
+# Days are fixed in windows of at most this many days, however long the horizon : what is held
+# (appointments, occupancy) is bounded by a window.
+default_window_days = 28
+#---------------------------------------------------------------------------------------------------
+
+def runs(indices):
+
+    '''
+    The runs of consecutive numbers in the sorted indices, as (first, length).
+    '''
+
+    rv = []
+    for i in indices:
+        if rv and rv[-1][0] + rv[-1][1] == i:
+            rv[-1] = (rv[-1][0], rv[-1][1] + 1)
+        else:
+            rv.append((i, 1))
+
+    return rv
+
+#---------------------------------------------------------------------------------------------------
+
+def windows(runs, window_days):
+
+    '''
+    The runs (as (first, length)) cut into windows of at most window_days, lazily.
+    '''
+
+    for i_first, nr in runs:
+        for i in range(i_first, i_first + nr, window_days):
+            yield i, min(window_days, i_first + nr - i)
+
+#---------------------------------------------------------------------------------------------------
+
+def diff_focus_blocks(desired, existing):
+
+    '''
+    Reconciles the desired focus blocks of a day, as (begin, duration) in minutes, with the
+    existing focus appointments of that day. Returns (to_create, to_delete) : the blocks
+    missing and the appointments not (or no longer, or doubly) wanted.
+    '''
+
+    wanted = set(desired)
+    to_delete = []
+    for app in existing:
+        key = (app.Start.hour*60 + app.Start.minute, app.Duration)
+        if key in wanted:
+            wanted.remove(key)
+        else:
+            to_delete.append(app)
+    to_create = [block for block in desired if block in wanted]
+
+    return to_create, to_delete
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_engine:
+
+    '''
+    The blocking logic, separated from the GUI. It talks to the calendar via a backend
+    (Outlook or an in-memory stand-in) and reports to the user via the log callable.
+    '''
+
+    @traced(log_args=False)
+    def __init__(self, backend, log, fingerprints=None, progress=None, metrics=None,
+            focus_index=None):
+
+        '''
+        With fingerprints (a cb_fingerprints), days that did not change since the previous
+        run are skipped. progress, if given, is called as progress(nr_done, nr_total).
+        metrics, if given (a cb_metrics), gets the enumeration and occupancy phases timed;
+        the store phases are for a cb_metered_backend. With focus_index (a cb_focus_index),
+        our focus blocks are known by EntryID rather than by their subject.
+        '''
+
+        self.backend      = backend
+        self.log          = log
+        self.fingerprints = fingerprints
+        self.progress     = progress
+        self.metrics      = metrics
+        self.focus_index  = focus_index
+
+        # Screen on free/busy first, see screen_free_busy.
+        self.use_free_busy = False
+
+        # Whether appointments marked free do not occupy (see cb_occupancy), as in free/busy.
+        self.ignore_free = False
+
+        # See fix_window.
+        self.window_days = default_window_days
+
+        # The days of the last block() that changed since the run before (with fingerprints,
+        # else all days handled), for cb_refresh_scheduler.
+        self.changed_days = set()
+
+        # The days each EntryID was last seen on, see cb_change_collector. The sets in it
+        # are replaced, never changed, so it can be read from another thread.
+        self.entry_days = {}
+
+        self.slot_minutes          = 30
+        self.start_slot            = 0
+        self.end_slot              = 48
+        self.max_nr_occupied_slots = 48
+        self.focus_string          = ""
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def configure(self, slot_minutes, start_slot, end_slot, max_nr_occupied_slots, focus_string):
+
+        '''
+        Slots are of slot_minutes, counted from midnight. Working hours are the slots
+        [start_slot, end_slot[.
+        '''
+
+        self.slot_minutes          = slot_minutes
+        self.start_slot            = start_slot
+        self.end_slot              = end_slot
+        self.max_nr_occupied_slots = max_nr_occupied_slots
+        self.focus_string          = focus_string
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def block_days(self, days):
+
+        '''
+        Fixes just the given days (dates), e.g. the ones touched by calendar events.
+        '''
+
+        if not days:
+            self.changed_days = set()
+            return
+        d_first = min(days)
+        nr_days = (max(days) - d_first).days + 1
+        self.block(datetime.datetime(d_first.year, d_first.month, d_first.day), nr_days, days)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def block(self, dt_begin, nr_days, only_days=None):
+
+        '''
+        Fixes nr_days days as of the day of dt_begin (only the dates in only_days if given).
+        With use_free_busy (and no only_days), the days are screened on free/busy first and
+        only the runs of days needing writes are fixed. Either way the days go window by
+        window (see fix_window), and progress is reported per window.
+        '''
+
+        dt_begin = datetime.datetime(dt_begin.year, dt_begin.month, dt_begin.day)
+        self.changed_days = set()
+
+        day_runs = [(0, nr_days)]
+        if self.use_free_busy and only_days is None:
+            i_days = self.screen_free_busy(dt_begin, nr_days)
+            if i_days is not None:
+                self.log(f"free/busy: {len(i_days)} out of {nr_days} days need fixing")
+                day_runs = runs(i_days)
+
+        if self.progress:
+            self.progress(0, nr_days)
+
+        nr_skipped = 0
+        for i_first, nr_window in windows(day_runs, self.window_days):
+            dt_window = dt_begin + datetime.timedelta(days=i_first)
+            if only_days is None or any(dt_window.date() + datetime.timedelta(days=i)
+                    in only_days for i in range(nr_window)):
+                nr_skipped += self.fix_window(dt_window, nr_window, only_days)
+            if self.progress:
+                self.progress(i_first + nr_window, nr_days)
+
+        if self.progress:
+            self.progress(nr_days, nr_days)
+
+        if self.focus_index is not None:
+            if only_days is None and self.focus_index.is_verify_due(time.time()):
+                self.verify_focus_index()
+            self.focus_index.save(datetime.date.today())
+
+        if self.fingerprints is not None:
+            self.fingerprints.save(datetime.date.today())
+            nr_handled = sum(nr for _, nr in day_runs) if only_days is None else len(only_days)
+            self.log(f"skipped {nr_skipped} unchanged days out of {nr_handled}")
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def screen_free_busy(self, dt_begin, nr_days):
+
+        '''
+        The (indices of the) days that may need writes, judged window by window on free/busy
+        and our focus blocks only : no other appointment gets enumerated. None if the
+        backend cannot tell free/busy.
+
+        Free/busy is an upper bound of the occupancy (see cb_free_busy_occupancy), so the
+        screen is conservative : it only leaves out the days that are surely not overbooked
+        and have none of our focus blocks to remove. Any other day, and any day beyond what
+        the store publishes free/busy for, is fixed by enumerating as without the screen.
+
+        Appointments marked free do not show in free/busy : unless they do not occupy
+        (ignore_free), free/busy is no upper bound and there is no screening (None).
+        '''
+
+        if not self.ignore_free:
+            logger.debug(f"{myself()}: appointments marked free occupy, not screening")
+            return None
+
+        i_days = []
+        for i_first, nr_window in windows([(0, nr_days)], self.window_days):
+            dt_window = dt_begin + datetime.timedelta(days=i_first)
+            screened = self.screen_window(dt_window, nr_window)
+            if screened is None:
+                return None
+            i_days.extend(i_first + i for i in screened)
+
+        return i_days
+
+    #-----------------------------------------------------------------------------------------------
+
+    def screen_window(self, dt_begin, nr_days):
+
+        '''
+        screen_free_busy for one window.
+        '''
+
+        text = self.backend.free_busy(dt_begin, nr_days, self.slot_minutes)
+        if text is None:
+            return None
+
+        # Our focus blocks by subject and, with a focus index, by EntryID too : a block
+        # found either way keeps its day in.
+        dt_end = dt_begin + datetime.timedelta(days=nr_days)
+        focus_blocks = self.backend.query_range(dt_begin, dt_end, subject=self.focus_string)
+        if self.focus_index is not None:
+            focus_blocks = focus_blocks + [block for i in range(nr_days)
+                    for block in self.focus_index.get(dt_begin.date() + datetime.timedelta(days=i))]
+        with phase(self.metrics, "enumeration"):
+            focus_blocks_per_day = bucket_per_day(focus_blocks, dt_begin, nr_days)
+
+        nr_published = (datetime.date.today() + datetime.timedelta(days=published_days)
+                - dt_begin.date()).days
+
+        with phase(self.metrics, "occupancy"):
+            occupancy = cb_free_busy_occupancy(dt_begin, nr_days, text, self.slot_minutes)
+            overbooked_days = occupancy.overbooked_days(self.start_slot, self.end_slot,
+                    self.max_nr_occupied_slots, self.slot_minutes)
+
+            i_days = [i for i in range(nr_days)
+                    if i >= nr_published or i in overbooked_days or focus_blocks_per_day[i]]
+
+        return i_days
+
+    #-----------------------------------------------------------------------------------------------
+
+    def fix_window(self, dt_begin, nr_days, only_days):
+
+        '''
+        Fixes nr_days days as of dt_begin (a midnight), the dates in only_days only if given.
+        The whole window is fetched at once (our focus blocks and the rest apart), painted
+        into one occupancy and the overbooked days are found in one batched step : fix_day
+        never goes back to the store for reading. Nothing beyond the window is fetched :
+        what runs past its end takes no day anyway (see day_of). Returns the number of days
+        skipped as unchanged.
+        '''
+
+        dt_end = dt_begin + datetime.timedelta(days=nr_days)
+
+        # Our focus blocks and the others apart : by the focus index if there is one, else
+        # the store filters on subject, so the unblocking never goes over anything but our
+        # own items.
+        if self.focus_index is None:
+            others       = self.backend.query_range(dt_begin, dt_end,
+                    not_subject=self.focus_string)
+            focus_blocks = self.backend.query_range(dt_begin, dt_end, subject=self.focus_string)
+        else:
+            others, focus_blocks = self.split_focus_blocks(
+                    self.backend.query_range(dt_begin, dt_end), dt_begin, nr_days)
+        with phase(self.metrics, "enumeration"):
+            others_per_day       = bucket_per_day(others, dt_begin, nr_days)
+            focus_blocks_per_day = bucket_per_day(focus_blocks, dt_begin, nr_days)
+
+        with phase(self.metrics, "occupancy"):
+            occupancy = cb_occupancy(dt_begin, nr_days, self.ignore_free)
+            occupancy.paint_others(others)
+            overbooked_days = occupancy.overbooked_days(self.start_slot, self.end_slot,
+                    self.max_nr_occupied_slots, self.slot_minutes)
+
+        settings = (self.slot_minutes, self.start_slot, self.end_slot,
+                self.max_nr_occupied_slots, self.focus_string, self.ignore_free)
+        nr_skipped = 0
+
+        for i in range(nr_days):
+            dt_day = dt_begin + datetime.timedelta(days=i)
+
+            if only_days is not None and dt_day.date() not in only_days:
+                continue
+
+            apps = others_per_day[i] + focus_blocks_per_day[i]
+            self.learn_entry_days(dt_day.date(), apps)
+
+            if self.fingerprints is not None:
+                with phase(self.metrics, "enumeration"):
+                    fp = fingerprint(apps, settings)
+                if fp == self.fingerprints.get(dt_day.date()):
+                    logger.debug(f"skipping {dt_day.year}-{dt_day.month}-{dt_day.day}")
+                    nr_skipped += 1
+                    continue
+
+            logger.debug(f"handling {dt_day.year}-{dt_day.month}-{dt_day.day}")
+            self.changed_days.add(dt_day.date())
+            apps = self.fix_day(dt_day, others_per_day[i], focus_blocks_per_day[i],
+                    i in overbooked_days, occupancy, i)
+
+            self.learn_entry_days(dt_day.date(), apps)
+
+            if self.fingerprints is not None:
+                with phase(self.metrics, "enumeration"):
+                    self.fingerprints.set(dt_day.date(), fingerprint(apps, settings))
+
+        return nr_skipped
+
+    #-----------------------------------------------------------------------------------------------
+
+    def split_focus_blocks(self, apps, dt_begin, nr_days):
+
+        '''
+        apps (of the window of nr_days as of dt_begin) as (others, focus_blocks), on the
+        focus index. Items with the focus string as subject are taken in too (as made
+        before there was an index). The index follows what was found : blocks moved get
+        their new start, blocks of the window not found anymore are dropped.
+        '''
+
+        others       = []
+        focus_blocks = []
+        for app in apps:
+            if app.EntryID in self.focus_index or app.Subject == self.focus_string:
+                focus_blocks.append(app)
+            else:
+                others.append(app)
+
+        seen = set()
+        for app in focus_blocks:
+            self.focus_index.add(app.EntryID, app.Start, app.Duration)
+            seen.add(app.EntryID)
+        for i in range(nr_days):
+            for block in self.focus_index.get(dt_begin.date() + datetime.timedelta(days=i)):
+                if block.EntryID not in seen:
+                    self.focus_index.remove(block.EntryID)
+
+        return others, focus_blocks
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def verify_focus_index(self):
+
+        '''
+        Drops the blocks of the focus index whose items are gone (deleted by the user e.g.),
+        looking each up by EntryID. Days that do get fixed are kept up to date anyway (see
+        split_focus_blocks), this is for the ones screened out or not in the lookahead.
+        '''
+
+        blocks = self.focus_index.all()
+        nr_gone = 0
+        for block in blocks:
+            if self.backend.find(block.EntryID, block.Start) is None:
+                self.focus_index.remove(block.EntryID)
+                nr_gone += 1
+        self.focus_index.verified = time.time()
+
+        self.log(f"focus index: {nr_gone} out of {len(blocks)} blocks gone")
+
+    #-----------------------------------------------------------------------------------------------
+
+    def learn_entry_days(self, day, apps):
+
+        for app in apps:
+            days = self.entry_days.get(app.EntryID, frozenset())
+            if day not in days:
+                self.entry_days[app.EntryID] = days | {day}
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced(log_args=False)
+    def fix_day(self, dt_day, others, focus_blocks, is_overbooked, occupancy, i_day):
+
+        '''
+        this is the crux of the code, it fixes the agenda of a particular day to
+        stuff it with reserved slots or to remove them (when meetings were cancelled e.g.)
+        focus_blocks are our appointments starting on that day, others the rest, and
+        occupancy[i_day] its occupation, as prepared by fix_window(). Returns the
+        appointments of that day after fixing.
+        '''
+
+        year, month, day = dt_day.year, dt_day.month, dt_day.day
+
+        # The focus blocks this day should have : the free slots when overbooked (contiguous
+        # ones in one block), none otherwise.
+        if is_overbooked:
+            self.log(f"{year}-{month}-{day} is overbooked.")
+            desired = occupancy.free_blocks(
+                    i_day, self.start_slot, self.end_slot, self.slot_minutes)
+        else:
+            self.log(f"{year}-{month}-{day} is not overbooked.")
+            desired = []
+
+        # Only write the difference with what is already there.
+        to_create, to_delete = diff_focus_blocks(desired, focus_blocks)
+
+        for app in to_delete:
+            self.log(f"unblocking {app.Start}")
+            self.backend.delete(app)
+            if self.focus_index is not None:
+                self.focus_index.remove(app.EntryID)
+
+        created = []
+        for begin, duration in to_create:
+            dt_start = dt_day + datetime.timedelta(minutes=begin)
+            self.log(f"blocking {dt_start} ({duration}') to focus")
+            app = self.backend.create(dt_start, duration, self.focus_string)
+            if self.focus_index is not None:
+                self.focus_index.add(app.EntryID, dt_start, duration)
+            created.append(app)
+
+        deleted = set(id(app) for app in to_delete)
+        return others + [app for app in focus_blocks if id(app) not in deleted] + created
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+
+
+#---------------------------------------------------------------------------------------------------
+
+import logging
+logger = logging.getLogger(__name__)
+
+import threading
+import time
+
+from cb_backend import cb_delegating_backend
+from cb_trace   import traced
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_change_collector:
+
+    '''
+    Listens to the calendar item events of a backend (see cb_backend.subscribe) and collects
+    the days they touch, so a burst of events gets coalesced into one re-evaluation of just
+    those days. Debouncing (when to take()) is up to the caller.
+
+    An added or changed item touches the day it is on now, and the days it was on before as
+    far as known from entry_days (EntryID -> set of dates, as maintained by the engine).
+    A removal does not tell which item went, so it touches everything.
+
+    The events of our own writes are no changes to collect : see expect_added and
+    expect_removed, as called by cb_own_writes_backend.
+
+    on_change, if given, is called after each event (e.g. to (re)start a debounce timer).
+    Events may come in on another thread than the one calling take().
+    '''
+
+    @traced(log_args=False)
+    def __init__(self, entry_days, on_change=None, own_seconds=60):
+
+        self.entry_days   = entry_days
+        self.on_change    = on_change
+        self.days         = set()
+        self.everything   = False
+        self.lock         = threading.Lock()
+
+        # Until when (time.monotonic()) events are taken for our own writes.
+        self.own_seconds  = own_seconds
+        self.own_added    = {}
+        self.own_removals = []
+
+    #-----------------------------------------------------------------------------------------------
+
+    def expect_added(self, entry_id):
+
+        '''
+        We just added entry_id : its events of the next own_seconds are dropped.
+        '''
+
+        with self.lock:
+            now = time.monotonic()
+            self.own_added = {key: until for key, until in self.own_added.items() if until > now}
+            self.own_added[entry_id] = now + self.own_seconds
+
+    #-----------------------------------------------------------------------------------------------
+
+    def expect_removed(self):
+
+        '''
+        We are about to remove an item : one removal of the next own_seconds is dropped.
+        A removal does not tell which item went, so that may be somebody else's instead.
+        '''
+
+        with self.lock:
+            self.own_removals.append(time.monotonic() + self.own_seconds)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def unexpect_removed(self):
+
+        '''
+        The removal announced by expect_removed did not happen after all.
+        '''
+
+        with self.lock:
+            if self.own_removals:
+                self.own_removals.pop()
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def on_item_changed(self, entry_id, dt_start):
+
+        with self.lock:
+            if self.own_added.get(entry_id, 0) > time.monotonic():
+                return
+            self.days |= self.entry_days.get(entry_id, set())
+            if dt_start is not None:
+                self.days.add(dt_start.date())
+        if self.on_change:
+            self.on_change()
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def on_item_removed(self):
+
+        with self.lock:
+            now = time.monotonic()
+            self.own_removals = [until for until in self.own_removals if until > now]
+            if self.own_removals:
+                self.own_removals.pop(0)
+                return
+            self.everything = True
+        if self.on_change:
+            self.on_change()
+
+    #-----------------------------------------------------------------------------------------------
+
+    def is_pending(self):
+
+        return self.everything or bool(self.days)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def take(self):
+
+        '''
+        Returns (everything, days) collected so far and starts collecting anew.
+        '''
+
+        with self.lock:
+            rv = (self.everything, self.days)
+            self.days       = set()
+            self.everything = False
+
+        return rv
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_own_writes_backend(cb_delegating_backend):
+
+    '''
+    Wraps a backend, telling collectors (cb_change_collector) about the items it creates
+    and deletes, so the events of these writes are not taken for changes : else each run
+    deleting a focus block would cause a full run of its own. Listeners subscribed via
+    here are told too.
+    '''
+
+    def __init__(self, backend, collectors=()):
+
+        super().__init__(backend)
+
+        self.collectors = list(collectors)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def create(self, dt_start, duration, subject):
+
+        app = self.backend.create(dt_start, duration, subject)
+        for collector in self.collectors:
+            collector.expect_added(app.EntryID)
+
+        return app
+
+    #-----------------------------------------------------------------------------------------------
+
+    def delete(self, app):
+
+        '''
+        Only an item still there gets removed, so only then a removal is announced : else
+        the next removal by somebody else would be dropped.
+        '''
+
+        real_app = self.backend.find(app.EntryID, app.Start)
+        if real_app is None:
+            return
+
+        for collector in self.collectors:
+            collector.expect_removed()
+        try:
+            self.backend.delete(real_app)
+        except Exception:
+            for collector in self.collectors:
+                collector.unexpect_removed()
+            raise
+
+    #-----------------------------------------------------------------------------------------------
+
+    def subscribe(self, listener):
+
+        if isinstance(listener, cb_change_collector) and listener not in self.collectors:
+            self.collectors.append(listener)
+
+        return self.backend.subscribe(listener)
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+
+
+#---------------------------------------------------------------------------------------------------
+
+import logging
+logger = logging.getLogger(__name__)
+
+import hashlib
+import json
+
+from cb_trace import traced
+from cb_util  import read_json
+from cb_util  import write_atomically
+
+#---------------------------------------------------------------------------------------------------
+
+def fingerprint(apps, settings):
+
+    '''
+    A fingerprint of a day : of the identity (EntryID, and Start for recurrences sharing an
+    EntryID) and the LastModificationTime of its appointments, and of the settings it was
+    evaluated with. If it did not change, evaluating that day again is pointless.
+    '''
+
+    lines = sorted(f"{app.EntryID}|{app.Start}|{app.LastModificationTime}" for app in apps)
+    lines.append(repr(settings))
+
+    return hashlib.sha1("\n".join(lines).encode("utf-8")).hexdigest()
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_fingerprints:
+
+    '''
+    Per day fingerprints (see fingerprint()), persisted as json in filename. Without it
+    (see read_json), all days get evaluated.
+    '''
+
+    @traced
+    def __init__(self, filename):
+
+        self.filename = filename
+        self.per_day  = read_json(filename) or {}
+
+    #-----------------------------------------------------------------------------------------------
+
+    def get(self, day):
+
+        return self.per_day.get(day.isoformat())
+
+    #-----------------------------------------------------------------------------------------------
+
+    def set(self, day, fp):
+
+        self.per_day[day.isoformat()] = fp
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def save(self, first_day):
+
+        '''
+        Saves, forgetting about days before first_day.
+        '''
+
+        first_key = first_day.isoformat()
+        self.per_day = {day: fp for day, fp in self.per_day.items() if day >= first_key}
+
+        write_atomically(self.filename, json.dumps(self.per_day, indent=1, sort_keys=True))
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
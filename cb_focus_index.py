@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+import logging
+logger = logging.getLogger(__name__)
+
+import datetime
+import json
+
+from cb_trace import traced
+from cb_util  import myself
+from cb_util  import read_json
+from cb_util  import write_atomically
+
+#---------------------------------------------------------------------------------------------------
+
+# The starts as stored.
+start_format = "%Y-%m-%dT%H:%M"
+
+# How often the index is checked against the calendar (see cb_engine.verify_focus_index).
+verify_seconds = 24*60*60
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_indexed_block:
+
+    '''
+    A focus block as recorded in the index. Looks like an appointment as far as telling
+    which slots it takes is concerned.
+    '''
+
+    __slots__ = ("EntryID", "Start", "Duration")
+
+    def __init__(self, entry_id, dt_start, duration):
+
+        self.EntryID  = entry_id
+        self.Start    = dt_start
+        self.Duration = duration
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_focus_index:
+
+    '''
+    The focus blocks this program created, by EntryID and per day, persisted as json in
+    filename. That is how our own items are told apart, and not by their subject : renaming
+    the focus string does not disown the blocks made under the old one. Without the file
+    (see read_json), or with one not laid out as expected, the index starts out empty.
+    '''
+
+    @traced
+    def __init__(self, filename):
+
+        self.filename = filename
+        self.per_day  = {}
+        self.day_of   = {}
+        self.verified = 0.0
+
+        stored = read_json(filename)
+        try:
+            if stored is not None:
+                self.per_day  = {day: {entry_id: (start, duration)
+                        for entry_id, start, duration in entries}
+                        for day, entries in stored["days"].items()}
+                self.verified = stored["verified"]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"{myself()}: ignoring {self.filename} : {e}")
+            self.per_day = {}
+
+        self.day_of = {entry_id: day
+                for day, entries in self.per_day.items() for entry_id in entries}
+
+    #-----------------------------------------------------------------------------------------------
+
+    def __len__(self):
+
+        return len(self.day_of)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def __contains__(self, entry_id):
+
+        return entry_id in self.day_of
+
+    #-----------------------------------------------------------------------------------------------
+
+    def get(self, day):
+
+        '''
+        The focus blocks of day, as cb_indexed_blocks.
+        '''
+
+        return self.blocks(self.per_day.get(day.isoformat(), {}))
+
+    #-----------------------------------------------------------------------------------------------
+
+    def all(self):
+
+        return [block for day in sorted(self.per_day) for block in self.blocks(self.per_day[day])]
+
+    #-----------------------------------------------------------------------------------------------
+
+    def blocks(self, entries):
+
+        return [cb_indexed_block(entry_id, datetime.datetime.strptime(start, start_format),
+                duration) for entry_id, (start, duration) in entries.items()]
+
+    #-----------------------------------------------------------------------------------------------
+
+    def add(self, entry_id, dt_start, duration):
+
+        '''
+        Records (or moves) the block entry_id, starting at dt_start for duration minutes.
+        '''
+
+        self.remove(entry_id)
+        day = dt_start.date().isoformat()
+        self.per_day.setdefault(day, {})[entry_id] = (dt_start.strftime(start_format), duration)
+        self.day_of[entry_id] = day
+
+    #-----------------------------------------------------------------------------------------------
+
+    def remove(self, entry_id):
+
+        day = self.day_of.pop(entry_id, None)
+        if day is None:
+            return
+        del self.per_day[day][entry_id]
+        if not self.per_day[day]:
+            del self.per_day[day]
+
+    #-----------------------------------------------------------------------------------------------
+
+    def is_verify_due(self, now):
+
+        return now - self.verified >= verify_seconds
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def save(self, first_day):
+
+        '''
+        Saves, forgetting about days before first_day.
+        '''
+
+        first_key = first_day.isoformat()
+        for day in [day for day in self.per_day if day < first_key]:
+            for entry_id in self.per_day.pop(day):
+                del self.day_of[entry_id]
+
+        stored = {
+            "verified" : self.verified,
+            "days"     : {day: [[entry_id, start, duration]
+                    for entry_id, (start, duration) in sorted(entries.items())]
+                    for day, entries in self.per_day.items()},
+            }
+
+        write_atomically(self.filename, json.dumps(stored, indent=1, sort_keys=True))
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
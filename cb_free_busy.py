@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+# Occupancy from free/busy, as an alternative to enumerating appointments. A store can tell the
+# free/busy of a whole window as one string, one character per slot ('0' free, '1' tentative,
+# '2' busy, '3' out of office, '4' working elsewhere), as Outlook's Recipient.FreeBusy does.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import datetime
+
+from cb_backend   import olFree
+from cb_occupancy import minutes_per_day
+from cb_trace     import traced
+
+#---------------------------------------------------------------------------------------------------
+
+# Anything but free is occupied.
+busy_table = str.maketrans("01234", "01111")
+
+# The days a store publishes free/busy for, counted from today (Outlook's default is 2
+# months) : beyond them free/busy reads as free whatever is there.
+published_days = 56
+
+#---------------------------------------------------------------------------------------------------
+
+def decode_free_busy(text, nr_days, slots_per_day):
+
+    '''
+    A free/busy string as one string per day of '0' (free) and '1' (occupied) per slot.
+    The decoding is a translate and slicing : no loop over the slots in Python.
+    '''
+
+    text = text.translate(busy_table)
+
+    return [text[i*slots_per_day:(i + 1)*slots_per_day] for i in range(nr_days)]
+
+#---------------------------------------------------------------------------------------------------
+
+def render_free_busy(apps, dt_begin, nr_days, slot_minutes):
+
+    '''
+    The free/busy string of nr_days days as of dt_begin (a midnight) for slots of
+    slot_minutes, as a store would render it from apps : a slot gets the highest BusyStatus
+    of the appointments touching it, appointments marked free do not show.
+    '''
+
+    nr_slots = nr_days * minutes_per_day // slot_minutes
+    slots = bytearray(b"0" * nr_slots)
+
+    for app in apps:
+        status = getattr(app, "BusyStatus", None)
+        if status == olFree:
+            continue
+        char = ord("2") if status is None else ord("0") + status
+        begin = int((app.Start - dt_begin).total_seconds()) // 60
+        end   = int((app.End - dt_begin).total_seconds()) // 60
+        first = max(begin // slot_minutes, 0)
+        last  = min((end - 1) // slot_minutes, nr_slots - 1)
+        for i in range(first, last + 1):
+            if slots[i] < char:
+                slots[i] = char
+
+    return slots.decode("ascii")
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_free_busy_occupancy:
+
+    '''
+    The occupation of a horizon of nr_days days, from a free/busy string for slots of
+    slot_minutes (see decode_free_busy), at the granularity of the slots.
+
+    It is an upper bound of what cb_occupancy finds, not the same : free/busy also shows
+    all-day, overnight and multi-day items, which take no day there, and our own focus
+    blocks. Hence it only tells which days are surely not overbooked.
+    '''
+
+    @traced(log_args=False)
+    def __init__(self, dt_begin, nr_days, text, slot_minutes):
+
+        self.dt_begin      = datetime.datetime(dt_begin.year, dt_begin.month, dt_begin.day)
+        self.nr_days       = nr_days
+        self.slot_minutes  = slot_minutes
+        self.slots_per_day = minutes_per_day // slot_minutes
+
+        self.occupied = decode_free_busy(text, nr_days, self.slots_per_day)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def nr_occupied_slots(self, i_day, start_slot, end_slot, slot_minutes):
+
+        return self.occupied[i_day].count("1", start_slot, end_slot)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def overbooked_days(self, start_slot, end_slot, max_nr_occupied_slots, slot_minutes):
+
+        return {i_day for i_day in range(self.nr_days)
+                if self.nr_occupied_slots(i_day, start_slot, end_slot, slot_minutes)
+                    > max_nr_occupied_slots}
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
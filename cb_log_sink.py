@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+
+
+#---------------------------------------------------------------------------------------------------
+
+import logging
+logger = logging.getLogger(__name__)
+
+import collections
+
+from PySide2.QtCore import QObject
+from PySide2.QtCore import QTimer
+from PySide2.QtGui  import QTextCursor
+
+from cb_trace import traced
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_log_sink(QObject):
+
+    '''
+    Feeds a (read-only) QPlainTextEdit with log lines. Lines are buffered and flushed in one
+    go after flush_ms, so a burst of lines costs one repaint. Only the last max_lines lines
+    are kept (in a ring buffer and in the widget), so memory and repaint cost stay flat
+    however long the program runs. A filter shows only the lines containing a text.
+    '''
+
+    @traced(log_args=False)
+    def __init__(self, textedit, max_lines=5000, flush_ms=100):
+
+        super().__init__(textedit)
+
+        self.textedit    = textedit
+        self.lines       = collections.deque(maxlen=max_lines)
+        self.pending     = []
+        self.filter_text = ""
+
+        self.textedit.setMaximumBlockCount(max_lines)
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(flush_ms)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.timeout.connect(self.flush)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def append(self, text):
+
+        self.pending.append(text)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    #-----------------------------------------------------------------------------------------------
+
+    def matches(self, text):
+
+        return self.filter_text in text.lower()
+
+    #-----------------------------------------------------------------------------------------------
+
+    def flush(self):
+
+        if not self.pending:
+            return
+
+        self.lines.extend(self.pending)
+        shown = [text for text in self.pending if self.matches(text)]
+        self.pending = []
+
+        if shown:
+            self.textedit.appendPlainText("\n".join(shown))
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def set_filter(self, filter_text):
+
+        '''
+        Shows only the lines containing filter_text (case insensitive), all if empty.
+        '''
+
+        self.flush()
+        self.filter_text = filter_text.lower()
+        self.textedit.setPlainText("\n".join(text for text in self.lines if self.matches(text)))
+        self.textedit.moveCursor(QTextCursor.End)
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
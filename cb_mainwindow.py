@@ -34,10 +34,15 @@ import os
 
 from PySide2.QtCore     import QDate
 from PySide2.QtCore     import Qt
-from PySide2.QtCore     import QTime
 from PySide2.QtWidgets  import QApplication
 from PySide2.QtWidgets  import QMainWindow
 
+from cb_common          import default_end_of_day
+from cb_common          import default_focus_string
+from cb_common          import default_free_slots
+from cb_common          import default_lookahead_days
+from cb_common          import default_slot_minutes
+from cb_common          import default_start_of_day
 from ui_cb_mainwindow   import Ui_cb_mainwindow
 
 #---------------------------------------------------------------------------------------------------
@@ -64,13 +69,15 @@ class cb_mainwindow(QMainWindow):
         # initializing gui elements from the usersettings case those are available
         # (and sensible default if not)
 
-        start_of_day = self.app.usersettings.value("start_of_day", QTime(8, 30))
-        end_of_day = self.app.usersettings.value("end_of_day", QTime(17, 30))
-        free_slots = int(self.app.usersettings.value("free_slots", 6))
-        lookahead_days = int(self.app.usersettings.value("lookahead_days", 7))
-        focus_string = self.app.usersettings.value("focus_string", "cb_outlook: focus")
+        slot_minutes = int(self.app.usersettings.value("slot_minutes", default_slot_minutes))
+        start_of_day = self.app.usersettings.value("start_of_day", default_start_of_day)
+        end_of_day = self.app.usersettings.value("end_of_day", default_end_of_day)
+        free_slots = int(self.app.usersettings.value("free_slots", default_free_slots))
+        lookahead_days = int(self.app.usersettings.value("lookahead_days", default_lookahead_days))
+        focus_string = self.app.usersettings.value("focus_string", default_focus_string)
         each_hour = int(self.app.usersettings.value("each_hour", Qt.Unchecked))
 
+        self.ui.combo_box_slot_minutes.setCurrentText(str(slot_minutes))
         self.ui.time_edit_start_of_day.setTime(start_of_day)
         self.ui.time_edit_end_of_day.setTime(end_of_day)
         self.ui.spinbox_free_slots.setValue(free_slots)
@@ -87,6 +94,7 @@ class cb_mainwindow(QMainWindow):
 
         # Call the associated cb_on function (just to make sure all got initialized,
         # even if *no* change)
+        self.app.cb_on_slot_minutes_changed(slot_minutes)
         self.app.cb_on_start_of_day_changed(start_of_day)
         self.app.cb_on_end_of_day_changed(end_of_day)
         self.app.cb_on_free_slots_changed(free_slots)
@@ -100,6 +108,8 @@ class cb_mainwindow(QMainWindow):
 
         # signal connections for future changes
 
+        self.ui.combo_box_slot_minutes.currentTextChanged.connect(
+                lambda text: self.app.cb_on_slot_minutes_changed(int(text)))
         self.ui.time_edit_start_of_day.timeChanged.connect(self.app.cb_on_start_of_day_changed)
         self.ui.time_edit_end_of_day.timeChanged.connect(self.app.cb_on_end_of_day_changed)
         self.ui.spinbox_free_slots.valueChanged.connect(self.app.cb_on_free_slots_changed)
@@ -114,6 +124,21 @@ class cb_mainwindow(QMainWindow):
                 lambda: self.app.cb_on_message_changed(self.ui.text_edit_message.toPlainText()))
         self.ui.pushbutton_empty_now.clicked.connect(self.app.cb_on_empty_now)
 
+        self.ui.line_edit_log_filter.textChanged.connect(self.app.cb_on_log_filter_changed)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def cb_set_busy(self, is_busy):
+
+        '''
+        No new runs while one is going on.
+        '''
+
+        self.ui.pushbutton_block_now.setEnabled(not is_busy)
+        self.ui.pushbutton_empty_now.setEnabled(not is_busy)
+        if not is_busy:
+            self.statusBar().clearMessage()
+
     #-----------------------------------------------------------------------------------------------
 
     def closeEvent(self,event):
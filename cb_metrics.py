@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+import logging
+logger = logging.getLogger(__name__)
+
+import collections
+import json
+import threading
+import time
+
+from cb_backend import cb_delegating_backend
+from cb_trace   import traced
+from cb_util    import myself
+from cb_util    import write_atomically
+
+#---------------------------------------------------------------------------------------------------
+
+# The phases timed :
+#
+#   connection  : connecting to the store (the Outlook session), in whatever run it happens
+#   query       : the range queries (for Outlook reading the Tables and expanding the series)
+#   enumeration : going over the appointments (bucketing them per day, fingerprinting),
+#                 which only touches the rows the query read
+#   occupancy   : painting the occupancy and finding the overbooked days
+#   creates, deletes, sends : the writes (responds count as sends)
+#
+# The phases are disjoint : a phase timed within another (the lazy connect within the first
+# query) is taken out of the time of the one around it.
+
+phases = ("connection", "query", "enumeration", "occupancy", "creates", "deletes", "sends")
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_phase_timer:
+
+    '''
+    Context manager timing one phase into a cb_metrics. The time of the phases nested in it
+    (on the same thread) is not counted.
+    '''
+
+    __slots__ = ("metrics", "name", "t_begin", "nested")
+
+    def __init__(self, metrics, name):
+
+        self.metrics = metrics
+        self.name    = name
+        self.nested  = 0.0
+
+    def __enter__(self):
+
+        self.metrics.open_timers().append(self)
+        self.t_begin = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+
+        seconds = time.perf_counter() - self.t_begin
+        timers  = self.metrics.open_timers()
+        timers.pop()
+        if timers:
+            timers[-1].nested += seconds
+        self.metrics.add(self.name, seconds - self.nested)
+        return False
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_no_timer:
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+no_timer = cb_no_timer()
+
+def phase(metrics, name):
+
+    '''
+    with phase(metrics, name): ... times into metrics, if not None.
+    '''
+
+    if metrics is None:
+        return no_timer
+    return metrics.phase(name)
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_metrics:
+
+    '''
+    Per phase timings (seconds and number of times) and the number of store round-trips,
+    of the current run as well as in total since start. Can be fed from several threads.
+
+    A run (e.g. an hourly block) is delimited by begin_run() and end_run(); the last
+    nr_runs are kept for a rolling summary.
+    '''
+
+    @traced
+    def __init__(self, nr_runs=10):
+
+        self.lock      = threading.Lock()
+        self.totals    = {name: [0.0, 0] for name in phases}
+        self.current   = {name: [0.0, 0] for name in phases}
+        self.nr_trips  = 0
+        self.runs      = collections.deque(maxlen=nr_runs)
+        self.nr_runs   = collections.Counter()
+        self.job       = None
+        self.t_begin   = None
+        self.local     = threading.local()
+        self.trips_at_begin = 0
+
+    #-----------------------------------------------------------------------------------------------
+
+    def phase(self, name):
+
+        return cb_phase_timer(self, name)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def open_timers(self):
+
+        '''
+        The phase timers running on this thread, innermost last.
+        '''
+
+        timers = getattr(self.local, "timers", None)
+        if timers is None:
+            timers = self.local.timers = []
+        return timers
+
+    #-----------------------------------------------------------------------------------------------
+
+    def add(self, name, seconds):
+
+        with self.lock:
+            for per_phase in (self.totals, self.current):
+                timing = per_phase.setdefault(name, [0.0, 0])
+                timing[0] += seconds
+                timing[1] += 1
+
+    #-----------------------------------------------------------------------------------------------
+
+    def round_trip(self):
+
+        with self.lock:
+            self.nr_trips += 1
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def begin_run(self, job):
+
+        with self.lock:
+            self.job            = job
+            self.t_begin        = time.perf_counter()
+            self.trips_at_begin = self.nr_trips
+            self.current        = {name: [0.0, 0] for name in phases}
+
+    #-----------------------------------------------------------------------------------------------
+
+    def end_run(self):
+
+        '''
+        Closes the current run, returns it as a dict.
+        '''
+
+        with self.lock:
+            run = {
+                "job"         : self.job,
+                "finished"    : time.time(),
+                "seconds"     : time.perf_counter() - self.t_begin if self.t_begin else 0.0,
+                "round_trips" : self.nr_trips - self.trips_at_begin,
+                "phases"      : {name: {"seconds": seconds, "count": count}
+                                 for name, (seconds, count) in self.current.items()},
+                }
+            self.runs.append(run)
+            self.nr_runs[self.job] += 1
+            self.t_begin = None
+
+        logger.debug(f"{myself()}: {run}")
+
+        return run
+
+    #-----------------------------------------------------------------------------------------------
+
+    def summary(self):
+
+        '''
+        One line : the last run, its slowest phases, and the average of the recent runs of
+        the same job.
+        '''
+
+        with self.lock:
+            if not self.runs:
+                return ""
+            last = self.runs[-1]
+            same = [run["seconds"] for run in self.runs if run["job"] == last["job"]]
+
+        slowest = sorted(last["phases"].items(), key=lambda item: -item[1]["seconds"])[:3]
+        str_phases = ", ".join(f"{name} {timing['seconds']:.2f}s"
+                for name, timing in slowest if timing["count"])
+
+        return f"last {last['job']}: {last['seconds']:.1f}s ({str_phases}), " \
+               f"{last['round_trips']} round-trips, " \
+               f"avg of {len(same)}: {sum(same) / len(same):.1f}s"
+
+    #-----------------------------------------------------------------------------------------------
+
+    def prometheus(self):
+
+        '''
+        The metrics in the Prometheus text format (e.g. for the textfile collector).
+        '''
+
+        with self.lock:
+            totals  = {name: list(timing) for name, timing in self.totals.items()}
+            last    = self.runs[-1] if self.runs else None
+            nr_runs = dict(self.nr_runs)
+            trips   = self.nr_trips
+
+        lines = [
+            "# HELP cb_outlook_phase_seconds_total Time spent per phase.",
+            "# TYPE cb_outlook_phase_seconds_total counter",
+            ]
+        lines += [f'cb_outlook_phase_seconds_total{{phase="{name}"}} {seconds:.6f}'
+                for name, (seconds, _) in totals.items()]
+        lines += [
+            "# HELP cb_outlook_phase_count_total Times each phase ran.",
+            "# TYPE cb_outlook_phase_count_total counter",
+            ]
+        lines += [f'cb_outlook_phase_count_total{{phase="{name}"}} {count}'
+                for name, (_, count) in totals.items()]
+        lines += [
+            "# HELP cb_outlook_round_trips_total Calls to the calendar store.",
+            "# TYPE cb_outlook_round_trips_total counter",
+            f"cb_outlook_round_trips_total {trips}",
+            "# HELP cb_outlook_runs_total Runs per job.",
+            "# TYPE cb_outlook_runs_total counter",
+            ]
+        lines += [f'cb_outlook_runs_total{{job="{job}"}} {nr}' for job, nr in nr_runs.items()]
+        if last is not None:
+            lines += [
+                "# HELP cb_outlook_last_run_seconds Duration of the last run.",
+                "# TYPE cb_outlook_last_run_seconds gauge",
+                f'cb_outlook_last_run_seconds{{job="{last["job"]}"}} {last["seconds"]:.6f}',
+                "# HELP cb_outlook_last_run_phase_seconds Time per phase in the last run.",
+                "# TYPE cb_outlook_last_run_phase_seconds gauge",
+                ]
+            lines += [f'cb_outlook_last_run_phase_seconds{{phase="{name}"}} '
+                      f'{timing["seconds"]:.6f}' for name, timing in last["phases"].items()]
+
+        return "\n".join(lines) + "\n"
+
+    #-----------------------------------------------------------------------------------------------
+
+    def as_dict(self):
+
+        with self.lock:
+            return {
+                "phases"      : {name: {"seconds": seconds, "count": count}
+                                 for name, (seconds, count) in self.totals.items()},
+                "round_trips" : self.nr_trips,
+                "runs_total"  : dict(self.nr_runs),
+                "runs"        : list(self.runs),
+                }
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def write(self, filename):
+
+        '''
+        Writes the metrics to filename : as json if it ends on .json, else in the Prometheus
+        text format. Atomically, so a collector never reads half a file.
+        '''
+
+        if filename.endswith(".json"):
+            text = json.dumps(self.as_dict(), indent=1)
+        else:
+            text = self.prometheus()
+
+        try:
+            write_atomically(filename, text)
+        except OSError as e:
+            logger.warning(f"{myself()}: can not write {filename} : {e}")
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_metered_backend(cb_delegating_backend):
+
+    '''
+    Wraps a backend, timing its calls into a cb_metrics (see phases) and counting each as
+    a store round-trip.
+    '''
+
+    def __init__(self, backend, metrics):
+
+        super().__init__(backend)
+
+        self.metrics = metrics
+
+    #-----------------------------------------------------------------------------------------------
+
+    def metered(self, name, action, *args):
+
+        self.metrics.round_trip()
+        with self.metrics.phase(name):
+            return action(*args)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def query_range(self, dt_begin, dt_end, subject=None, not_subject=None):
+
+        return self.metered("query", self.backend.query_range, dt_begin, dt_end,
+                subject, not_subject)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def free_busy(self, dt_begin, nr_days, slot_minutes):
+
+        return self.metered("query", self.backend.free_busy, dt_begin, nr_days, slot_minutes)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def create(self, dt_start, duration, subject):
+
+        return self.metered("creates", self.backend.create, dt_start, duration, subject)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def find(self, entry_id, dt_start):
+
+        return self.metered("query", self.backend.find, entry_id, dt_start)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def delete(self, app):
+
+        return self.metered("deletes", self.backend.delete, app)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def respond(self, app, response):
+
+        return self.metered("sends", self.backend.respond, app, response)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def send(self, item, message):
+
+        return self.metered("sends", self.backend.send, item, message)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def cancel(self, app, message):
+
+        return self.metered("sends", self.backend.cancel, app, message)
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+import logging
+logger = logging.getLogger(__name__)
+
+import datetime
+import sqlite3
+import time
+
+from cb_backend import cb_delegating_backend
+from cb_backend import olBusy
+from cb_table   import cb_row
+from cb_trace   import traced
+
+#---------------------------------------------------------------------------------------------------
+
+# Times are kept as (local, naive) seconds since epoch : integers index and compare fast.
+epoch = datetime.datetime(1970, 1, 1)
+
+def to_seconds(dt):
+
+    return (dt.toordinal() - 719163) * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second
+
+def from_seconds(seconds):
+
+    return epoch + datetime.timedelta(seconds=seconds)
+
+#---------------------------------------------------------------------------------------------------
+
+def from_row(row):
+
+    '''
+    The cb_row for a row of the mirror.
+    '''
+
+    entry_id, start, end, subject, busy_status, meeting_status, recurrence_id, last_modified = row
+
+    return cb_row(entry_id, from_seconds(start), from_seconds(end), subject, busy_status,
+            meeting_status, from_seconds(last_modified), recurrence_id is not None)
+
+#---------------------------------------------------------------------------------------------------
+
+schema = """
+    CREATE TABLE IF NOT EXISTS appointments (
+        entry_id        TEXT    NOT NULL,
+        start_time      INTEGER NOT NULL,
+        end_time        INTEGER NOT NULL,
+        subject         TEXT,
+        busy_status     INTEGER,
+        meeting_status  INTEGER,
+        recurrence_id   TEXT,
+        last_modified   INTEGER,
+        PRIMARY KEY (entry_id, start_time)
+    );
+    CREATE INDEX IF NOT EXISTS appointments_start ON appointments (start_time);
+    CREATE INDEX IF NOT EXISTS appointments_end   ON appointments (end_time);
+    CREATE TABLE IF NOT EXISTS synced_days (
+        day             INTEGER PRIMARY KEY,
+        synced_at       REAL    NOT NULL
+    );
+"""
+
+columns = "entry_id, start_time, end_time, subject, busy_status, meeting_status, " \
+          "recurrence_id, last_modified"
+
+def as_row(app):
+
+    '''
+    The row for an appointment (an Outlook one, or any other looking like it).
+    '''
+
+    start = to_seconds(app.Start)
+    recurrence_id = str(app.Start) if getattr(app, "IsRecurring", False) else None
+
+    return (app.EntryID, start, to_seconds(app.End), app.Subject,
+            getattr(app, "BusyStatus", olBusy), app.MeetingStatus, recurrence_id,
+            to_seconds(app.LastModificationTime))
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_mirror:
+
+    '''
+    A local copy of (part of) the calendar in SQLite, with the days it holds and when
+    these were last synced. Only to be used from one thread at a time.
+    '''
+
+    @traced
+    def __init__(self, filename):
+
+        self.filename   = filename
+        self.connection = None
+
+    #-----------------------------------------------------------------------------------------------
+
+    def open(self):
+
+        self.connection = sqlite3.connect(self.filename, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(schema)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def close(self):
+
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    #-----------------------------------------------------------------------------------------------
+
+    def nr_rows(self):
+
+        return self.connection.execute("SELECT COUNT(*) FROM appointments").fetchone()[0]
+
+    #-----------------------------------------------------------------------------------------------
+
+    def stale_days(self, d_begin, d_end, max_age_seconds, now):
+
+        '''
+        The dates in [d_begin, d_end[ never synced, or longer than max_age_seconds ago.
+        '''
+
+        synced = dict(self.connection.execute(
+                "SELECT day, synced_at FROM synced_days WHERE day >= ? AND day < ?",
+                (d_begin.toordinal(), d_end.toordinal())))
+
+        return [datetime.date.fromordinal(day)
+                for day in range(d_begin.toordinal(), d_end.toordinal())
+                if now - synced.get(day, -max_age_seconds - 1) > max_age_seconds]
+
+    #-----------------------------------------------------------------------------------------------
+
+    def mark_stale(self, days=None):
+
+        '''
+        Forgets that days (all if None) were synced.
+        '''
+
+        with self.connection:
+            if days is None:
+                self.connection.execute("DELETE FROM synced_days")
+            else:
+                self.connection.executemany("DELETE FROM synced_days WHERE day = ?",
+                        [(day.toordinal(),) for day in days])
+
+    #-----------------------------------------------------------------------------------------------
+
+    def replace(self, dt_begin, dt_end, apps, now):
+
+        '''
+        Replaces what starts in [dt_begin, dt_end[ (whole days) by apps, now synced.
+        '''
+
+        with self.connection:
+            self.connection.execute(
+                    "DELETE FROM appointments WHERE start_time >= ? AND start_time < ?",
+                    (to_seconds(dt_begin), to_seconds(dt_end)))
+            self.connection.executemany(
+                    f"INSERT OR REPLACE INTO appointments ({columns}) "
+                    f"VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [as_row(app) for app in apps])
+            self.connection.executemany(
+                    "INSERT OR REPLACE INTO synced_days (day, synced_at) VALUES (?, ?)",
+                    [(day, now) for day in
+                        range(dt_begin.toordinal(), dt_end.toordinal())])
+
+    #-----------------------------------------------------------------------------------------------
+
+    def put(self, app):
+
+        '''
+        Adds (or updates) app. Returns it as in the mirror.
+        '''
+
+        row = as_row(app)
+        with self.connection:
+            self.connection.execute(
+                    f"INSERT OR REPLACE INTO appointments ({columns}) "
+                    f"VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+
+        return from_row(row)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def remove(self, app):
+
+        with self.connection:
+            self.connection.execute(
+                    "DELETE FROM appointments WHERE entry_id = ? AND start_time = ?",
+                    (app.EntryID, to_seconds(app.Start)))
+
+    #-----------------------------------------------------------------------------------------------
+
+    def query_range(self, dt_begin, dt_end, subject=None, not_subject=None):
+
+        '''
+        As cb_backend.query_range, an indexed range scan on start_time.
+        '''
+
+        where = "start_time >= ? AND start_time < ? AND end_time < ?"
+        parameters = [to_seconds(dt_begin), to_seconds(dt_end), to_seconds(dt_end)]
+        if subject is not None:
+            where += " AND subject = ?"
+            parameters.append(subject)
+        if not_subject is not None:
+            where += " AND subject <> ?"
+            parameters.append(not_subject)
+
+        rows = self.connection.execute(
+                f"SELECT {columns} FROM appointments WHERE {where} ORDER BY start_time",
+                parameters)
+
+        return [from_row(row) for row in rows]
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_backend_mirror(cb_delegating_backend):
+
+    '''
+    A backend answering the range queries from a cb_mirror, going to backend (the real
+    store) only for the days that are stale : never synced, synced longer than
+    max_age_seconds ago, or touched by a change as collected by changes (a
+    cb_change_collector subscribed to the store's events, if any). Writes go to backend
+    and to the mirror alike. Their events reach changes too : for them not to make the
+    days stale again, backend is to be a cb_own_writes_backend telling changes about them.
+
+    The stale days of a query are refreshed with one single query, from the first stale
+    day up to margin_days past its end so events lasting several days are in there too.
+    '''
+
+    @traced(log_args=False)
+    def __init__(self, backend, mirror, changes=None, max_age_seconds=3600, margin_days=7):
+
+        super().__init__(backend)
+
+        self.mirror          = mirror
+        self.changes         = changes
+        self.max_age_seconds = max_age_seconds
+        self.margin_days     = margin_days
+        self.is_listening    = False
+
+        self.nr_queries      = 0
+        self.nr_refreshes    = 0
+
+    #-----------------------------------------------------------------------------------------------
+
+    def open(self):
+
+        self.backend.open()
+        self.mirror.open()
+
+    #-----------------------------------------------------------------------------------------------
+
+    def close(self):
+
+        self.mirror.close()
+        self.backend.close()
+
+    #-----------------------------------------------------------------------------------------------
+
+    def stats(self):
+
+        return f"mirror queries: {self.nr_queries}, refreshes: {self.nr_refreshes}, " \
+               f"{self.backend.stats()}"
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def query_range(self, dt_begin, dt_end, subject=None, not_subject=None):
+
+        self.nr_queries += 1
+
+        if self.changes is not None:
+            everything, days = self.changes.take()
+            if everything:
+                self.mirror.mark_stale()
+            elif days:
+                self.mirror.mark_stale(days)
+
+        # Whole days : up to and including the day dt_end is in (unless at midnight).
+        dt_last = datetime.datetime(dt_end.year, dt_end.month, dt_end.day)
+        if dt_last < dt_end:
+            dt_last += datetime.timedelta(days=1)
+
+        now = time.time()
+        stale_days = self.mirror.stale_days(dt_begin.date(), dt_last.date(),
+                self.max_age_seconds, now)
+
+        if stale_days:
+            self.nr_refreshes += 1
+            d_first  = stale_days[0]
+            dt_first = datetime.datetime(d_first.year, d_first.month, d_first.day)
+            apps = self.backend.query_range(dt_first,
+                    dt_last + datetime.timedelta(days=self.margin_days))
+            self.mirror.replace(dt_first, dt_last,
+                    [app for app in apps if app.Start < dt_last], now)
+
+        return self.mirror.query_range(dt_begin, dt_end, subject, not_subject)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def free_busy(self, dt_begin, nr_days, slot_minutes):
+
+        '''
+        Not mirrored : one call to the store gives it for the whole window anyway.
+        '''
+
+        return self.backend.free_busy(dt_begin, nr_days, slot_minutes)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def create(self, dt_start, duration, subject):
+
+        return self.mirror.put(self.backend.create(dt_start, duration, subject))
+
+    #-----------------------------------------------------------------------------------------------
+
+    def delete(self, app):
+
+        real_app = self.backend.find(app.EntryID, app.Start)
+        if real_app is not None:
+            self.backend.delete(real_app)
+        self.mirror.remove(app)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def respond(self, app, response):
+
+        real_app = self.backend.find(app.EntryID, app.Start)
+        if real_app is None:
+            return None
+        self.mirror.mark_stale([app.Start.date()])
+        return self.backend.respond(real_app, response)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def cancel(self, app, message):
+
+        real_app = self.backend.find(app.EntryID, app.Start)
+        if real_app is not None:
+            self.backend.cancel(real_app, message)
+        self.mirror.remove(app)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def mark_stale(self, days):
+
+        self.mirror.mark_stale(days)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def subscribe(self, listener):
+
+        '''
+        Subscribes listener, and changes along with it if that did not happen yet.
+        '''
+
+        if self.changes is not None and not self.is_listening:
+            self.is_listening = self.backend.subscribe(self.changes)
+
+        return self.backend.subscribe(listener)
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
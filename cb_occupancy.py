@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+
+
+#---------------------------------------------------------------------------------------------------
+
+import logging
+logger = logging.getLogger(__name__)
+
+import datetime
+
+from cb_backend import olFree
+from cb_trace   import traced
+
+#---------------------------------------------------------------------------------------------------
+
+minutes_per_day = 24*60
+
+#---------------------------------------------------------------------------------------------------
+
+def day_of(app, d_begin):
+
+    '''
+    The index (counted from d_begin) of the day app belongs to : the day it starts on, if it
+    ends before the next midnight. None for all-day, overnight and multi-day items : these
+    take no day, whatever the horizon they were fetched with (as was the case when each day
+    was queried on its own, End < next midnight).
+    '''
+
+    start = app.Start
+    dt_next_midnight = datetime.datetime(start.year, start.month, start.day) \
+            + datetime.timedelta(days=1)
+    if app.End >= dt_next_midnight:
+        return None
+
+    return (datetime.date(start.year, start.month, start.day) - d_begin).days
+
+#---------------------------------------------------------------------------------------------------
+
+def merge_intervals(intervals):
+
+    '''
+    Sorted, non overlapping version of a list of (begin, end) intervals.
+    Touching intervals are merged too.
+    '''
+
+    merged = []
+    for begin, end in sorted(intervals):
+        if merged and begin <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((begin, end))
+
+    return merged
+
+#---------------------------------------------------------------------------------------------------
+
+def subtract_intervals(begin, end, merged):
+
+    '''
+    The parts of [begin, end[ not covered by the (merged) intervals.
+    '''
+
+    rv = []
+    for b, e in merged:
+        if e <= begin:
+            continue
+        if b >= end:
+            break
+        if b > begin:
+            rv.append((begin, b))
+        begin = max(begin, e)
+    if begin < end:
+        rv.append((begin, end))
+
+    return rv
+
+#---------------------------------------------------------------------------------------------------
+
+def nr_touched_slots(merged, begin, end, slot_minutes):
+
+    '''
+    The number of slots of slot_minutes within [begin, end[ that (partly) overlap with any
+    of the (merged) intervals. The cost is in the number of intervals, not of slots.
+    '''
+
+    nr = 0
+    last_slot = -1
+    for b, e in merged:
+        b, e = max(b, begin), min(e, end)
+        if b >= e:
+            continue
+        first = max(b // slot_minutes, last_slot + 1)
+        last  = (e - 1) // slot_minutes
+        if last >= first:
+            nr += last - first + 1
+            last_slot = last
+
+    return nr
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_occupancy:
+
+    '''
+    The occupation of a horizon of nr_days days. Per day, what is really occupied is kept
+    as sorted, merged intervals in minutes since midnight : what is blocked by this program
+    is not, it is what we would (re)block. Everything is interval arithmetic, so the cost
+    grows with the number of appointments and not with the number of slots : slots (of the
+    granularity the user picked) are only rendered when asked for.
+
+    With ignore_free, appointments marked free do not occupy, as in free/busy.
+    '''
+
+    @traced
+    def __init__(self, dt_begin, nr_days, ignore_free=False):
+
+        self.d_begin     = dt_begin.date()
+        self.nr_days     = nr_days
+        self.ignore_free = ignore_free
+
+        self.occupied  = [[] for i in range(nr_days)]
+        self.is_merged = True
+
+    #-----------------------------------------------------------------------------------------------
+
+    def paint(self, app, is_focus):
+
+        '''
+        Paints one appointment into its day, if it has one (see day_of). Our focus blocks
+        (is_focus) do not occupy, nor do appointments marked free with ignore_free.
+        '''
+
+        if is_focus or (self.ignore_free and app.BusyStatus == olFree):
+            return
+
+        i_day = day_of(app, self.d_begin)
+        if i_day is None or not 0 <= i_day < self.nr_days:
+            return
+
+        start = app.Start
+
+        begin = start.hour*60 + start.minute
+        end   = min(begin + app.Duration, minutes_per_day)
+
+        self.occupied[i_day].append((begin, end))
+        self.is_merged = False
+
+    #-----------------------------------------------------------------------------------------------
+
+    def paint_all(self, apps, focus_string):
+
+        for app in apps:
+            self.paint(app, app.Subject == focus_string)
+        self.merge()
+
+    #-----------------------------------------------------------------------------------------------
+
+    def paint_others(self, others):
+
+        '''
+        As paint_all, for the appointments other than our focus blocks : the store told
+        these apart already.
+        '''
+
+        for app in others:
+            self.paint(app, False)
+        self.merge()
+
+    #-----------------------------------------------------------------------------------------------
+
+    def merge(self):
+
+        if self.is_merged:
+            return
+        self.occupied  = [merge_intervals(intervals) for intervals in self.occupied]
+        self.is_merged = True
+
+    #-----------------------------------------------------------------------------------------------
+
+    def nr_occupied_slots(self, i_day, start_slot, end_slot, slot_minutes):
+
+        self.merge()
+        return nr_touched_slots(self.occupied[i_day],
+                start_slot*slot_minutes, end_slot*slot_minutes, slot_minutes)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def overbooked_days(self, start_slot, end_slot, max_nr_occupied_slots, slot_minutes):
+
+        '''
+        The set of day indices having more than max_nr_occupied_slots occupied slots
+        within [start_slot, end_slot[.
+        '''
+
+        return {i_day for i_day in range(self.nr_days)
+                if self.nr_occupied_slots(i_day, start_slot, end_slot, slot_minutes)
+                    > max_nr_occupied_slots}
+
+    #-----------------------------------------------------------------------------------------------
+
+    def free_intervals(self, i_day, begin, end):
+
+        '''
+        The parts of [begin, end[ (minutes) that are not really occupied. What is blocked by
+        this program counts as free : it is what we would (re)block.
+        '''
+
+        self.merge()
+        return subtract_intervals(begin, end, self.occupied[i_day])
+
+    #-----------------------------------------------------------------------------------------------
+
+    def free_blocks(self, i_day, start_slot, end_slot, slot_minutes):
+
+        '''
+        The runs of contiguous free slots within [start_slot, end_slot[, each run
+        as (begin, duration) in minutes. Each run can be blocked with one single appointment.
+        '''
+
+        rv = []
+        for b, e in self.free_intervals(i_day, start_slot*slot_minutes, end_slot*slot_minutes):
+            b = -(-b // slot_minutes) * slot_minutes
+            e = e // slot_minutes * slot_minutes
+            if e > b:
+                rv.append((b, e - b))
+
+        return rv
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
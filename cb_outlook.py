@@ -32,141 +32,149 @@ $EndLicense$
 import sys
 assert sys.version_info >= (3,6)
 
+# Startup is traced as of here, see cb_startup_trace.
+import time
+t_start = time.perf_counter()
+
 import logging
 logger = logging.getLogger(__name__)
 
 import datetime
-import glob
-import io
-import json
-import os
-import pytz
-import pywintypes
-import re
-import time
-import traceback
-import win32api
-import win32com.client
 
-from PySide2.QtCore     import QCoreApplication
 from PySide2.QtCore     import QPoint
 from PySide2.QtCore     import QSettings
 from PySide2.QtCore     import QSize
-from PySide2.QtCore     import QStandardPaths
-from PySide2.QtCore     import Qt
 from PySide2.QtCore     import QTimer
 from PySide2.QtGui      import QIcon
 from PySide2.QtWidgets  import QApplication
 
-from cb_mainwindow import cb_mainwindow
-from cb_dialog     import cb_dialog
+from cb_common            import cb_excepthook
+from cb_common            import cb_install_logger
+from cb_common            import cb_startup_trace
+from cb_common            import log_filename
+from cb_common            import make_backend
+from cb_common            import make_engine
+from cb_common            import make_target_engine
+from cb_common            import program_name
+from cb_common            import program_version
+from cb_common            import trace_filename
+from cb_common            import read_clearing_config
+from cb_common            import read_mirror_max_age
+from cb_common            import read_ignore_free
+from cb_common            import read_use_free_busy
+from cb_common            import read_targets
+from cb_common            import usersettings_filename
+from cb_common            import write_metrics
+from cb_common            import working_slots
+from cb_mainwindow        import cb_mainwindow
+from cb_events            import cb_change_collector
+from cb_log_sink          import cb_log_sink
+from cb_metrics           import cb_metrics
+from cb_scheduler         import cb_refresh_scheduler
+from cb_trace             import traced_slot
+from cb_trace             import tracer
+from cb_util              import myself
+from cb_worker            import cb_worker
 
 #---------------------------------------------------------------------------------------------------
 
-program_name    = "cb_outlook"
-program_version = "1.0.2"
-company_name    = "cb_soft"
-domain_name     = "camiel.bouchier.be"
+class cb_outlook(QApplication):
 
-QCoreApplication.setApplicationName(program_name)
-QCoreApplication.setOrganizationName(company_name)
-QCoreApplication.setOrganizationDomain(domain_name)
+    def __init__(self, argv, startup_trace) :
 
-home_location = QStandardPaths.writableLocation(QStandardPaths.HomeLocation)
-data_location = f"{home_location}/{program_name}"
+        '''
+        Only what is needed to show the window is done here. Talking to Outlook (and loading
+        what is needed for that) waits until the event loop runs, see cb_on_event_loop.
+        '''
 
-try:
-    os.makedirs(data_location)
-except FileExistsError:
-    pass
+        logger.debug(f"{myself()}: {argv} {type(argv)}")
 
-log_filename = f"{data_location}/{program_name}.log"
-usersettings_filename = f"{data_location}/{program_name}.ini"
+        super().__init__(argv)
 
-#---------------------------------------------------------------------------------------------------
+        self.startup_trace = startup_trace
 
-def get_datetime_format_string():
-
-    '''
-    This function tries to figure out what is the datetime representation to be used
-    when interacting with win32/outlook.  A confusing date (3 april 2002 17:56) is converted
-    using the win32api (with its localizations) and the output is parsed to find out what
-    should be the datetime format to be used in strftime()
-    '''
-
-    dt_test = datetime.datetime(2002, 4, 3, 17, 56, tzinfo=pytz.UTC)
-
-    d = win32api.GetDateFormat(0, 0, dt_test)
-    if "03" in d:
-        d = d.replace("03", "%d")
-    if "3" in d:
-        d = d.replace("3", "%d")    # -d does not work on all platforms.
-    if "04" in d:
-        d = d.replace("04", "%m")
-    if "4" in d:
-        d = d.replace("4", "%-m")
-    if "2002" in d:
-        d = d.replace("2002", "%Y")
-    if "02" in d:
-        d = d.replace("02", "%y")
-    if "2" in d:
-        d = d.replace("2", "%-y")
-
-    t = win32api.GetTimeFormat(0, 0, dt_test)
-    assert "56" in t
-    t = t.replace("56", "%M")
-    if "17" in t:
-        t = t.replace("17", "%H")
-    if "5" in t:
-        t = t.replace("5", "%H")
-        assert "PM" in t
-        t = t.replace("PM", "%p")
-    # Outlook does not want seconds. Don't convert them!
-    assert ":00" in t
-    t = t.replace(":00", "")
-
-    rv = f"{d} {t}"
-
-    return rv
+        # I strongly prefer ini files above register values for readibility and debug.
+        self.usersettings  = QSettings(usersettings_filename, QSettings.IniFormat)
+        logger.debug("usersettings in '{self.usersettings.fileName()}'")
+        self.startup_trace.mark("settings")
 
-#---------------------------------------------------------------------------------------------------
+        self.icon = QIcon(program_name + ".ico")
 
-def myself():
+        # The blocking logic runs on a worker thread (see cb_make_engine), one job at a time.
+        self.entry_days = {}
+        self.is_busy    = False
+        self.metrics    = cb_metrics()
+        self.worker = cb_worker(self.cb_make_engine)
+        self.worker.log.connect(self.cb_log)
+        self.worker.progress.connect(self.cb_on_progress)
+        self.worker.finished.connect(self.cb_on_job_finished)
 
-    '''
-    This to return the name of a function from within that function.
-    It only survives the most straightforward cases, so don't stretch anywhere.
-    '''
+        # Other calendars (see read_targets) are blocked alongside, by cb_make_target_engine.
+        self.target_pool = None
 
-    return sys._getframe().f_back.f_code.co_name
+        # Working hours, in minutes since midnight, and their slots as of cb_update_slots().
+        self.slot_minutes = 30
+        self.start_of_day = 0
+        self.end_of_day   = 0
+        self.free_slots   = 0
 
-#---------------------------------------------------------------------------------------------------
+        self.cb_launch_mainwindow()
 
-class cb_outlook(QApplication):
+        self.mainwindow.show()
 
-    def __init__(self, argv) :
+        # Our timer for the periodic refreshes : when, and which days, is up to the scheduler.
 
-        logger.debug(f"{myself()}: {argv} {type(argv)}")
+        refresh_minutes = int(self.usersettings.value("refresh_minutes", 15))
+        self.scheduler = cb_refresh_scheduler(60 * refresh_minutes)
+        self.refresh_timer = QTimer()
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.timeout.connect(self.cb_on_refresh_timer)
 
-        super().__init__(argv)
+        # Calendar events mark the days they touch, which get re-evaluated once things calm
+        # down for change_timer. The periodic refreshes stay as a safety net.
 
-        # I strongly prefer ini files above register values for readibility and debug.
-        self.usersettings  = QSettings(usersettings_filename, QSettings.IniFormat)
-        logger.debug("usersettings in '{self.usersettings.fileName()}'")
+        self.change_timer = QTimer()
+        self.change_timer.setInterval(1000*10)
+        self.change_timer.setSingleShot(True)
+        self.change_timer.timeout.connect(self.cb_on_change_timer)
+        self.change_collector = cb_change_collector(self.entry_days, self.change_timer.start)
+        # The days the local mirror (if used, see cb_make_engine) is to sync again.
+        self.mirror_changes   = cb_change_collector(self.entry_days)
+        self.mirror_max_age   = read_mirror_max_age(self.usersettings)
+        self.use_free_busy    = read_use_free_busy(self.usersettings)
+        self.ignore_free      = read_ignore_free(self.usersettings)
+        self.events_backend   = None
 
-        self.icon = QIcon(program_name + ".ico")
-        self.cb_launch_mainwindow()
+        self.startup_trace.mark("ui setup")
+        QTimer.singleShot(0, self.cb_on_event_loop)
 
-        self.mainwindow.show()
+    #-----------------------------------------------------------------------------------------------
+
+    @traced_slot
+    def cb_on_event_loop(self):
+
+        '''
+        The window is up and the event loop runs : time to start talking to Outlook.
+        '''
+
+        self.startup_trace.mark("event loop")
+
+        self.worker.start()
+
+        # Events come in via the message loop, so via a connection of the GUI thread.
+        from cb_backend_outlook import cb_backend_outlook
+        self.events_backend = cb_backend_outlook()
+        self.events_backend.subscribe(self.change_collector)
+        self.events_backend.subscribe(self.mirror_changes)
+        self.startup_trace.mark("connect")
 
-        # Our timer for hourly runs.
+        if self.each_hour:
+            self.cb_on_block_now()
+        self.cb_start_refresh_timer()
 
-        self.hour_timer = QTimer()
-        self.hour_timer.setInterval(1000*60*60)
-        self.hour_timer.setSingleShot(False)
-        self.hour_timer.timeout.connect(self.cb_on_hour_timer)
-        self.cb_on_hour_timer()
-        self.hour_timer.start()
+        # No first sync (not running each hour) : startup is over now.
+        if not self.is_busy:
+            self.cb_end_startup_trace()
 
     #-----------------------------------------------------------------------------------------------
 
@@ -175,6 +183,7 @@ class cb_outlook(QApplication):
         logger.debug(f"{myself()}")
 
         self.mainwindow = cb_mainwindow(program_name, self.icon)
+        self.log_sink   = cb_log_sink(self.mainwindow.ui.textedit_log)
         desktop_rect = QApplication.desktop().screenGeometry(self.mainwindow)
         default_pos  = QPoint(desktop_rect.width()/10, desktop_rect.height()/10)
         default_size = QSize(480,600)
@@ -188,256 +197,324 @@ class cb_outlook(QApplication):
 
     #-----------------------------------------------------------------------------------------------
 
-    def cb_on_start_of_day_changed(self, start_of_day):
+    @traced_slot
+    def cb_on_slot_minutes_changed(self, slot_minutes):
 
-        logger.debug(f"{myself()}: {start_of_day} {type(start_of_day)}")
-        self.usersettings.setValue("start_of_day" , start_of_day)
+        self.usersettings.setValue("slot_minutes" , slot_minutes)
+        self.slot_minutes = slot_minutes
+        self.cb_update_slots()
 
-        self.start_slot = start_of_day.hour() * 2
-        if start_of_day.minute() > 0:
-            self.start_slot += 1
-        if start_of_day.minute() > 30:
-            self.start_slot += 1
+    #-----------------------------------------------------------------------------------------------
 
-        logger.debug(f"{myself()}: self.start_slot = {self.start_slot}")
+    @traced_slot
+    def cb_on_start_of_day_changed(self, start_of_day):
+
+        self.usersettings.setValue("start_of_day" , start_of_day)
+        self.start_of_day = start_of_day.hour() * 60 + start_of_day.minute()
+        self.cb_update_slots()
 
     #-----------------------------------------------------------------------------------------------
 
+    @traced_slot
     def cb_on_end_of_day_changed(self, end_of_day):
 
-        logger.debug(f"{myself()}: {end_of_day} {type(end_of_day)}")
         self.usersettings.setValue("end_of_day" , end_of_day)
-
-        self.end_slot = end_of_day.hour() * 2
-        if end_of_day.minute() > 0:
-            self.end_slot += 1
-        if end_of_day.minute() > 30:
-            self.end_slot += 1
-
-        logger.debug(f"{myself()}: self.end_slot = {self.end_slot}")
+        self.end_of_day = end_of_day.hour() * 60 + end_of_day.minute()
+        self.cb_update_slots()
 
     #-----------------------------------------------------------------------------------------------
 
+    @traced_slot
     def cb_on_free_slots_changed(self, free_slots):
 
-        logger.debug(f"{myself()}: {free_slots} {type(free_slots)}")
         self.usersettings.setValue("free_slots" , free_slots)
-        self.max_nr_occupied_slots = self.end_slot - self.start_slot - free_slots
+        self.free_slots = free_slots
+        self.cb_update_slots()
+
+    #-----------------------------------------------------------------------------------------------
+
+    def cb_update_slots(self):
+
+        '''
+        (Re)computes the slots of the working hours for the current slot size.
+        '''
+
+        self.start_slot, self.end_slot, self.max_nr_occupied_slots = working_slots(
+                self.slot_minutes, self.start_of_day, self.end_of_day, self.free_slots)
+
+        logger.debug(f"{myself()}: self.start_slot = {self.start_slot}")
+        logger.debug(f"{myself()}: self.end_slot = {self.end_slot}")
         logger.debug(f"{myself()}: self.max_nr_occupied_slots = {self.max_nr_occupied_slots}")
 
     #-----------------------------------------------------------------------------------------------
 
+    @traced_slot
     def cb_on_lookahead_days_changed(self, lookahead_days):
 
-        logger.debug(f"{myself()}: {lookahead_days} {type(lookahead_days)}")
         self.usersettings.setValue("lookahead_days" , lookahead_days)
         self.lookahead_days = lookahead_days
 
     #-----------------------------------------------------------------------------------------------
 
+    @traced_slot
     def cb_on_focus_string_changed(self, focus_string):
 
-        logger.debug(f"{myself()} {focus_string} {type(focus_string)}")
         self.usersettings.setValue("focus_string" , focus_string)
         self.focus_string = focus_string
 
     #-----------------------------------------------------------------------------------------------
 
+    @traced_slot
     def cb_on_each_hour_changed(self, each_hour):
 
-        logger.debug(f"{myself()}: {each_hour} {type(each_hour)}")
         self.usersettings.setValue("each_hour" , each_hour)
         self.each_hour = each_hour
 
     #-----------------------------------------------------------------------------------------------
 
+    @traced_slot
     def cb_on_start_date_changed(self, start_date):
 
-        logger.debug(f"{myself()}: {start_date} {type(start_date)}")
         self.start_date = start_date
 
     #-----------------------------------------------------------------------------------------------
 
+    @traced_slot
     def cb_on_end_date_changed(self, end_date):
 
-        logger.debug(f"{myself()}: {end_date} {type(end_date)}")
         self.end_date = end_date
 
     #-----------------------------------------------------------------------------------------------
 
+    @traced_slot
     def cb_on_message_changed(self, message):
 
-        logger.debug(f"{myself()}: {message} {type(message)}")
         self.message = message
 
     #-----------------------------------------------------------------------------------------------
 
-    def fix_day(self, year, month, day):
+    def cb_make_engine(self, log, progress):
 
         '''
-        this is the crux of the code, it fixes the agenda of a particular day to
-        stuff it with reserved slots or to remove them (when meetings were cancelled e.g.)
+        Makes the engine, talking to Outlook and skipping days that did not change.
+        Called by the worker, on its thread.
         '''
 
-        # 0: free, 1: really occupied, 2: blocked by this program
-        day_occupation_half_hours = [0] * 48
+        return make_engine(log, self.metrics, self.entry_days,
+                [self.change_collector, self.mirror_changes], self.mirror_changes,
+                self.mirror_max_age, self.use_free_busy, self.ignore_free, progress)
 
-        dt_begin = datetime.datetime(year, month, day)
-        dt_end   = dt_begin + datetime.timedelta(days=1)
+    #-----------------------------------------------------------------------------------------------
 
-        f = get_datetime_format_string()
+    def cb_make_target_engine(self, target, log):
 
-        str_begin = dt_begin.strftime(f)
-        str_end   = dt_end.strftime(f)
+        '''
+        Makes the engine for one of the other calendars. Called by the target pool, on its
+        thread.
+        '''
 
-        restriction = f"[Start] >= '{str_begin}' AND [End] < '{str_end}'"
+        return make_target_engine(target, log, self.metrics)
 
-        outlook = win32com.client.Dispatch('Outlook.Application').GetNamespace('MAPI')
+    #-----------------------------------------------------------------------------------------------
 
-        calendar = outlook.getDefaultFolder(9).Items
-        calendar.IncludeRecurrences = True
-        calendar.Sort('[Start]')
+    def cb_run_job(self, name, job, start_text, done_text):
 
-        calendar = calendar.Restrict(restriction)
+        '''
+        Hands job (a callable taking the engine) to the worker, unless one is still running.
+        Its metrics are those of a run of name.
+        '''
 
-        for app in calendar:
+        logger.debug(f"{myself()}: {start_text}")
 
-            dt_start = datetime.datetime(year, month, day, app.Start.hour, app.Start.minute)
-            start_as_half_hour_slot = int( (dt_start - dt_begin).total_seconds()/(60*30) )
-            duration_half_hours = int( (app.Duration+29)/30 )
+        if self.is_busy:
+            self.cb_log(f"still busy, not {start_text}")
+            return False
 
-            r = range(start_as_half_hour_slot, start_as_half_hour_slot + duration_half_hours)
-            for slot in r:
-                if app.Subject != self.focus_string:
-                    day_occupation_half_hours[slot] = 1
-                else:
-                    day_occupation_half_hours[slot] = 2
+        self.is_busy = True
+        self.mainwindow.cb_set_busy(True)
 
+        str_now = datetime.datetime.now().replace(microsecond=0)
+        self.cb_log(f"{str_now}: {start_text}")
+        self.metrics.begin_run(name)
+        self.worker.run(job, done_text)
 
-        my_day_occupation_half_hours = day_occupation_half_hours[self.start_slot:self.end_slot]
-        nr_occupied_slots = my_day_occupation_half_hours.count(1)
+        return True
 
-        if nr_occupied_slots > self.max_nr_occupied_slots:
+    #-----------------------------------------------------------------------------------------------
 
-            self.cb_log(f"{year}-{month}-{day} is overbooked. Start blocking")
+    @traced_slot
+    def cb_on_job_finished(self, done_text):
 
-            # Start blocking half an hour slots for this day.
-            for slot in range(len(day_occupation_half_hours)):
+        str_now = datetime.datetime.now().replace(microsecond=0)
+        self.cb_log(f"{str_now}: {done_text}")
 
-                # Outside hours?
-                if slot<self.start_slot or slot>=self.end_slot: continue
-                # Already occupied?
-                if day_occupation_half_hours[slot]: continue
+        self.is_busy = False
+        self.mainwindow.cb_set_busy(False)
 
-                # Create half hour slot of focus
-                hours = int(slot/2)
-                minutes = (slot % 2) * 30
-                dt_start = datetime.datetime(year, month, day, hours, minutes)
-                self.cb_log(f"blocking {dt_start} to focus")
-                olap = win32com.client.Dispatch('Outlook.Application')
-                app = olap.CreateItem(1)
-                app.Start = dt_start.strftime(f)
-                app.Duration = 30
-                app.Subject = self.focus_string
-                app.Save()
+        self.metrics.end_run()
+        write_metrics(self.metrics)
+        self.mainwindow.statusBar().showMessage(self.metrics.summary())
 
-        else:
+        if tracer.enabled:
+            tracer.export(trace_filename)
 
-            self.cb_log(f"{year}-{month}-{day} is not overbooked.")
+        if not self.startup_trace.is_done():
+            self.startup_trace.mark("first sync")
+            self.cb_end_startup_trace()
 
-            # Remove our blocking slots
+    #-----------------------------------------------------------------------------------------------
 
-            to_remove = []
-            for app in calendar:
-                if app.Subject == self.focus_string: to_remove.append(app)
-            for app in to_remove:
-                self.cb_log(f"unblocking {app.Start}")
-                app.Delete()
+    def cb_end_startup_trace(self):
 
-        # To know the attributes one can work with
-        # for x in dir(calendar[0]):
-        #    print(f"{x} {getattr(calendar[0], x)}" )
+        self.startup_trace.done()
+        logger.info(f"startup: {self.startup_trace.report()}")
+        if self.startup_trace.is_verbose:
+            self.cb_log(f"startup: {self.startup_trace.report()}")
 
     #-----------------------------------------------------------------------------------------------
 
+    @traced_slot
+    def cb_on_progress(self, nr_done, nr_total):
+
+        self.mainwindow.statusBar().showMessage(f"{nr_done}/{nr_total}")
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced_slot
     def cb_on_block_now(self):
 
-        logger.debug(f"{myself()}")
+        config  = self.cb_engine_config()
+        nr_days = self.lookahead_days
+        targets = read_targets(self.usersettings)
 
-        str_now = datetime.datetime.now().replace(microsecond=0)
-        self.cb_log(f"{str_now}: checking and updating calendar")
-        dt_start = datetime.datetime.now()
-        for i in range(self.lookahead_days):
-            dt_to_handle = dt_start + datetime.timedelta(days=i)
-            year = dt_to_handle.year
-            month = dt_to_handle.month
-            day = dt_to_handle.day
-            logger.debug(f"handling {year}-{month}-{day}")
-            self.fix_day(year, month, day)
+        if targets and self.target_pool is None:
+            from cb_targets import cb_target_pool
+            max_workers = int(self.usersettings.value("max_target_workers", 4))
+            self.target_pool = cb_target_pool(self.cb_make_target_engine, max_workers)
 
-        str_now = datetime.datetime.now().replace(microsecond=0)
-        self.cb_log(f"{str_now}: checked and updated calendar")
+        self.scheduler.plan(nr_days)
 
-        # So as of now each hour (if that would be enabled)
-        self.hour_timer.start()
+        def job(engine):
+            dt_begin = datetime.datetime.now()
+            if targets:
+                started = self.target_pool.start(targets, dt_begin, engine.log)
+            engine.configure(*config)
+            engine.block(dt_begin, nr_days)
+            self.scheduler.done([dt_begin.date() + datetime.timedelta(days=i)
+                    for i in range(nr_days)], engine.changed_days)
+            if targets:
+                for result in self.target_pool.wait(started):
+                    engine.log(str(result))
+
+        self.cb_run_job("block", job, "checking and updating calendar",
+                "checked and updated calendar")
 
     #-----------------------------------------------------------------------------------------------
 
-    def cb_on_hour_timer(self):
+    def cb_start_refresh_timer(self):
 
-        logger.debug(f"{myself()}")
-        if self.each_hour:
+        seconds = self.scheduler.seconds_until_next()
+        if seconds is None:
+            seconds = 60
+        self.refresh_timer.start(int(1000 * min(max(seconds, 1), 60*60)))
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced_slot
+    def cb_on_refresh_timer(self):
+
+        '''
+        Refreshes the days the scheduler has due. When the last day of the lookahead is
+        among them, that is a full run (the other calendars included).
+        '''
+
+        if self.is_busy or not self.each_hour:
+            self.cb_start_refresh_timer()
+            return
+
+        self.scheduler.plan(self.lookahead_days)
+        days = self.scheduler.due()
+        d_last = datetime.date.today() + datetime.timedelta(days=self.lookahead_days - 1)
+
+        if d_last in days:
             self.cb_on_block_now()
+        elif days:
+            config = self.cb_engine_config()
+
+            def job(engine):
+                engine.configure(*config)
+                engine.block_days(set(days))
+                self.scheduler.done(days, engine.changed_days)
+
+            self.cb_run_job("refresh", job, f"refreshing {len(days)} days", "refreshed calendar")
+
+        self.cb_start_refresh_timer()
 
     #-----------------------------------------------------------------------------------------------
 
-    def cb_on_empty_now(self):
+    @traced_slot
+    def cb_on_change_timer(self):
 
-        logger.debug(f"{myself()}")
+        '''
+        Re-evaluates the days (within the lookahead) touched by the events since last time.
+        '''
 
-        str_now = datetime.datetime.now().replace(microsecond=0)
-        self.cb_log(f"{str_now}: emptying calendar")
+        if self.is_busy:
+            self.change_timer.start()
+            return
 
-        d = self.start_date
-        dt_begin = datetime.datetime(d.year(), d.month(), d.day())
+        everything, days = self.change_collector.take()
+        if not self.each_hour:
+            return
+        if everything:
+            self.cb_on_block_now()
+            return
 
-        d = self.end_date
-        dt_end = datetime.datetime(d.year(), d.month(), d.day())
+        d_first = datetime.date.today()
+        d_last  = d_first + datetime.timedelta(days=self.lookahead_days)
+        days = {day for day in days if d_first <= day < d_last}
+        if not days:
+            return
 
-        f = get_datetime_format_string()
+        config = self.cb_engine_config()
 
-        str_begin = dt_begin.strftime(f)
-        str_end   = dt_end.strftime(f)
+        def job(engine):
+            engine.configure(*config)
+            engine.block_days(days)
+            self.scheduler.done(days, engine.changed_days)
 
-        restriction = f"[Start] >= '{str_begin}' AND [End] < '{str_end}'"
+        self.cb_run_job("update", job, f"calendar changed, updating {len(days)} days",
+                "updated calendar")
 
-        outlook = win32com.client.Dispatch('Outlook.Application').GetNamespace('MAPI')
+    #-----------------------------------------------------------------------------------------------
 
-        calendar = outlook.getDefaultFolder(9).Items
-        calendar.IncludeRecurrences = True
-        calendar.Sort('[Start]')
+    def cb_engine_config(self):
 
-        calendar = calendar.Restrict(restriction)
+        return (self.slot_minutes,
+                self.start_slot, self.end_slot, self.max_nr_occupied_slots, self.focus_string)
 
-        apps_to_handle = [app for app in calendar]
-        for app in apps_to_handle:
+    #-----------------------------------------------------------------------------------------------
 
-            # 4: declined
-            new_app = app.Respond(4, True, True)
-            if not new_app:
-                self.cb_log(f"canceling {app.Start}: {app.Subject}")
-                # 5: cancelled
-                app.MeetingStatus = 5
-                app.Body = self.message
-                app.Save()
-                app.Send()
-            else:
-                self.cb_log(f"declining {app.Start}: {app.Subject}")
-                new_app.Body = self.message
-                new_app.Send()
+    @traced_slot
+    def cb_on_empty_now(self):
 
-        str_now = datetime.datetime.now().replace(microsecond=0)
-        self.cb_log(f"{str_now}: emptied calendar")
+        d = self.start_date
+        dt_begin = datetime.datetime(d.year(), d.month(), d.day())
+
+        d = self.end_date
+        dt_end = datetime.datetime(d.year(), d.month(), d.day())
+
+        message = self.message
+        config  = read_clearing_config(self.usersettings)
+
+        def job(engine):
+            from cb_clearing import cb_clearing
+            def make_clearing_backend():
+                return make_backend(self.metrics)
+            clearing = cb_clearing(make_clearing_backend, engine.log, engine.progress, **config)
+            clearing.run(engine.backend, dt_begin, dt_end, message)
+
+        self.cb_run_job("empty", job, "emptying calendar", "emptied calendar")
 
     #-----------------------------------------------------------------------------------------------
 
@@ -448,15 +525,21 @@ class cb_outlook(QApplication):
         '''
 
         logger.debug(f"{myself()}: {text}")
-        self.mainwindow.ui.textedit_log.appendPlainText(text)
-        # Ensure immediate GUI update
-        self.processEvents()
+        self.log_sink.append(text)
 
     #-----------------------------------------------------------------------------------------------
 
+    @traced_slot
+    def cb_on_log_filter_changed(self, filter_text):
+
+        self.log_sink.set_filter(filter_text)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced_slot
     def cb_on_help(self):
 
-        logger.debug(f"{myself()}")
+        from cb_dialog import cb_dialog
         with open("help.txt", "r", encoding="utf-8") as f:
             help = f.read().format(**{
                 "program_name": program_name,
@@ -466,9 +549,10 @@ class cb_outlook(QApplication):
 
     #-----------------------------------------------------------------------------------------------
 
+    @traced_slot
     def cb_on_license(self):
 
-        logger.debug(f"{myself()}")
+        from cb_dialog import cb_dialog
         with open("license.txt", "r", encoding="utf-8") as f:
             license = f.read()
         dialog = cb_dialog(self.mainwindow, "License", license, self.icon)
@@ -477,68 +561,29 @@ class cb_outlook(QApplication):
 
     #-----------------------------------------------------------------------------------------------
 
+    @traced_slot
     def cb_on_quit(self):
 
-        logger.debug(f"{myself()}")
-
         self.usersettings.setValue("mainwindow_pos" , self.mainwindow.pos())
         self.usersettings.setValue("mainwindow_size" , self.mainwindow.size())
         self.usersettings.sync()
+        self.worker.stop()
+        if self.target_pool is not None:
+            self.target_pool.shutdown()
+        if tracer.enabled:
+            tracer.export(trace_filename)
         QApplication.quit()
 
 #---------------------------------------------------------------------------------------------------
 
-def cb_excepthook(exception_type, exception_value, traceback_object) :
-
-    """
-    Catch unhandled exceptions.
-    """
-
-    # Construct stack trace.
-    traceback_info_file = io.StringIO()
-    traceback.print_tb(traceback_object, None, traceback_info_file)
-    traceback_info_file.seek(0)
-    traceback_info = traceback_info_file.read()
-
-    # Construct error message.
-    error_message = f"{exception_type} :\n\n{exception_value}\n"
-    stack_trace   = f"Stack trace :\n{traceback_info}"
-
-    logger.critical(error_message)
-    logger.debug(stack_trace)    # Auto stack trace of exception only works in exception block.
-
-    sys.exit()
-
-#---------------------------------------------------------------------------------------------------
-
-def cb_install_logger() :
-
-    """
-    Install logger
-    """
-
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG)
-
-    file_handler = logging.FileHandler(log_filename, mode='a', encoding="utf8")
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter(
-            "%(asctime)s - %(levelname)10s - %(filename)32s:%(lineno)5s : %(message)s")
-    file_handler.setFormatter(file_formatter)
-
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.DEBUG)
-    console_formatter = logging.Formatter("%(filename)32s:%(lineno)5s : %(message)s")
-    console_handler.setFormatter(console_formatter)
-
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
-
-    logger.debug(f"logging in '{log_filename}'")
+if __name__ == '__main__' :
 
-#---------------------------------------------------------------------------------------------------
+    # --startup-trace : report the time spent per startup phase in the log window too.
+    startup_trace = cb_startup_trace(t_start, "--startup-trace" in sys.argv)
+    startup_trace.mark("imports")
 
-if __name__ == '__main__' :
+    # --trace : record trace spans, written to trace_filename after each job (see cb_trace).
+    tracer.enable("--trace" in sys.argv)
 
     cb_install_logger()
     logger.debug(f"starting {program_name}")
@@ -546,7 +591,7 @@ if __name__ == '__main__' :
     # Catch exceptions to give feedback to user.
     sys.excepthook = cb_excepthook
 
-    the_app = cb_outlook(sys.argv)
+    the_app = cb_outlook(sys.argv, startup_trace)
     rv = the_app.exec_()
 
     logger.debug(f"done {program_name}: {rv}")
@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+
+
+#---------------------------------------------------------------------------------------------------
+
+# Headless cb_outlook : the same engine and usersettings as the GUI, without loading any widgets.
+#
+#   cb_outlook_cli.py block [--days N]
+#   cb_outlook_cli.py empty --from YYYY-MM-DD --to YYYY-MM-DD --message TEXT
+#   cb_outlook_cli.py daemon [--interval MINUTES] [--debounce SECONDS]
+#
+# With --trace (before the command), trace spans are written to trace_filename (see cb_trace).
+
+# Measure startup from as early as possible.
+import time
+t_start = time.perf_counter()
+
+# Want to be asap sure we are running Python 3.6
+import sys
+assert sys.version_info >= (3,6)
+
+import logging
+logger = logging.getLogger(__name__)
+
+import argparse
+import datetime
+
+from PySide2.QtCore     import QSettings
+
+from cb_common          import cb_excepthook
+from cb_common          import cb_install_logger
+from cb_common          import cb_startup_trace
+from cb_common          import make_backend
+from cb_common          import make_engine
+from cb_common          import make_target_engine
+from cb_common          import program_name
+from cb_common          import read_clearing_config
+from cb_common          import read_engine_config
+from cb_common          import read_mirror_max_age
+from cb_common          import read_ignore_free
+from cb_common          import read_use_free_busy
+from cb_common          import read_targets
+from cb_common          import trace_filename
+from cb_common          import usersettings_filename
+from cb_common          import write_metrics
+from cb_backend         import cb_delegating_backend
+from cb_clearing        import cb_clearing
+from cb_events          import cb_change_collector
+from cb_metrics         import cb_metrics
+from cb_scheduler       import cb_refresh_scheduler
+from cb_targets         import cb_target_pool
+from cb_trace           import traced
+from cb_trace           import tracer
+from cb_util            import myself
+
+#---------------------------------------------------------------------------------------------------
+
+def cb_log(text):
+
+    '''
+    this is logging as it goes to the user (the console, as of INFO)
+    '''
+
+    logger.info(text)
+
+#---------------------------------------------------------------------------------------------------
+
+# The timings of all runs, see cb_metrics.
+metrics = cb_metrics()
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_startup_backend(cb_delegating_backend):
+
+    '''
+    Ends startup_trace (a cb_startup_trace) once the first query returned : only then
+    Outlook is connected (lazily) and has answered.
+    '''
+
+    def __init__(self, backend, startup_trace):
+
+        super().__init__(backend)
+
+        self.startup_trace = startup_trace
+
+    #-----------------------------------------------------------------------------------------------
+
+    def answered(self, result):
+
+        if not self.startup_trace.is_done():
+            self.startup_trace.mark("first query")
+            self.startup_trace.done()
+            logger.info(f"startup: {self.startup_trace.report()}")
+
+        return result
+
+    #-----------------------------------------------------------------------------------------------
+
+    def query_range(self, dt_begin, dt_end, subject=None, not_subject=None):
+
+        return self.answered(self.backend.query_range(dt_begin, dt_end, subject, not_subject))
+
+    #-----------------------------------------------------------------------------------------------
+
+    def free_busy(self, dt_begin, nr_days, slot_minutes):
+
+        return self.answered(self.backend.free_busy(dt_begin, nr_days, slot_minutes))
+
+#---------------------------------------------------------------------------------------------------
+
+def cb_make_target_engine(target, log):
+
+    return make_target_engine(target, log, metrics)
+
+#---------------------------------------------------------------------------------------------------
+
+target_pool = None
+
+@traced
+def cb_block(engine, usersettings, nr_days=None, days=None):
+
+    '''
+    Blocks the lookahead (or nr_days) days as of today, or only days (dates) within those.
+    The usersettings are re-read, they might have been changed via the GUI meanwhile.
+    A full run also blocks the other calendars (see read_targets), concurrently.
+    '''
+
+    global target_pool
+
+    usersettings.sync()
+    config, lookahead_days = read_engine_config(usersettings)
+    if nr_days is None:
+        nr_days = lookahead_days
+    engine.configure(*config)
+
+    metrics.begin_run("block" if days is None else "update")
+
+    str_now = datetime.datetime.now().replace(microsecond=0)
+    if days is None:
+        cb_log(f"{str_now}: checking and updating calendar")
+        dt_begin = datetime.datetime.now()
+        targets  = read_targets(usersettings)
+        if targets:
+            if target_pool is None:
+                max_workers = int(usersettings.value("max_target_workers", 4))
+                target_pool = cb_target_pool(cb_make_target_engine, max_workers)
+            started = target_pool.start(targets, dt_begin, cb_log)
+        engine.block(dt_begin, nr_days)
+        if targets:
+            for result in target_pool.wait(started):
+                cb_log(str(result))
+    else:
+        d_first = datetime.date.today()
+        d_last  = d_first + datetime.timedelta(days=nr_days)
+        days = {day for day in days if d_first <= day < d_last}
+        cb_log(f"{str_now}: updating {len(days)} days")
+        engine.block_days(days)
+    logger.debug(f"{myself()}: {engine.backend.stats()}")
+
+    metrics.end_run()
+    write_metrics(metrics)
+    if tracer.enabled:
+        tracer.export(trace_filename)
+
+    str_now = datetime.datetime.now().replace(microsecond=0)
+    cb_log(f"{str_now}: checked and updated calendar")
+    cb_log(metrics.summary())
+
+#---------------------------------------------------------------------------------------------------
+
+@traced
+def cb_empty(engine, usersettings, dt_begin, dt_end, message):
+
+    metrics.begin_run("empty")
+
+    str_now = datetime.datetime.now().replace(microsecond=0)
+    cb_log(f"{str_now}: emptying calendar")
+
+    def make_clearing_backend():
+        return make_backend(metrics)
+
+    config = read_clearing_config(usersettings)
+    clearing = cb_clearing(make_clearing_backend, cb_log, **config)
+    clearing.run(engine.backend, dt_begin, dt_end, message)
+    logger.debug(f"{myself()}: {engine.backend.stats()}")
+
+    metrics.end_run()
+    write_metrics(metrics)
+    if tracer.enabled:
+        tracer.export(trace_filename)
+
+    str_now = datetime.datetime.now().replace(microsecond=0)
+    cb_log(f"{str_now}: emptied calendar")
+    cb_log(metrics.summary())
+
+#---------------------------------------------------------------------------------------------------
+
+@traced
+def cb_daemon(engine, usersettings, interval_minutes, debounce_seconds):
+
+    '''
+    Runs until interrupted : the days the scheduler has due (see cb_refresh_scheduler :
+    today and tomorrow each interval_minutes, further days less often) and, in between, the
+    days touched by calendar events once these calmed down for debounce_seconds. When the
+    last day of the lookahead is due, that is a full run.
+    '''
+
+    last_event = [0.0]
+
+    def on_change():
+        last_event[0] = time.monotonic()
+
+    collector = cb_change_collector(engine.entry_days, on_change)
+    engine.backend.subscribe(collector)
+
+    scheduler = cb_refresh_scheduler(60 * interval_minutes)
+
+    def block_all(lookahead_days):
+        cb_block(engine, usersettings)
+        today = datetime.date.today()
+        scheduler.done([today + datetime.timedelta(days=i) for i in range(lookahead_days)],
+                engine.changed_days)
+
+    _, lookahead_days = read_engine_config(usersettings)
+    scheduler.plan(lookahead_days)
+    collector.take()
+    block_all(lookahead_days)
+
+    while True:
+
+        _, lookahead_days = read_engine_config(usersettings)
+        scheduler.plan(lookahead_days)
+
+        if collector.is_pending() and time.monotonic() - last_event[0] >= debounce_seconds:
+            everything, days = collector.take()
+            if everything:
+                block_all(lookahead_days)
+            else:
+                cb_block(engine, usersettings, days=days)
+                scheduler.done(days, engine.changed_days)
+
+        else:
+            days = scheduler.due()
+            d_last = datetime.date.today() + datetime.timedelta(days=lookahead_days - 1)
+            if d_last in days:
+                collector.take()
+                block_all(lookahead_days)
+            elif days:
+                cb_block(engine, usersettings, days=set(days))
+                scheduler.done(days, engine.changed_days)
+
+        engine.backend.wait_for_events(1.0)
+
+#---------------------------------------------------------------------------------------------------
+
+def cb_parse_args(argv):
+
+    def date(text):
+        return datetime.datetime.strptime(text, "%Y-%m-%d")
+
+    parser = argparse.ArgumentParser(prog=program_name,
+            description="Blocks focus time in an overbooked Outlook calendar, headless.")
+    parser.add_argument("--trace", action="store_true",
+            help="record trace spans, to open in a trace viewer (chrome://tracing)")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    block = commands.add_parser("block", help="check and update the calendar once")
+    block.add_argument("--days", type=int, default=None,
+            help="days to look ahead (default : as in the usersettings)")
+
+    empty = commands.add_parser("empty", help="decline or cancel everything in a date range")
+    empty.add_argument("--from", dest="date_from", type=date, required=True,
+            help="first day (YYYY-MM-DD)")
+    empty.add_argument("--to", dest="date_to", type=date, required=True,
+            help="day after the last day (YYYY-MM-DD), as in the GUI")
+    empty.add_argument("--message", required=True, help="the message to the attendees")
+
+    daemon = commands.add_parser("daemon", help="keep the calendar updated until interrupted")
+    daemon.add_argument("--interval", type=int, default=15,
+            help="minutes between refreshes of today and tomorrow, further days are "
+                 "refreshed less often (default : 15)")
+    daemon.add_argument("--debounce", type=int, default=10,
+            help="seconds of calm after calendar events before updating (default : 10)")
+
+    return parser.parse_args(argv)
+
+#---------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__' :
+
+    startup_trace = cb_startup_trace(t_start)
+    startup_trace.mark("imports")
+
+    args = cb_parse_args(sys.argv[1:])
+
+    cb_install_logger(logging.INFO)
+    logger.debug(f"starting {program_name} {args}")
+
+    sys.excepthook = cb_excepthook
+
+    tracer.enable(args.trace)
+
+    usersettings = QSettings(usersettings_filename, QSettings.IniFormat)
+    # Our own writes come back as events : the collectors subscribed via the engine's backend
+    # drop them. Changes only reach the mirror when running as daemon, else max age it is.
+    entry_days     = {}
+    mirror_max_age = read_mirror_max_age(usersettings)
+    mirror_changes = cb_change_collector(entry_days) if mirror_max_age is not None else None
+    engine = make_engine(cb_log, metrics, entry_days, (), mirror_changes, mirror_max_age,
+            read_use_free_busy(usersettings), read_ignore_free(usersettings))
+
+    engine.backend.open()
+    startup_trace.mark("setup")
+    engine.backend = cb_startup_backend(engine.backend, startup_trace)
+
+    try:
+        if args.command == "block":
+            cb_block(engine, usersettings, args.days)
+        elif args.command == "empty":
+            cb_empty(engine, usersettings, args.date_from, args.date_to, args.message)
+        elif args.command == "daemon":
+            cb_daemon(engine, usersettings, args.interval, args.debounce)
+    except KeyboardInterrupt:
+        logger.info("interrupted")
+    finally:
+        engine.backend.close()
+        if target_pool is not None:
+            target_pool.shutdown()
+
+    logger.debug(f"done {program_name}")
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+# Restrictions for Items.Restrict, in DASL with the times in UTC : the same whatever the locale
+# of Windows or Outlook, unlike the Jet syntax ([Start] >= '...') wanting the date format of
+# the locale.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import datetime
+import functools
+
+#---------------------------------------------------------------------------------------------------
+
+dasl_start     = '"urn:schemas:calendar:dtstart"'
+dasl_end       = '"urn:schemas:calendar:dtend"'
+dasl_subject   = '"urn:schemas:httpmail:subject"'
+# PidLidRecurring, the IsRecurring of an appointment.
+dasl_recurring = '"http://schemas.microsoft.com/mapi/id/' \
+                 '{00062002-0000-0000-C000-000000000046}/8223000B"'
+
+#---------------------------------------------------------------------------------------------------
+
+def dasl_time(dt):
+
+    '''
+    dt (naive, local time) as DASL wants it : in UTC, as 'YYYY-MM-DD HH:MM'.
+    '''
+
+    return dt.astimezone(datetime.timezone.utc).strftime("'%Y-%m-%d %H:%M'")
+
+#---------------------------------------------------------------------------------------------------
+
+def dasl_string(text):
+
+    return "'" + text.replace("'", "''") + "'"
+
+#---------------------------------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=256)
+def compile_restriction(dt_begin=None, dt_end=None, subject=None, not_subject=None,
+        is_recurring=None):
+
+    '''
+    The restriction for : Start >= dt_begin, End < dt_end, Subject equal to subject or
+    differing from not_subject, and (not) being a recurring series. What is None is not
+    restricted on. Compiled once per set of arguments.
+    '''
+
+    conditions = []
+    if dt_begin is not None:
+        conditions.append(f"{dasl_start} >= {dasl_time(dt_begin)}")
+    if dt_end is not None:
+        conditions.append(f"{dasl_end} < {dasl_time(dt_end)}")
+    if subject is not None:
+        conditions.append(f"{dasl_subject} = {dasl_string(subject)}")
+    if not_subject is not None:
+        conditions.append(f"{dasl_subject} <> {dasl_string(not_subject)}")
+    if is_recurring is not None:
+        conditions.append(f"{dasl_recurring} = {1 if is_recurring else 0}")
+
+    restriction = "@SQL=" + " AND ".join(conditions)
+    logger.debug(f"compile_restriction: {restriction}")
+
+    return restriction
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
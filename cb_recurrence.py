@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+# Recurring series expanded locally, instead of having Outlook expand every series on every
+# query (Items.IncludeRecurrences), which is slow. A series is read once (its pattern and its
+# exceptions) and only read again when it was modified.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import bisect
+import calendar
+import datetime
+
+from cb_backend import olRecursDaily
+from cb_backend import olRecursMonthNth
+from cb_backend import olRecursMonthly
+from cb_backend import olRecursWeekly
+from cb_backend import olRecursYearNth
+from cb_backend import olRecursYearly
+from cb_table   import cb_row
+from cb_trace   import traced
+from cb_util    import myself
+
+#---------------------------------------------------------------------------------------------------
+
+# No pattern runs longer than this, whatever it says (NoEndDate e.g.).
+max_nr_occurrences = 100000
+
+#---------------------------------------------------------------------------------------------------
+
+def weekday_bit(d):
+
+    '''
+    The bit of the weekday of d in an Outlook DayOfWeekMask (olSunday = 1 ... olSaturday = 64).
+    '''
+
+    return 1 << ((d.weekday() + 1) % 7)
+
+#---------------------------------------------------------------------------------------------------
+
+def add_months(year, month, nr_months):
+
+    i = year * 12 + (month - 1) + nr_months
+    return i // 12, i % 12 + 1
+
+#---------------------------------------------------------------------------------------------------
+
+def nth_in_month(year, month, day_of_week_mask, instance):
+
+    '''
+    The instance-th day (1 ... 4, 5 being the last) of the month matching day_of_week_mask.
+    '''
+
+    nr_days = calendar.monthrange(year, month)[1]
+    days = [datetime.date(year, month, day) for day in range(1, nr_days + 1)
+            if weekday_bit(datetime.date(year, month, day)) & day_of_week_mask]
+    if not days:
+        return None
+    if instance >= 5 or instance > len(days):
+        return days[-1]
+    return days[instance - 1]
+
+#---------------------------------------------------------------------------------------------------
+
+def day_in_month(year, month, day_of_month):
+
+    return datetime.date(year, month, min(day_of_month, calendar.monthrange(year, month)[1]))
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_series:
+
+    '''
+    A recurring series, as read from its master and its RecurrencePattern (all times naive,
+    local). exceptions maps the original date of an occurrence to None when it was deleted,
+    or to its (dt_start, dt_end, subject) when it was changed.
+
+    The occurrences are expanded into an index (sorted on start) up to a horizon, which
+    grows (doubling) as later ranges are asked for.
+    '''
+
+    def __init__(self, entry_id, last_modified, subject, meeting_status, busy_status,
+            recurrence_type, interval, day_of_week_mask, day_of_month, instance, month_of_year,
+            pattern_start, pattern_end, start_time, duration, exceptions):
+
+        self.entry_id         = entry_id
+        self.last_modified    = last_modified
+        self.subject          = subject
+        self.meeting_status   = meeting_status
+        self.busy_status      = busy_status
+        self.recurrence_type  = recurrence_type
+        self.interval         = max(1, interval)
+        self.day_of_week_mask = day_of_week_mask
+        self.day_of_month     = day_of_month
+        self.instance         = instance
+        self.month_of_year    = month_of_year
+        self.pattern_start    = pattern_start
+        self.pattern_end      = pattern_end
+        self.start_time       = start_time
+        self.duration         = duration
+        self.exceptions       = exceptions
+
+        # A pattern on weekdays without any weekday in its mask.
+        self.is_empty = recurrence_type in (olRecursWeekly, olRecursMonthNth, olRecursYearNth) \
+                and not day_of_week_mask
+        if self.is_empty:
+            logger.warning(f"{myself()}: no weekdays in the pattern of {subject}, "
+                           f"taken as empty")
+
+        self.horizon = None
+        self.starts  = []
+        self.index   = []
+
+    #-----------------------------------------------------------------------------------------------
+
+    def candidate_dates(self):
+
+        '''
+        The dates of the pattern as of pattern_start, in order, endlessly. None at all for
+        a pattern on weekdays without any weekday in its mask : else the search for the
+        next date would never end.
+        '''
+
+        start = self.pattern_start
+        step  = self.interval
+
+        if self.is_empty:
+            return
+
+        if self.recurrence_type == olRecursDaily:
+            i = 0
+            while True:
+                yield start + datetime.timedelta(days=i * step)
+                i += 1
+
+        elif self.recurrence_type == olRecursWeekly:
+            # Weeks start on Sunday, as for Outlook's interval.
+            week = start - datetime.timedelta(days=(start.weekday() + 1) % 7)
+            while True:
+                for i_day in range(7):
+                    d = week + datetime.timedelta(days=i_day)
+                    if d >= start and weekday_bit(d) & self.day_of_week_mask:
+                        yield d
+                week += datetime.timedelta(days=7 * step)
+
+        elif self.recurrence_type in (olRecursMonthly, olRecursMonthNth,
+                olRecursYearly, olRecursYearNth):
+            if self.recurrence_type in (olRecursMonthly, olRecursMonthNth):
+                year, month, nr_months = start.year, start.month, step
+            else:
+                # Outlook has the interval of a yearly pattern in months (12) or in years.
+                year, month = start.year, self.month_of_year
+                nr_months = 12 * (step // 12 if step >= 12 else step)
+            while True:
+                if self.recurrence_type in (olRecursMonthly, olRecursYearly):
+                    d = day_in_month(year, month, self.day_of_month)
+                else:
+                    d = nth_in_month(year, month, self.day_of_week_mask, self.instance)
+                if d is not None and d >= start:
+                    yield d
+                year, month = add_months(year, month, nr_months)
+
+        else:
+            logger.warning(f"{myself()}: unknown recurrence type {self.recurrence_type} "
+                           f"of {self.subject}")
+
+    #-----------------------------------------------------------------------------------------------
+
+    def occurrence(self, dt_start, dt_end, subject):
+
+        return cb_row(self.entry_id, dt_start, dt_end, subject, self.busy_status,
+                self.meeting_status, self.last_modified, True)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def expand(self, horizon):
+
+        '''
+        (Re)builds the index with all occurrences starting before horizon (a datetime).
+        '''
+
+        occurrences = []
+        duration = datetime.timedelta(minutes=self.duration)
+
+        for nr, d in enumerate(self.candidate_dates()):
+            if nr >= max_nr_occurrences:
+                break
+            if self.pattern_end is not None and d > self.pattern_end:
+                break
+            dt_start = datetime.datetime.combine(d, self.start_time)
+            if dt_start >= horizon:
+                break
+            if d in self.exceptions:
+                continue
+            occurrences.append(self.occurrence(dt_start, dt_start + duration, self.subject))
+
+        # The changed occurrences, wherever they moved to.
+        for exception in self.exceptions.values():
+            if exception is not None and exception[0] < horizon:
+                occurrences.append(self.occurrence(*exception))
+
+        occurrences.sort(key=lambda occurrence: occurrence.Start)
+
+        self.horizon = horizon
+        self.index   = occurrences
+        self.starts  = [occurrence.Start for occurrence in occurrences]
+
+    #-----------------------------------------------------------------------------------------------
+
+    def occurrences(self, dt_begin, dt_end):
+
+        '''
+        The occurrences with Start >= dt_begin and End < dt_end, as for query_range.
+        '''
+
+        if self.horizon is None or self.horizon < dt_end:
+            horizon = dt_end
+            if self.horizon is not None:
+                # Grow by doubling, not by the little bit asked for.
+                first = datetime.datetime.combine(self.pattern_start, datetime.time())
+                horizon = max(dt_end, self.horizon + (self.horizon - first))
+            self.expand(horizon)
+
+        i_begin = bisect.bisect_left(self.starts, dt_begin)
+        i_end   = bisect.bisect_left(self.starts, dt_end, i_begin)
+
+        return [occurrence for occurrence in self.index[i_begin:i_end]
+                if occurrence.End < dt_end]
+
+    #-----------------------------------------------------------------------------------------------
+
+    def occurrence_at(self, dt_start):
+
+        '''
+        The occurrence starting at dt_start, None if there is none (as GetOccurrence).
+        '''
+
+        if self.horizon is None or self.horizon <= dt_start:
+            self.occurrences(dt_start, dt_start + datetime.timedelta(days=1))
+
+        i = bisect.bisect_left(self.starts, dt_start)
+        if i < len(self.starts) and self.starts[i] == dt_start:
+            return self.index[i]
+
+        return None
+
+    #-----------------------------------------------------------------------------------------------
+
+    def delete_occurrence(self, dt_start):
+
+        '''
+        Deletes the occurrence starting at dt_start, as an exception (as Outlook does).
+        Returns whether there was one.
+        '''
+
+        if self.occurrence_at(dt_start) is None:
+            return False
+
+        # A changed occurrence is known by its original date, else that is its date.
+        original = next((d for d, exception in self.exceptions.items()
+                if exception is not None and exception[0] == dt_start), dt_start.date())
+        self.exceptions[original] = None
+        self.horizon = None
+
+        return True
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
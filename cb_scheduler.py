@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+# When to re-evaluate which day. Near days change often, far ones rarely : each day gets
+# refreshed at the interval of its tier (by how far ahead it is), adapted to how often it
+# turned out to have changed, with some jitter so not all desktops go to Exchange at the
+# same minute. The clock is injectable (see cb_virtual_clock), so is the randomness.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import datetime
+import heapq
+import random
+import threading
+import time
+
+from cb_trace import traced
+
+#---------------------------------------------------------------------------------------------------
+
+# (days ahead up to, interval as a multiple of the base interval). With the default base of
+# 15 minutes : today and tomorrow each 15 minutes, the rest of the week hourly, the weeks after
+# every 4 hours and beyond twice a day.
+default_refresh_tiers = ((2, 1), (7, 4), (21, 16), (None, 48))
+
+# An interval adapts within [tier interval * min_factor, tier interval * max_factor].
+min_factor = 0.5
+max_factor = 4.0
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_virtual_clock:
+
+    '''
+    A clock (seconds since epoch, as time.time) that only moves when told to.
+    '''
+
+    def __init__(self, seconds=0.0):
+
+        self.seconds = seconds
+
+    def __call__(self):
+
+        return self.seconds
+
+    def advance(self, seconds):
+
+        self.seconds += seconds
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_refresh_scheduler:
+
+    '''
+    A queue (heapq) of days and when they are due for a refresh. plan() keeps the horizon
+    in it, due() hands out what is due and done() feeds back whether a day changed :
+    a day that changed gets refreshed twice as often, one that did not 1.5 times less,
+    within the bounds of its tier.
+
+    due() is called from one thread, done() can be called from another (the worker).
+    '''
+
+    @traced
+    def __init__(self, base_seconds=15*60, tiers=default_refresh_tiers, jitter=0.1,
+            clock=time.time, rng=None):
+
+        self.base_seconds = base_seconds
+        self.tiers        = tiers
+        self.jitter       = jitter
+        self.clock        = clock
+        self.rng          = rng if rng is not None else random.Random()
+        self.lock         = threading.Lock()
+
+        # Per day : (due, interval). The heap can have outdated entries : the one matching
+        # self.days is the one that counts.
+        self.days  = {}
+        self.queue = []
+
+    #-----------------------------------------------------------------------------------------------
+
+    def today(self):
+
+        return datetime.date.fromtimestamp(self.clock())
+
+    #-----------------------------------------------------------------------------------------------
+
+    def tier_seconds(self, day):
+
+        '''
+        The interval of the tier of day.
+        '''
+
+        nr_days_ahead = (day - self.today()).days
+        for up_to, factor in self.tiers:
+            if up_to is None or nr_days_ahead < up_to:
+                return self.base_seconds * factor
+
+    #-----------------------------------------------------------------------------------------------
+
+    def schedule(self, day, seconds, interval):
+
+        '''
+        Puts day in the queue, due after seconds (give or take the jitter).
+        '''
+
+        due = self.clock() + seconds * (1.0 + self.rng.uniform(-self.jitter, self.jitter))
+        self.days[day] = (due, interval)
+        heapq.heappush(self.queue, (due, day))
+
+    #-----------------------------------------------------------------------------------------------
+
+    def plan(self, nr_days):
+
+        '''
+        Makes the queue cover nr_days days as of today. Days not in it yet are due right
+        away (give or take the jitter), days past are dropped.
+        '''
+
+        today = self.today()
+        horizon = {today + datetime.timedelta(days=i) for i in range(nr_days)}
+
+        with self.lock:
+            for day in list(self.days):
+                if day not in horizon:
+                    del self.days[day]
+            for day in sorted(horizon - set(self.days)):
+                self.schedule(day, self.jitter * self.tier_seconds(day), self.tier_seconds(day))
+
+    #-----------------------------------------------------------------------------------------------
+
+    def due(self):
+
+        '''
+        The days due, sorted. They are rescheduled as if unchanged; done() corrects that.
+        '''
+
+        now = self.clock()
+        rv = []
+
+        with self.lock:
+            while self.queue and self.queue[0][0] <= now:
+                due, day = heapq.heappop(self.queue)
+                if self.days.get(day, (None,))[0] != due:
+                    continue
+                rv.append(day)
+                interval = self.days[day][1]
+                self.schedule(day, interval, interval)
+
+        return sorted(rv)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def done(self, days, changed_days):
+
+        '''
+        days were refreshed, of which changed_days turned out to have changed.
+        '''
+
+        with self.lock:
+            for day in days:
+                if day not in self.days:
+                    continue
+                tier_seconds = self.tier_seconds(day)
+                interval = self.days[day][1]
+                if day in changed_days:
+                    interval /= 2
+                else:
+                    interval *= 1.5
+                interval = min(max(interval, tier_seconds * min_factor), tier_seconds * max_factor)
+                self.schedule(day, interval, interval)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def seconds_until_next(self):
+
+        '''
+        Until the first day is due, None if there is nothing in the queue.
+        '''
+
+        with self.lock:
+            while self.queue and self.days.get(self.queue[0][1], (None,))[0] != self.queue[0][0]:
+                heapq.heappop(self.queue)
+            if not self.queue:
+                return None
+            return max(self.queue[0][0] - self.clock(), 0.0)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def intervals(self):
+
+        '''
+        The current interval of each day, for the log.
+        '''
+
+        with self.lock:
+            return {day: interval for day, (due, interval) in sorted(self.days.items())}
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
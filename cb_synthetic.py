@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+# Synthetic calendars, for benchmarking (see cb_benchmark) and load-testing the engine
+# against cb_backend_memory. Same seed, same calendar.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import datetime
+import itertools
+import random
+
+from cb_backend             import olMeeting
+from cb_backend             import olMeetingReceived
+from cb_backend_memory      import cb_memory_appointment
+from cb_occupancy           import minutes_per_day
+from cb_trace               import traced
+
+#---------------------------------------------------------------------------------------------------
+
+# The hours meetings get planned in, in minutes since midnight.
+meeting_begin = 8 * 60
+meeting_end   = 18 * 60
+
+meeting_durations = (15, 30, 30, 30, 45, 60, 60, 90, 120)
+
+#---------------------------------------------------------------------------------------------------
+
+@traced
+def synthetic_calendar(dt_begin, nr_days, density=0.6, recurring=0.3, all_day=0.05,
+        overlap=0.1, multi_day=0.02, received=0.7, seed=0):
+
+    '''
+    A list of cb_memory_appointments for nr_days as of dt_begin (a datetime, at midnight) :
+
+        density   : the share of the meeting hours of a working day that is booked
+        recurring : the share of those bookings being occurrences of a (daily or weekly)
+                    series, which share their EntryID as in Outlook
+        all_day   : the chance for a day to have an all-day event
+        overlap   : the chance for a meeting to be double booked on top of another one
+        multi_day : the chance for a day to have an event starting on it that lasts until
+                    one of the next days
+        received  : the share of the meetings we are invited to (the others we organize)
+
+    Weekends only get all-day and multi-day events.
+    '''
+
+    rnd       = random.Random(seed)
+    # Apart from the EntryIDs a cb_backend_memory hands out to what it creates.
+    entry_ids = itertools.count(1)
+    apps      = []
+
+    def make(dt_start, duration, subject, entry_id=None):
+        status = olMeetingReceived if rnd.random() < received else olMeeting
+        if entry_id is None:
+            entry_id = f"S{next(entry_ids):015X}"
+        app = cb_memory_appointment(dt_start, duration, subject, status, entry_id)
+        apps.append(app)
+        return app
+
+    def is_working_day(i_day):
+        return (dt_begin + datetime.timedelta(days=i_day)).weekday() < 5
+
+    nr_booked_minutes = density * (meeting_end - meeting_begin)
+    mean_duration     = sum(meeting_durations) / len(meeting_durations)
+
+    # The series : as many as needed to book their share of the minutes.
+    nr_series = round(recurring * nr_booked_minutes / mean_duration)
+    series = []
+    for i_series in range(nr_series):
+        duration = rnd.choice(meeting_durations)
+        begin    = rnd.randrange(meeting_begin, meeting_end - duration + 1, 15)
+        weekday  = rnd.choice((None, 0, 1, 2, 3, 4))  # None is daily
+        series.append((f"S{next(entry_ids):015X}", begin, duration, weekday))
+
+    for i_day in range(nr_days):
+
+        dt_day = dt_begin + datetime.timedelta(days=i_day)
+
+        if rnd.random() < all_day:
+            make(dt_day, minutes_per_day, "synthetic: all day")
+
+        if rnd.random() < multi_day:
+            begin = rnd.randrange(12 * 60, 20 * 60, 30)
+            nr_extra_days = rnd.randint(1, 3)
+            make(dt_day + datetime.timedelta(minutes=begin),
+                    nr_extra_days * minutes_per_day + rnd.choice(meeting_durations) - begin,
+                    "synthetic: multi day")
+
+        if not is_working_day(i_day):
+            continue
+
+        booked = 0
+        for entry_id, begin, duration, weekday in series:
+            if weekday is None or weekday == dt_day.weekday():
+                make(dt_day + datetime.timedelta(minutes=begin), duration,
+                        "synthetic: series", entry_id)
+                booked += duration
+
+        # The loose meetings, one after the other with gaps, until the day is booked enough.
+        begin = meeting_begin
+        while booked < nr_booked_minutes and begin < meeting_end:
+            duration = min(rnd.choice(meeting_durations), meeting_end - begin)
+            if rnd.random() < overlap:
+                # Double booked, on top of the previous one.
+                begin = max(meeting_begin, begin - duration // 2)
+            make(dt_day + datetime.timedelta(minutes=begin), duration, "synthetic: meeting")
+            booked += duration
+            gap = rnd.choice((0, 0, 15, 30, 60))
+            begin += duration + int(gap * (1.0 - density))
+
+    apps.sort(key=lambda app: app.Start)
+
+    return apps
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
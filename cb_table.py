@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+# Column-projected reads of the calendar. Instead of handing out Outlook AppointmentItems (of
+# which every property read is a round-trip to Outlook), the rows of a Table with only the
+# columns the engine needs are read in bulk (GetArray) and turned into plain records.
+
+import logging
+logger = logging.getLogger(__name__)
+
+from cb_trace import traced
+
+#---------------------------------------------------------------------------------------------------
+
+# The columns read, in this order. MeetingStatus is there for the clearing (declining or
+# cancelling), LastModificationTime for the mirror.
+table_columns = ("EntryID", "Start", "End", "Subject", "BusyStatus", "MeetingStatus",
+                 "LastModificationTime")
+
+# Rows fetched per GetArray.
+table_batch_size = 500
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_row:
+
+    '''
+    An appointment as read from the store (a Table row, an occurrence of a locally expanded
+    series, a row of the mirror), all times naive. Looks like an Outlook AppointmentItem as
+    far as the engine is concerned; to write to it, a backend looks the real one up (see
+    find()).
+    '''
+
+    __slots__ = ("EntryID", "Start", "End", "Duration", "Subject", "BusyStatus",
+                 "MeetingStatus", "LastModificationTime", "IsRecurring")
+
+    def __init__(self, entry_id, dt_start, dt_end, subject, busy_status, meeting_status,
+            last_modified, is_recurring=False):
+
+        self.EntryID              = entry_id
+        self.Start                = dt_start
+        self.End                  = dt_end
+        self.Duration             = int((dt_end - dt_start).total_seconds()) // 60
+        self.Subject              = subject
+        self.BusyStatus           = busy_status
+        self.MeetingStatus        = meeting_status
+        self.LastModificationTime = last_modified
+        self.IsRecurring          = is_recurring
+
+#---------------------------------------------------------------------------------------------------
+
+def project(table, columns=table_columns):
+
+    '''
+    Sets the columns of table to columns only.
+    '''
+
+    table.Columns.RemoveAll()
+    for column in columns:
+        table.Columns.Add(column)
+
+#---------------------------------------------------------------------------------------------------
+
+def values_of(*values):
+
+    return values
+
+#---------------------------------------------------------------------------------------------------
+
+def read_rows(table, make_row=values_of, batch_size=table_batch_size):
+
+    '''
+    All rows of table (projected already), as make_row(*values) (by default the tuple of
+    the values), fetched in batches.
+    '''
+
+    rows = []
+    while not table.EndOfTable:
+        rows.extend(make_row(*values) for values in table.GetArray(batch_size))
+
+    return rows
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_memory_columns:
+
+    '''
+    Stand-in for the Columns of an Outlook Table.
+    '''
+
+    def __init__(self):
+
+        self.names = []
+
+    def RemoveAll(self):
+
+        self.names = []
+
+    def Add(self, name):
+
+        self.names.append(name)
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_memory_table:
+
+    '''
+    Stand-in for an Outlook Table over apps (filtered already), so the projected reads can be
+    run without Outlook. Like Outlook, GetArray hands out the values of the columns only.
+    '''
+
+    @traced(log_args=False)
+    def __init__(self, apps):
+
+        self.apps     = apps
+        self.i_next   = 0
+        self.Columns  = cb_memory_columns()
+        self.nr_reads = 0
+
+    @property
+    def EndOfTable(self):
+
+        return self.i_next >= len(self.apps)
+
+    def GetArray(self, max_rows):
+
+        self.nr_reads += 1
+        apps = self.apps[self.i_next:self.i_next + max_rows]
+        self.i_next += len(apps)
+
+        names = self.Columns.names
+        return tuple(tuple(getattr(app, name) for name in names) for app in apps)
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
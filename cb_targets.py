@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+import logging
+logger = logging.getLogger(__name__)
+
+import concurrent.futures
+import re
+import threading
+import time
+import traceback
+
+from cb_trace import traced
+from cb_util import myself
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_target:
+
+    '''
+    A calendar to block, other than our own (e.g. a shared one managed by an assistant) :
+    its mailbox, its engine configuration (as for cb_engine.configure) and lookahead days.
+    '''
+
+    def __init__(self, name, mailbox, config, lookahead_days):
+
+        self.name           = name
+        self.mailbox        = mailbox
+        self.config         = config
+        self.lookahead_days = lookahead_days
+
+    def safe_name(self):
+
+        '''
+        The name, usable in a filename.
+        '''
+
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", self.name)
+
+    def __repr__(self):
+
+        return f"cb_target({self.name!r}, {self.mailbox!r})"
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_target_result:
+
+    '''
+    How blocking one target went.
+    '''
+
+    __slots__ = ("name", "ok", "seconds", "stats", "error")
+
+    def __init__(self, name, ok, seconds, stats="", error=""):
+
+        self.name    = name
+        self.ok      = ok
+        self.seconds = seconds
+        self.stats   = stats
+        self.error   = error
+
+    def __str__(self):
+
+        if self.ok:
+            return f"{self.name}: ok in {self.seconds:.1f}s {self.stats}"
+        return f"{self.name}: failed after {self.seconds:.1f}s : {self.error}"
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_target_pool:
+
+    '''
+    Blocks several targets concurrently, on at most max_workers threads. Each target gets
+    an engine (and so a backend, with its own COM apartment and Outlook session) of its own,
+    made, used and closed on the thread that runs it.
+
+    A slow target does not stall the others, nor the caller beyond timeout_seconds : it
+    gets reported as still running, and is skipped by the runs that follow until it is done.
+    '''
+
+    @traced(log_args=False)
+    def __init__(self, make_engine, max_workers=4, timeout_seconds=600):
+
+        '''
+        make_engine(target, log) makes the engine for target.
+        '''
+
+        self.make_engine     = make_engine
+        self.timeout_seconds = timeout_seconds
+        self.executor        = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                thread_name_prefix="cb_target")
+        self.running         = set()
+        self.lock            = threading.Lock()
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def start(self, targets, dt_begin, log):
+
+        '''
+        Starts blocking targets as of dt_begin, each for its lookahead days.
+        Returns what wait() needs.
+        '''
+
+        futures = {}
+        skipped = []
+        for target in targets:
+            with self.lock:
+                if target.name in self.running:
+                    skipped.append(target.name)
+                    continue
+                self.running.add(target.name)
+            futures[self.executor.submit(self.run_target, target, dt_begin, log)] = target.name
+
+        return futures, skipped
+
+    #-----------------------------------------------------------------------------------------------
+
+    def wait(self, started):
+
+        '''
+        Waits (up to timeout_seconds) for what start() started.
+        Returns the cb_target_results, in the order they finished.
+        '''
+
+        futures, skipped = started
+
+        results = [cb_target_result(name, False, 0.0, error="still running from before")
+                for name in skipped]
+
+        try:
+            for future in concurrent.futures.as_completed(futures, self.timeout_seconds):
+                results.append(future.result())
+        except concurrent.futures.TimeoutError:
+            for future, name in futures.items():
+                if not future.done():
+                    results.append(cb_target_result(name, False, self.timeout_seconds,
+                            error="still running, timed out waiting"))
+
+        return results
+
+    #-----------------------------------------------------------------------------------------------
+
+    def run(self, targets, dt_begin, log):
+
+        return self.wait(self.start(targets, dt_begin, log))
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def run_target(self, target, dt_begin, log):
+
+        '''
+        Blocks one target. Runs on a thread of the pool and never raises.
+        '''
+
+        def target_log(text):
+            log(f"{target.name}: {text}")
+
+        t_begin = time.perf_counter()
+        engine  = None
+        try:
+            engine = self.make_engine(target, target_log)
+            engine.backend.open()
+            engine.configure(*target.config)
+            engine.block(dt_begin, target.lookahead_days)
+            return cb_target_result(target.name, True, time.perf_counter() - t_begin,
+                    engine.backend.stats())
+        except Exception as e:
+            logger.error(f"{myself()}: {target}\n{traceback.format_exc()}")
+            return cb_target_result(target.name, False, time.perf_counter() - t_begin,
+                    error=repr(e))
+        finally:
+            if engine is not None:
+                engine.backend.close()
+            with self.lock:
+                self.running.discard(target.name)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def shutdown(self):
+
+        '''
+        Lets go of the threads, without waiting for what is still running.
+        '''
+
+        self.executor.shutdown(wait=False)
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
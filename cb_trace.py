@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+# Trace spans, to be opened in a trace viewer (chrome://tracing, Perfetto) to see where the time
+# of a slow run goes. Disabled (the default), a span costs next to nothing.
+#
+#   @traced                         a span around each call, named after the function
+#   @traced_slot                    the same, for a Qt slot
+#   with tracer.span("name"): ...   a span around a block
+#   tracer.export(filename)         Chrome trace event json
+
+import logging
+logger = logging.getLogger(__name__)
+
+import collections
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+from cb_util import write_atomically
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_no_span:
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+no_span = cb_no_span()
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_span:
+
+    __slots__ = ("tracer", "name", "args", "t_begin")
+
+    def __init__(self, tracer, name, args):
+
+        self.tracer = tracer
+        self.name   = name
+        self.args   = args
+
+    def __enter__(self):
+
+        self.t_begin = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+
+        self.tracer.record(self.name, self.t_begin, time.perf_counter(), self.args)
+        return False
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_tracer:
+
+    '''
+    Collects spans (the last max_events of them) as Chrome trace "complete" events.
+    '''
+
+    def __init__(self, max_events=100000):
+
+        self.enabled = False
+        self.events  = collections.deque(maxlen=max_events)
+        self.threads = {}
+        self.t_zero  = time.perf_counter()
+
+    #-----------------------------------------------------------------------------------------------
+
+    def enable(self, enabled=True):
+
+        logger.debug(f"enable: {enabled}")
+        self.enabled = enabled
+
+    #-----------------------------------------------------------------------------------------------
+
+    def span(self, name, **args):
+
+        if not self.enabled:
+            return no_span
+        return cb_span(self, name, args)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def record(self, name, t_begin, t_end, args=None):
+
+        tid = threading.get_ident()
+        if tid not in self.threads:
+            self.threads[tid] = threading.current_thread().name
+
+        event = {
+            "name" : name,
+            "ph"   : "X",
+            "ts"   : (t_begin - self.t_zero) * 1e6,
+            "dur"  : (t_end - t_begin) * 1e6,
+            "pid"  : os.getpid(),
+            "tid"  : tid,
+            }
+        if args:
+            event["args"] = {key: str(value) for key, value in args.items()}
+
+        # deque.append is atomic, so no lock needed with several threads.
+        self.events.append(event)
+
+    #-----------------------------------------------------------------------------------------------
+
+    def export(self, filename):
+
+        '''
+        Writes the spans as Chrome trace event json.
+        '''
+
+        logger.debug(f"export: {filename} {len(self.events)}")
+
+        events = list(self.events)
+        pid = os.getpid()
+        events += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                    "args": {"name": name}} for tid, name in list(self.threads.items())]
+
+        try:
+            write_atomically(filename,
+                    json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+        except OSError as e:
+            logger.warning(f"export: can not write {filename} : {e}")
+
+#---------------------------------------------------------------------------------------------------
+
+# The one tracer of the process.
+tracer = cb_tracer()
+
+#---------------------------------------------------------------------------------------------------
+
+def traced(func=None, log_args=True, is_slot=False):
+
+    '''
+    Decorator : a span around each call of func, and a DEBUG log line with its name (and
+    arguments, unless log_args is False), both only made when enabled. This replaces the
+    logger.debug(f"{myself()}") opening a function, which builds its string whether DEBUG
+    is on or not. Use as @traced or @traced(log_args=False); for Qt slots see traced_slot.
+    '''
+
+    if func is None:
+        return functools.partial(traced, log_args=log_args, is_slot=is_slot)
+
+    func_logger = logging.getLogger(func.__module__)
+    name        = func.__qualname__
+    short_name  = func.__name__
+
+    # For methods, leave self out of the log line.
+    parts     = name.split(".")
+    is_method = len(parts) > 1 and parts[-2] != "<locals>"
+
+    # Qt hands a slot taking *args all arguments of the signal (e.g. the checked of
+    # clicked), so drop what func does not take, as Qt would have done for func itself.
+    code = func.__code__
+    max_nr_args = None if not is_slot or code.co_flags & inspect.CO_VARARGS \
+            else code.co_argcount
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+
+        if max_nr_args is not None and len(args) > max_nr_args:
+            args = args[:max_nr_args]
+
+        if func_logger.isEnabledFor(logging.DEBUG):
+            if log_args:
+                func_logger.debug("%s: %s", short_name,
+                        " ".join(str(arg) for arg in (args[1:] if is_method else args)))
+            else:
+                func_logger.debug("%s", short_name)
+
+        if not tracer.enabled:
+            return func(*args, **kwargs)
+
+        with cb_span(tracer, name, None):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+#---------------------------------------------------------------------------------------------------
+
+def traced_slot(func=None, log_args=True):
+
+    '''
+    traced, for a method connected to a Qt signal : the arguments of the signal it does not
+    take (e.g. the checked of clicked) are dropped, as Qt does for a slot it sees itself.
+    Any other function gets all its arguments, too many being an error as without traced.
+    '''
+
+    return traced(func, log_args, is_slot=True)
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+
+
+#---------------------------------------------------------------------------------------------------
+
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import os
+import sys
+
+#---------------------------------------------------------------------------------------------------
+
+def myself():
+
+    '''
+    This to return the name of a function from within that function.
+    It only survives the most straightforward cases, so don't stretch anywhere.
+    '''
+
+    return sys._getframe().f_back.f_code.co_name
+
+#---------------------------------------------------------------------------------------------------
+
+def read_json(filename):
+
+    '''
+    The contents of the json file filename, None if it is missing or unreadable (the latter
+    logged). For the files we keep state in, where either means starting from scratch.
+    '''
+
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.debug(f"{myself()}: no {filename}")
+    except (ValueError, OSError) as e:
+        logger.warning(f"{myself()}: ignoring {filename} : {e}")
+
+    return None
+
+#---------------------------------------------------------------------------------------------------
+
+def write_atomically(filename, text):
+
+    '''
+    Writes text to filename via filename.new, so whoever reads it (or a crash halfway)
+    never sees half a file.
+    '''
+
+    filename_new = f"{filename}.new"
+    with open(filename_new, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(filename_new, filename)
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+
+
+#---------------------------------------------------------------------------------------------------
+
+import logging
+logger = logging.getLogger(__name__)
+
+import traceback
+
+from PySide2.QtCore import QObject
+from PySide2.QtCore import Qt
+from PySide2.QtCore import QThread
+from PySide2.QtCore import Signal
+
+from cb_trace import traced
+from cb_trace import traced_slot
+from cb_util  import myself
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_worker(QObject):
+
+    '''
+    Runs the calendar jobs on a thread of its own, keeping the GUI responsive.
+    The engine (and so its backend, e.g. its COM apartment and Outlook session) is made and
+    used on that thread only. Log lines, progress and completion come back via signals.
+
+    A job is a callable taking the engine. Jobs are handed over with run().
+    '''
+
+    log      = Signal(str)
+    progress = Signal(int, int)
+    finished = Signal(str)
+
+    job_requested = Signal(object, str)
+
+    @traced(log_args=False)
+    def __init__(self, make_engine):
+
+        '''
+        make_engine(log, progress) makes the engine, called on the worker thread.
+        '''
+
+        super().__init__(None)
+
+        self.make_engine = make_engine
+        self.engine      = None
+
+        self.thread = QThread()
+        self.moveToThread(self.thread)
+        self.thread.started.connect(self.cb_on_started)
+        # Direct, so it runs on the worker thread, before it ends.
+        self.thread.finished.connect(self.cb_on_thread_finished, Qt.DirectConnection)
+        self.job_requested.connect(self.cb_on_job)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def start(self):
+
+        self.thread.start()
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def stop(self):
+
+        if self.thread.isRunning():
+            self.thread.quit()
+            self.thread.wait()
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced
+    def run(self, job, done_text):
+
+        '''
+        Queues job on the worker thread. finished(done_text) is emitted when it is done.
+        '''
+
+        self.job_requested.emit(job, done_text)
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced_slot
+    def cb_on_started(self):
+
+        try:
+            self.cb_make_engine()
+        except Exception as e:
+            logger.error(f"{myself()}: {e}\n{traceback.format_exc()}")
+            self.log.emit(f"failed : {e}")
+
+    #-----------------------------------------------------------------------------------------------
+
+    def cb_make_engine(self):
+
+        '''
+        Makes the engine and opens its backend. Tried again by the next job if it failed.
+        '''
+
+        engine = self.make_engine(self.log.emit, self.progress.emit)
+        engine.backend.open()
+        self.engine = engine
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced_slot
+    def cb_on_thread_finished(self):
+
+        if self.engine:
+            self.engine.backend.close()
+
+    #-----------------------------------------------------------------------------------------------
+
+    @traced_slot
+    def cb_on_job(self, job, done_text):
+
+        try:
+            if self.engine is None:
+                self.cb_make_engine()
+            job(self.engine)
+            logger.debug(f"{myself()}: {self.engine.backend.stats()}")
+        except Exception as e:
+            logger.error(f"{myself()}: {e}\n{traceback.format_exc()}")
+            self.log.emit(f"failed : {e}")
+        finally:
+            self.finished.emit(done_text)
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+#---------------------------------------------------------------------------------------------------
+
+# The fixtures the tests (test_cb_*.py, run with pytest) share : a week in 2030 to work on,
+# an engine configuration and cb_backend_memory to run it against.
+
+import datetime
+
+import pytest
+
+from cb_backend_memory import cb_backend_memory
+from cb_backend_memory import cb_memory_appointment
+from cb_engine         import cb_engine
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.fixture
+def dt_monday():
+
+    return datetime.datetime(2030, 1, 7)
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.fixture
+def config():
+
+    '''
+    Working hours 8:00 - 18:00 in slots of 30 minutes, overbooked above 14 slots.
+    '''
+
+    return (30, 16, 36, 14, "focus")
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.fixture
+def at(dt_monday):
+
+    '''
+    at(i_day, hour, minute=0) : the datetime of that time, i_day days after dt_monday.
+    '''
+
+    def at(i_day, hour, minute=0):
+        return dt_monday + datetime.timedelta(days=i_day, hours=hour, minutes=minute)
+
+    return at
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.fixture
+def meetings(at):
+
+    '''
+    meetings(i_day, busy_status=None) : meetings from 8:00 to 17:00, leaving 17:00 - 18:00
+    free. Overbooked with config.
+    '''
+
+    def meetings(i_day, busy_status=None):
+        apps = [cb_memory_appointment(at(i_day, hour), 60, "meeting") for hour in range(8, 17)]
+        if busy_status is not None:
+            for app in apps:
+                app.BusyStatus = busy_status
+        return apps
+
+    return meetings
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.fixture
+def make_engine(config):
+
+    '''
+    make_engine(apps, projected=False) : (engine, backend), the engine configured with config
+    and running against a cb_backend_memory loaded with apps.
+    '''
+
+    def make_engine(apps, projected=False):
+        backend = cb_backend_memory(projected)
+        backend.load(apps)
+        engine = cb_engine(backend, lambda text: None)
+        engine.configure(*config)
+        return engine, backend
+
+    return make_engine
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.fixture
+def focus_blocks():
+
+    '''
+    focus_blocks(backend, focus_string="focus") : the (Start, Duration) of the focus blocks
+    in a cb_backend_memory.
+    '''
+
+    def focus_blocks(backend, focus_string="focus"):
+        return [(app.Start, app.Duration) for app in backend.appointments
+                if app.Subject == focus_string]
+
+    return focus_blocks
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+#---------------------------------------------------------------------------------------------------
+
+# cb_clearing against cb_backend_memory, and its cb_rate_limiter on a virtual clock : run with
+# pytest (fixtures in conftest).
+
+import pytest
+
+from cb_backend        import cb_delegating_backend
+from cb_backend        import olMeetingReceived
+from cb_backend_memory import cb_backend_memory
+from cb_clearing       import cb_clearing
+from cb_clearing       import cb_rate_limiter
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_failing_backend(cb_delegating_backend):
+
+    '''
+    Raises on the first nr_failures calls of name, after passing the call on if
+    goes_through.
+    '''
+
+    def __init__(self, backend, name, nr_failures, goes_through=False):
+
+        super().__init__(backend)
+
+        self.nr_failures  = nr_failures
+        self.goes_through = goes_through
+        setattr(self, name, self.failing(getattr(backend, name)))
+
+    #-----------------------------------------------------------------------------------------------
+
+    def failing(self, action):
+
+        def call(*args):
+            if self.nr_failures == 0:
+                return action(*args)
+            self.nr_failures -= 1
+            if self.goes_through:
+                action(*args)
+            raise RuntimeError("call failed")
+
+        return call
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.fixture
+def received(meetings):
+
+    '''
+    received(*i_days) : a cb_backend_memory with the meetings of the days i_days, all
+    received (so to be declined).
+    '''
+
+    def received(*i_days):
+        apps = [app for i_day in i_days for app in meetings(i_day)]
+        for app in apps:
+            app.MeetingStatus = olMeetingReceived
+        memory = cb_backend_memory()
+        memory.load(apps)
+        return memory
+
+    return received
+
+#---------------------------------------------------------------------------------------------------
+
+def make_clearing(make_backend, **config):
+
+    return cb_clearing(make_backend, lambda text: None, per_second=0, retry_seconds=0, **config)
+
+#---------------------------------------------------------------------------------------------------
+
+def test_the_rate_limiter_spaces_the_calls():
+
+    now    = [0.0]
+    sleeps = []
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = cb_rate_limiter(2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(5):
+        limiter.wait()
+
+    assert sleeps == [0.5] * 4
+    assert now[0] == 2.0
+
+    # Waited long enough already : no sleep.
+    now[0] += 10
+    limiter.wait()
+    assert len(sleeps) == 4
+
+#---------------------------------------------------------------------------------------------------
+
+def test_no_rate_limit_never_sleeps():
+
+    sleeps = []
+    limiter = cb_rate_limiter(0, clock=lambda: 0.0, sleep=sleeps.append)
+    for _ in range(5):
+        limiter.wait()
+
+    assert sleeps == []
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize("batch_size, window_days, nr_batches", ((10, 7, 3), (5, 7, 6),
+        (10, 1, 3), (100, 1, 3), (100, 7, 1)))
+def test_a_range_is_cleared_in_batches_per_window(batch_size, window_days, nr_batches, at,
+        received):
+
+    memory = received(0, 1, 2)
+    backends = []
+    def make_backend():
+        backends.append(memory)
+        return memory
+
+    clearing = make_clearing(make_backend, batch_size=batch_size, window_days=window_days)
+    clearing.run(memory, at(0, 0), at(7, 0), "on holiday")
+
+    assert len(backends) == nr_batches
+    assert (clearing.nr_total, clearing.nr_declined, clearing.nr_retries) == (27, 27, 0)
+    assert memory.appointments == []
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_failing_lookup_is_retried(at, received):
+
+    memory  = received(1)
+    backend = cb_failing_backend(memory, "query_range", 2)
+
+    clearing = make_clearing(lambda: backend)
+    clearing.run(memory, at(0, 0), at(7, 0), "on holiday")
+
+    assert (clearing.nr_declined, clearing.nr_retries) == (9, 2)
+    assert clearing.failed == []
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_lookup_failing_every_attempt_fails_its_batch(at, received):
+
+    memory  = received(1)
+    backend = cb_failing_backend(memory, "query_range", 3)
+
+    clearing = make_clearing(lambda: backend, max_attempts=3)
+    clearing.run(memory, at(0, 0), at(7, 0), "on holiday")
+
+    assert (clearing.nr_declined, len(clearing.failed), clearing.nr_retries) == (0, 9, 2)
+    assert memory.nr_sends == 0
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_send_that_did_not_go_through_is_sent_again(at, received):
+
+    memory  = received(1)
+    backend = cb_failing_backend(memory, "send", 1)
+
+    clearing = make_clearing(lambda: backend)
+    clearing.run(memory, at(0, 0), at(7, 0), "on holiday")
+
+    assert (clearing.nr_declined, clearing.nr_retries) == (9, 1)
+    assert memory.nr_sends == 9
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_send_that_went_through_is_not_sent_again(at, received):
+
+    memory  = received(1)
+    backend = cb_failing_backend(memory, "send", 1, goes_through=True)
+
+    clearing = make_clearing(lambda: backend)
+    clearing.run(memory, at(0, 0), at(7, 0), "on holiday")
+
+    assert (clearing.nr_declined, clearing.nr_retries) == (9, 1)
+    assert memory.nr_sends == 9
+    assert memory.appointments == []
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_cancel_that_went_through_is_not_sent_again(at, meetings):
+
+    # We organize these : they get canceled.
+    memory  = cb_backend_memory()
+    memory.load(meetings(1))
+    backend = cb_failing_backend(memory, "cancel", 1, goes_through=True)
+
+    clearing = make_clearing(lambda: backend)
+    clearing.run(memory, at(0, 0), at(7, 0), "on holiday")
+
+    assert (clearing.nr_canceled, clearing.nr_retries) == (9, 1)
+    assert memory.nr_sends == 9
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+#---------------------------------------------------------------------------------------------------
+
+# cb_engine against cb_backend_memory, which counts the queries and writes it gets : run
+# with pytest (fixtures in conftest).
+
+import datetime
+
+import pytest
+
+from cb_backend        import olFree
+from cb_backend_memory import cb_memory_appointment
+from cb_synthetic      import synthetic_calendar
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_window_is_fetched_at_once(dt_monday, make_engine):
+
+    engine, backend = make_engine(synthetic_calendar(dt_monday, 28, density=0.8))
+
+    engine.block(dt_monday, 28)
+
+    # Our focus blocks and the others : two queries for all 28 days.
+    assert backend.nr_queries == 2
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize("nr_days", (2, 3, 7))
+def test_all_day_overnight_and_multi_day_items_take_no_day(nr_days, dt_monday, at,
+        make_engine, focus_blocks):
+
+    apps = [cb_memory_appointment(at(1, 0), 24*60, "all day"),
+            cb_memory_appointment(at(1, 8), 17*60, "overnight"),
+            cb_memory_appointment(at(1, 12), 3*24*60, "multi day")]
+    engine, backend = make_engine(apps)
+
+    engine.block(dt_monday, nr_days)
+
+    assert focus_blocks(backend) == []
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_partial_run_agrees_with_a_full_run(dt_monday, at, make_engine, focus_blocks):
+
+    # Overbooked, with 12:00 - 13:00 and 17:00 - 18:00 free unless the all-day item counts.
+    apps = [cb_memory_appointment(at(1, hour), 60, "meeting")
+            for hour in (8, 9, 10, 11, 13, 14, 15, 16)]
+    apps += [cb_memory_appointment(at(1, 0), 24*60, "all day"),
+             cb_memory_appointment(at(1, 22), 3*60, "overnight")]
+    engine, backend = make_engine(apps)
+
+    engine.block(dt_monday, 7)
+    assert focus_blocks(backend) == [(at(1, 12), 60), (at(1, 17), 60)]
+
+    nr_writes = backend.nr_writes
+    for _ in range(3):
+        engine.block_days({at(1, 0).date()})
+        engine.block(dt_monday, 7)
+
+    assert backend.nr_writes == nr_writes
+
+#---------------------------------------------------------------------------------------------------
+
+def test_an_overbooked_day_gets_its_free_time_blocked(dt_monday, at, meetings, make_engine,
+        focus_blocks):
+
+    engine, backend = make_engine(meetings(1))
+
+    engine.block(dt_monday, 7)
+
+    assert focus_blocks(backend) == [(at(1, 17), 60)]
+
+#---------------------------------------------------------------------------------------------------
+
+def test_contiguous_free_slots_make_one_block(dt_monday, at, make_engine, focus_blocks):
+
+    # 16 occupied slots, 16:00 - 18:00 free : one block, not four.
+    apps = [cb_memory_appointment(at(1, hour), 60, "meeting") for hour in range(8, 16)]
+    engine, backend = make_engine(apps)
+
+    engine.block(dt_monday, 7)
+
+    assert focus_blocks(backend) == [(at(1, 16), 120)]
+    assert backend.nr_creates == 1
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_second_run_writes_nothing(dt_monday, meetings, make_engine):
+
+    engine, backend = make_engine(meetings(1) + meetings(3))
+    engine.block(dt_monday, 7)
+
+    nr_writes = backend.nr_writes
+    engine.block(dt_monday, 7)
+
+    assert backend.nr_writes == nr_writes
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_day_no_longer_overbooked_gets_unblocked(dt_monday, at, meetings, make_engine,
+        focus_blocks):
+
+    apps = meetings(1) + meetings(3)
+    engine, backend = make_engine(apps)
+    engine.block(dt_monday, 7)
+
+    # Only the blocks of the day that changed are deleted, nothing is created.
+    nr_creates = backend.nr_creates
+    backend.remove(apps[0])
+    backend.remove(apps[1])
+    engine.block(dt_monday, 7)
+
+    assert focus_blocks(backend) == [(at(3, 17), 60)]
+    assert backend.nr_deletes == 1
+    assert backend.nr_creates == nr_creates
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize("ignore_free, blocks", ((False, [(17, 60)]), (True, [])))
+def test_items_marked_free_occupy_unless_ignored(ignore_free, blocks, dt_monday, at, meetings,
+        make_engine, focus_blocks):
+
+    engine, backend = make_engine(meetings(1, olFree))
+    engine.ignore_free = ignore_free
+
+    engine.block(dt_monday, 7)
+
+    assert focus_blocks(backend) == [(at(1, hour), duration) for hour, duration in blocks]
+
+#---------------------------------------------------------------------------------------------------
+
+def test_free_busy_does_not_screen_when_items_marked_free_occupy(dt_monday, make_engine):
+
+    engine, backend = make_engine([])
+    engine.use_free_busy = True
+
+    assert engine.screen_free_busy(dt_monday, 7) is None
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize("density", (0.3, 0.8))
+def test_screening_on_free_busy_gives_the_same_calendar(density, make_engine, focus_blocks):
+
+    # Free/busy is only published that far from today.
+    d = datetime.date.today() + datetime.timedelta(days=1)
+    dt_begin = datetime.datetime(d.year, d.month, d.day)
+
+    # A day full of items marked free : no free/busy, and no occupancy either.
+    def calendar():
+        apps = synthetic_calendar(dt_begin, 42, density=density)
+        for hour in range(8, 18):
+            app = cb_memory_appointment(dt_begin + datetime.timedelta(days=3, hours=hour),
+                    60, "free")
+            app.BusyStatus = olFree
+            apps.append(app)
+        return apps
+
+    calendars = []
+    for use_free_busy in (False, True):
+        engine, backend = make_engine(calendar())
+        engine.ignore_free   = True
+        engine.use_free_busy = use_free_busy
+        engine.block(dt_begin, 42)
+        calendars.append(sorted(focus_blocks(backend)))
+
+    assert calendars[0] == calendars[1]
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize("window_days", (1, 3, 28, 400))
+def test_windowed_blocking_gives_the_same_writes(window_days, dt_monday, make_engine,
+        focus_blocks):
+
+    # The whole horizon in one window as the reference.
+    writes = []
+    for nr_window_days in (window_days, 400):
+        engine, backend = make_engine(synthetic_calendar(dt_monday, 400, density=0.7))
+        engine.window_days = nr_window_days
+        engine.block(dt_monday, 400)
+        writes.append((sorted(focus_blocks(backend)), backend.nr_creates, backend.nr_deletes))
+
+    assert writes[0][0]
+    assert writes[0] == writes[1]
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+#---------------------------------------------------------------------------------------------------
+
+# cb_change_collector and cb_own_writes_backend, against the events of cb_backend_memory :
+# run with pytest (fixtures in conftest).
+
+from cb_backend_memory import cb_backend_memory
+from cb_backend_memory import cb_memory_appointment
+from cb_events         import cb_change_collector
+from cb_events         import cb_own_writes_backend
+
+#---------------------------------------------------------------------------------------------------
+
+def test_events_are_delivered_later_and_coalesced_per_day(at):
+
+    backend = cb_backend_memory()
+    nr_changes = []
+    collector = cb_change_collector({}, lambda: nr_changes.append(1))
+    backend.subscribe(collector)
+
+    backend.add(cb_memory_appointment(at(0, 9), 60, "one"))
+    backend.add(cb_memory_appointment(at(0, 11), 60, "two"))
+    backend.add(cb_memory_appointment(at(2, 9), 60, "three"))
+    assert not collector.is_pending()
+
+    backend.wait_for_events(0)
+    assert len(nr_changes) == 3
+    assert collector.take() == (False, {at(0, 0).date(), at(2, 0).date()})
+    assert not collector.is_pending()
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_moved_item_touches_the_day_it_was_on(at):
+
+    backend = cb_backend_memory()
+    app = cb_memory_appointment(at(0, 9), 60, "moving")
+    backend.load([app])
+    collector = cb_change_collector({app.EntryID: {at(0, 0).date()}})
+    backend.subscribe(collector)
+
+    backend.modify(app, dt_start=at(3, 9))
+    backend.wait_for_events(0)
+
+    assert collector.take() == (False, {at(0, 0).date(), at(3, 0).date()})
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_removal_touches_everything(at):
+
+    backend = cb_backend_memory()
+    app = cb_memory_appointment(at(0, 9), 60, "going")
+    backend.load([app])
+    collector = cb_change_collector({})
+    backend.subscribe(collector)
+
+    backend.remove(app)
+    backend.wait_for_events(0)
+
+    assert collector.take() == (True, set())
+
+#---------------------------------------------------------------------------------------------------
+
+def test_the_events_of_our_own_writes_are_dropped(dt_monday, at, meetings, make_engine):
+
+    engine, memory = make_engine([])
+    backend = cb_own_writes_backend(memory)
+    engine.backend = backend
+    collector = cb_change_collector(engine.entry_days)
+    backend.subscribe(collector)
+
+    apps = meetings(0)
+    for app in apps:
+        memory.add(app)
+    memory.wait_for_events(0)
+    assert collector.take() == (False, {at(0, 0).date()})
+
+    # Blocking creates a focus block.
+    engine.block(dt_monday, 7)
+    memory.wait_for_events(0)
+    assert memory.nr_creates == 1
+    assert not collector.is_pending()
+
+    # The meetings go : that is a change, unblocking deletes the focus block.
+    for app in apps:
+        memory.remove(app)
+    memory.wait_for_events(0)
+    assert collector.take() == (True, set())
+
+    engine.block(dt_monday, 7)
+    memory.wait_for_events(0)
+    assert memory.nr_deletes == 1
+    assert not collector.is_pending()
+
+#---------------------------------------------------------------------------------------------------
+
+def test_our_removal_drops_one_removal_only(at):
+
+    backend = cb_backend_memory()
+    apps = [cb_memory_appointment(at(0, hour), 60, "going") for hour in (9, 10)]
+    backend.load(apps)
+    collector = cb_change_collector({})
+    backend.subscribe(collector)
+
+    collector.expect_removed()
+    for app in apps:
+        backend.remove(app)
+    backend.wait_for_events(0)
+
+    assert collector.take() == (True, set())
+
+#---------------------------------------------------------------------------------------------------
+
+def test_deleting_what_is_gone_drops_no_removal(at):
+
+    memory = cb_backend_memory()
+    app    = cb_memory_appointment(at(0, 9), 60, "focus")
+    other  = cb_memory_appointment(at(0, 11), 60, "meeting")
+    memory.load([app, other])
+    backend = cb_own_writes_backend(memory)
+    collector = cb_change_collector({})
+    backend.subscribe(collector)
+
+    # Somebody else removed our block already : our delete finds nothing to remove.
+    memory.remove(app)
+    memory.wait_for_events(0)
+    collector.take()
+    backend.delete(app)
+
+    memory.remove(other)
+    memory.wait_for_events(0)
+
+    assert collector.take() == (True, set())
+
+#---------------------------------------------------------------------------------------------------
+
+def test_own_writes_are_forgotten_after_own_seconds(at):
+
+    memory = cb_backend_memory()
+    backend = cb_own_writes_backend(memory)
+    collector = cb_change_collector({}, own_seconds=0)
+    backend.subscribe(collector)
+
+    backend.create(at(0, 9), 60, "focus")
+    memory.wait_for_events(0)
+
+    assert collector.take() == (False, {at(0, 0).date()})
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+#---------------------------------------------------------------------------------------------------
+
+# cb_fingerprints, skipping the days that did not change : run with pytest (fixtures in
+# conftest).
+
+import datetime
+
+import pytest
+
+from cb_fingerprints import cb_fingerprints
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.fixture
+def run(tmp_path, dt_monday, meetings, make_engine):
+
+    '''
+    run(apps=None) : (engine, backend) after a first block() of a week, the engine keeping
+    its fingerprints in tmp_path. By default on meetings on Tuesday.
+    '''
+
+    filename = str(tmp_path / "fingerprints.json")
+
+    def run(apps=None):
+        engine, backend = make_engine(meetings(1) if apps is None else apps)
+        engine.fingerprints = cb_fingerprints(filename)
+        engine.block(dt_monday, 7)
+        return engine, backend
+
+    run.filename = filename
+    return run
+
+#---------------------------------------------------------------------------------------------------
+
+def test_an_unchanged_day_is_skipped(dt_monday, run):
+
+    engine, backend = run()
+
+    nr_writes = backend.nr_writes
+    nr_reads  = backend.nr_queries
+    engine.block(dt_monday, 7)
+
+    assert engine.changed_days == set()
+    assert backend.nr_writes == nr_writes
+    assert backend.nr_queries == nr_reads + 2
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_modified_item_gets_its_day_evaluated(dt_monday, at, meetings, run, focus_blocks):
+
+    apps = meetings(1)
+    engine, backend = run(apps)
+
+    # 14 occupied slots : no longer overbooked.
+    for app in apps[:4]:
+        backend.modify(app, duration=30)
+    engine.block(dt_monday, 7)
+
+    assert engine.changed_days == {at(1, 0).date()}
+    assert focus_blocks(backend) == []
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_settings_change_gets_all_days_evaluated(dt_monday, config, run):
+
+    engine, backend = run()
+
+    slot_minutes, start_slot, end_slot, max_nr_occupied_slots, focus_string = config
+    engine.configure(slot_minutes, start_slot, end_slot, max_nr_occupied_slots + 1,
+            focus_string)
+    engine.block(dt_monday, 7)
+
+    assert len(engine.changed_days) == 7
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize("contents", ("", "{\"2030-01-0", "not json"))
+def test_a_corrupt_state_file_gets_all_days_evaluated(contents, dt_monday, run, make_engine,
+        meetings):
+
+    run()
+    with open(run.filename, "w", encoding="utf-8") as f:
+        f.write(contents)
+
+    engine, backend = make_engine(meetings(1))
+    engine.fingerprints = cb_fingerprints(run.filename)
+    engine.block(dt_monday, 7)
+
+    assert len(engine.changed_days) == 7
+
+#---------------------------------------------------------------------------------------------------
+
+def test_fingerprints_persist_across_runs(dt_monday, run):
+
+    engine, backend = run()
+
+    # The next run, with the calendar left as the first one left it.
+    engine.fingerprints = cb_fingerprints(run.filename)
+    engine.block(dt_monday, 7)
+
+    assert engine.changed_days == set()
+
+#---------------------------------------------------------------------------------------------------
+
+def test_days_before_the_first_day_are_forgotten(tmp_path):
+
+    filename = str(tmp_path / "fingerprints.json")
+    fingerprints = cb_fingerprints(filename)
+    fingerprints.set(datetime.date(2030, 1, 6), "old")
+    fingerprints.set(datetime.date(2030, 1, 7), "new")
+    fingerprints.save(datetime.date(2030, 1, 7))
+
+    fingerprints = cb_fingerprints(filename)
+
+    assert fingerprints.get(datetime.date(2030, 1, 6)) is None
+    assert fingerprints.get(datetime.date(2030, 1, 7)) == "new"
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+#---------------------------------------------------------------------------------------------------
+
+# cb_focus_index, and the engine telling its focus blocks apart by it : run with pytest
+# (fixtures in conftest).
+
+import time
+
+import pytest
+
+from cb_focus_index import cb_focus_index
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.fixture
+def filename(tmp_path):
+
+    return str(tmp_path / "focus_index.json")
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.fixture
+def indexed_engine(filename, config, make_engine):
+
+    '''
+    indexed_engine(apps) : as make_engine, the engine keeping a focus index in filename.
+    '''
+
+    def indexed_engine(apps):
+        engine, backend = make_engine(apps)
+        engine.focus_index = cb_focus_index(filename)
+        return engine, backend
+
+    return indexed_engine
+
+#---------------------------------------------------------------------------------------------------
+
+def test_the_index_survives_a_round_trip(filename, at):
+
+    index = cb_focus_index(filename)
+    index.add("E1", at(0, 17), 60)
+    index.add("E2", at(2, 12, 30), 30)
+    index.verified = 1234.5
+    index.save(at(0, 0).date())
+
+    index = cb_focus_index(filename)
+
+    assert len(index) == 2
+    assert "E1" in index and "E3" not in index
+    assert [(block.EntryID, block.Start, block.Duration) for block in index.all()] \
+            == [("E1", at(0, 17), 60), ("E2", at(2, 12, 30), 30)]
+    assert index.verified == 1234.5
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize("contents", (None, "", "[1, 2]", "{\"days\": {\"2030-01-07\": [[1]]}}",
+        "{\"days\": {}}"))
+def test_a_missing_or_corrupt_file_gives_an_empty_index(contents, filename):
+
+    if contents is not None:
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(contents)
+
+    index = cb_focus_index(filename)
+
+    assert len(index) == 0
+    assert index.all() == []
+    assert index.is_verify_due(time.time())
+
+#---------------------------------------------------------------------------------------------------
+
+def test_saving_forgets_the_days_before_the_first_day(filename, at):
+
+    index = cb_focus_index(filename)
+    index.add("E1", at(0, 17), 60)
+    index.add("E2", at(1, 17), 60)
+    index.save(at(1, 0).date())
+
+    assert "E1" not in index
+    assert [block.EntryID for block in cb_focus_index(filename).all()] == ["E2"]
+
+#---------------------------------------------------------------------------------------------------
+
+def test_adding_again_moves_a_block_and_removing_empties_its_day(filename, at):
+
+    index = cb_focus_index(filename)
+    index.add("E1", at(0, 17), 60)
+    index.add("E1", at(1, 12), 30)
+
+    assert index.get(at(0, 0).date()) == []
+    assert [(block.Start, block.Duration) for block in index.get(at(1, 0).date())] \
+            == [(at(1, 12), 30)]
+
+    index.remove("E1")
+    index.remove("E1")
+
+    assert len(index) == 0
+    assert index.per_day == {}
+
+#---------------------------------------------------------------------------------------------------
+
+def test_verifying_drops_the_blocks_gone(dt_monday, meetings, indexed_engine):
+
+    engine, backend = indexed_engine(meetings(1) + meetings(3))
+    engine.block(dt_monday, 7)
+    assert len(engine.focus_index) == 2
+
+    # The user deletes one of our blocks.
+    block = engine.focus_index.all()[0]
+    backend.remove(backend.find(block.EntryID, block.Start))
+    engine.verify_focus_index()
+
+    assert len(engine.focus_index) == 1
+    assert not engine.focus_index.is_verify_due(engine.focus_index.verified)
+
+#---------------------------------------------------------------------------------------------------
+
+def test_blocks_are_ours_after_renaming_the_focus_string(dt_monday, at, config, meetings,
+        indexed_engine, focus_blocks):
+
+    apps = meetings(1)
+    engine, backend = indexed_engine(apps)
+    engine.block(dt_monday, 7)
+    assert focus_blocks(backend) == [(at(1, 17), 60)]
+
+    # Renamed : the block made under the old name is still ours, not a meeting.
+    slot_minutes, start_slot, end_slot, max_nr_occupied_slots, focus_string = config
+    engine.configure(slot_minutes, start_slot, end_slot, max_nr_occupied_slots, "deep work")
+    nr_writes = backend.nr_writes
+    engine.block(dt_monday, 7)
+    assert backend.nr_writes == nr_writes
+
+    # No longer overbooked : the block gets removed, whatever its name.
+    backend.remove(apps[0])
+    backend.remove(apps[1])
+    engine.block(dt_monday, 7)
+
+    assert focus_blocks(backend) == []
+    assert focus_blocks(backend, "deep work") == []
+    assert len(engine.focus_index) == 0
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+#---------------------------------------------------------------------------------------------------
+
+# cb_metrics, the phase timings : run with pytest.
+
+import cb_metrics as metrics_module
+
+from cb_metrics import cb_metrics
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_clock:
+
+    '''
+    perf_counter stand-in, advanced by hand.
+    '''
+
+    def __init__(self):
+
+        self.now = 100.0
+
+    def __call__(self):
+
+        return self.now
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_nested_phase_is_not_counted_twice(monkeypatch):
+
+    clock = cb_clock()
+    monkeypatch.setattr(metrics_module.time, "perf_counter", clock)
+
+    metrics = cb_metrics()
+    metrics.begin_run("block")
+    # As the first query of a run connecting lazily.
+    with metrics.phase("query"):
+        clock.now += 1.0
+        with metrics.phase("connection"):
+            clock.now += 5.0
+        clock.now += 2.0
+    with metrics.phase("query"):
+        clock.now += 3.0
+    run = metrics.end_run()
+
+    assert run["phases"]["connection"] == {"seconds": 5.0, "count": 1}
+    assert run["phases"]["query"]      == {"seconds": 6.0, "count": 2}
+    assert run["seconds"] == sum(timing["seconds"] for timing in run["phases"].values())
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
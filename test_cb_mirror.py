@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+#---------------------------------------------------------------------------------------------------
+
+# cb_backend_mirror, in front of cb_backend_memory : run with pytest (fixtures in conftest).
+
+import pytest
+
+from cb_backend        import olMeetingReceived
+from cb_backend_memory import cb_backend_memory
+from cb_backend_memory import cb_memory_appointment
+from cb_clearing       import cb_clearing
+from cb_events         import cb_change_collector
+from cb_mirror         import cb_backend_mirror
+from cb_mirror         import cb_mirror
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.fixture
+def mirrored(tmp_path):
+
+    '''
+    mirrored(apps, changes=None, max_age_seconds=3600) : (backend, memory), backend being
+    a cb_backend_mirror (opened, closed after the test) in front of a cb_backend_memory
+    loaded with apps.
+    '''
+
+    backends = []
+
+    def mirrored(apps, changes=None, max_age_seconds=3600):
+        memory = cb_backend_memory()
+        memory.load(apps)
+        backend = cb_backend_mirror(memory, cb_mirror(str(tmp_path / "mirror.sqlite")),
+                changes, max_age_seconds)
+        backend.open()
+        backends.append(backend)
+        return backend, memory
+
+    yield mirrored
+
+    for backend in backends:
+        backend.close()
+
+#---------------------------------------------------------------------------------------------------
+
+def starts(apps):
+
+    return [app.Start for app in apps]
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_range_is_synced_once(dt_monday, at, meetings, mirrored):
+
+    backend, memory = mirrored(meetings(0) + meetings(2))
+
+    apps = backend.query_range(dt_monday, at(7, 0))
+    assert memory.nr_queries == 1
+    assert starts(apps) == starts(meetings(0) + meetings(2))
+
+    # Within it : from the mirror only.
+    assert starts(backend.query_range(at(2, 0), at(3, 0))) == starts(meetings(2))
+    assert memory.nr_queries == 1
+    assert backend.nr_refreshes == 1
+
+#---------------------------------------------------------------------------------------------------
+
+def test_only_from_the_first_stale_day_is_synced(dt_monday, at, meetings, mirrored):
+
+    backend, memory = mirrored(meetings(0) + meetings(5))
+    backend.query_range(dt_monday, at(3, 0))
+
+    apps = backend.query_range(dt_monday, at(7, 0))
+
+    assert backend.nr_refreshes == 2
+    assert starts(apps) == starts(meetings(0) + meetings(5))
+    assert starts(memory.query_range(at(3, 0), at(7, 0))) == starts(meetings(5))
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_change_makes_its_day_stale(dt_monday, at, meetings, mirrored):
+
+    changes = cb_change_collector({})
+    backend, memory = mirrored(meetings(0), changes)
+    # Subscribing anyone gets changes subscribed along.
+    backend.subscribe(cb_change_collector({}))
+    backend.query_range(dt_monday, at(7, 0))
+
+    memory.add(cb_memory_appointment(at(3, 12), 60, "lunch"))
+    memory.wait_for_events(0)
+    apps = backend.query_range(dt_monday, at(7, 0))
+
+    assert backend.nr_refreshes == 2
+    assert [app.Subject for app in apps if app.Start >= at(3, 0)] == ["lunch"]
+
+#---------------------------------------------------------------------------------------------------
+
+def test_days_are_synced_again_after_max_age(at, tmp_path):
+
+    mirror = cb_mirror(str(tmp_path / "mirror.sqlite"))
+    mirror.open()
+    try:
+        mirror.replace(at(0, 0), at(2, 0), [], 1000)
+
+        assert mirror.stale_days(at(0, 0).date(), at(3, 0).date(), 60, 1060) \
+                == [at(2, 0).date()]
+        assert mirror.stale_days(at(0, 0).date(), at(3, 0).date(), 60, 1061) \
+                == [at(0, 0).date(), at(1, 0).date(), at(2, 0).date()]
+    finally:
+        mirror.close()
+
+#---------------------------------------------------------------------------------------------------
+
+def test_the_cleared_days_are_stale(dt_monday, at, meetings, mirrored):
+
+    apps = meetings(1)
+    for app in apps:
+        app.MeetingStatus = olMeetingReceived
+    backend, memory = mirrored(apps + meetings(3))
+    backend.query_range(dt_monday, at(7, 0))
+
+    # Clearing writes via backends of its own, not via the mirror.
+    clearing = cb_clearing(lambda: memory, lambda text: None, per_second=0)
+    clearing.run(backend, at(1, 0), at(2, 0), "on holiday")
+    assert clearing.nr_declined == 9
+
+    assert starts(backend.query_range(dt_monday, at(7, 0))) == starts(meetings(3))
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+#---------------------------------------------------------------------------------------------------
+
+# cb_occupancy, the occupation of a horizon as intervals per day : run with pytest (fixtures
+# in conftest).
+
+import pytest
+
+from cb_backend_memory import cb_memory_appointment
+from cb_occupancy      import cb_occupancy
+
+#---------------------------------------------------------------------------------------------------
+
+def test_the_overbooked_days_of_a_horizon_in_one_go(dt_monday, meetings):
+
+    occupancy = cb_occupancy(dt_monday, 7)
+    occupancy.paint_all(meetings(1) + meetings(4), "focus")
+
+    assert occupancy.overbooked_days(16, 36, 14, 30) == {1, 4}
+    assert occupancy.nr_occupied_slots(1, 16, 36, 30) == 18
+    assert occupancy.nr_occupied_slots(2, 16, 36, 30) == 0
+
+#---------------------------------------------------------------------------------------------------
+
+def test_our_focus_blocks_do_not_occupy(dt_monday, at, meetings):
+
+    occupancy = cb_occupancy(dt_monday, 7)
+    occupancy.paint_all(meetings(1) + [cb_memory_appointment(at(1, 17), 60, "focus")], "focus")
+
+    assert occupancy.nr_occupied_slots(1, 16, 36, 30) == 18
+    assert occupancy.free_intervals(1, 16*30, 36*30) == [(17*60, 18*60)]
+
+#---------------------------------------------------------------------------------------------------
+
+def test_what_is_outside_the_horizon_is_left_out(dt_monday, at):
+
+    occupancy = cb_occupancy(dt_monday, 7)
+    occupancy.paint_all([cb_memory_appointment(at(-1, 9), 60, "before"),
+                         cb_memory_appointment(at(7, 9), 60, "after")], "focus")
+
+    assert occupancy.overbooked_days(0, 48, 0, 30) == set()
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize("slot_minutes, nr_slots", ((15, 4), (30, 2), (60, 1)))
+def test_a_slot_counts_when_touched_whatever_the_slot_size(slot_minutes, nr_slots, dt_monday,
+        at):
+
+    occupancy = cb_occupancy(dt_monday, 1)
+    occupancy.paint_all([cb_memory_appointment(at(0, 9, 10), 40, "meeting")], "focus")
+
+    assert occupancy.nr_occupied_slots(0, 0, 24*60 // slot_minutes, slot_minutes) == nr_slots
+
+#---------------------------------------------------------------------------------------------------
+
+def test_overlapping_appointments_count_once(dt_monday, at):
+
+    occupancy = cb_occupancy(dt_monday, 1)
+    occupancy.paint_all([cb_memory_appointment(at(0, 9), 60, "one"),
+                         cb_memory_appointment(at(0, 9, 30), 60, "two")], "focus")
+
+    assert occupancy.nr_occupied_slots(0, 0, 48, 30) == 3
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize("slot_minutes, blocks", ((15, [(9*60 + 45, 15)]), (30, []), (60, [])))
+def test_free_blocks_are_whole_slots(slot_minutes, blocks, dt_monday, at):
+
+    occupancy = cb_occupancy(dt_monday, 1)
+    occupancy.paint_all([cb_memory_appointment(at(0, 9), 40, "one"),
+                         cb_memory_appointment(at(0, 10), 60, "two")], "focus")
+
+    assert occupancy.free_blocks(0, 9*60 // slot_minutes, 11*60 // slot_minutes,
+            slot_minutes) == blocks
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+#---------------------------------------------------------------------------------------------------
+
+# cb_series, expanding recurring series locally, the DASL restrictions of cb_query and the
+# series of cb_backend_memory : run with pytest (fixtures in conftest).
+
+import datetime
+
+import pytest
+
+from cb_backend        import olBusy
+from cb_backend        import olNonMeeting
+from cb_backend        import olRecursDaily
+from cb_backend        import olRecursMonthNth
+from cb_backend        import olRecursMonthly
+from cb_backend        import olRecursWeekly
+from cb_backend        import olRecursYearly
+from cb_backend_memory import cb_backend_memory
+from cb_backend_memory import cb_memory_appointment
+from cb_query          import compile_restriction
+from cb_query          import dasl_time
+from cb_recurrence     import cb_series
+
+#---------------------------------------------------------------------------------------------------
+
+# Bits of an Outlook DayOfWeekMask.
+olSunday   = 1
+olMonday   = 2
+olFriday   = 32
+olSaturday = 64
+
+def make_series(recurrence_type, pattern_start, interval=1, day_of_week_mask=0,
+        day_of_month=0, instance=0, month_of_year=0, pattern_end=None, hour=9, duration=60,
+        exceptions=None, subject="series", entry_id="S1"):
+
+    return cb_series(entry_id, datetime.datetime(2029, 12, 1), subject, olNonMeeting, olBusy,
+            recurrence_type, interval, day_of_week_mask, day_of_month, instance, month_of_year,
+            pattern_start, pattern_end, datetime.time(hour), duration, exceptions or {})
+
+def dates(series, nr):
+
+    return [d for d, _ in zip(series.candidate_dates(), range(nr))]
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_weekly_interval_counts_weeks_starting_on_sunday(dt_monday):
+
+    # Every other week on Sunday, Monday and Saturday, as of Monday 2030-01-07 : its week
+    # started on Sunday 2030-01-06 (not taken, before the start).
+    series = make_series(olRecursWeekly, dt_monday.date(), interval=2,
+            day_of_week_mask=olSunday | olMonday | olSaturday)
+
+    assert dates(series, 6) == [datetime.date(2030, 1, 7), datetime.date(2030, 1, 12),
+                                datetime.date(2030, 1, 20), datetime.date(2030, 1, 21),
+                                datetime.date(2030, 1, 26), datetime.date(2030, 2, 3)]
+
+#---------------------------------------------------------------------------------------------------
+
+def test_the_fifth_instance_is_the_last_of_the_month():
+
+    series = make_series(olRecursMonthNth, datetime.date(2030, 1, 1), day_of_week_mask=olFriday,
+            instance=5)
+
+    assert dates(series, 3) == [datetime.date(2030, 1, 25), datetime.date(2030, 2, 22),
+                                datetime.date(2030, 3, 29)]
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize("interval", (1, 12))
+def test_a_yearly_interval_is_in_years_or_in_months(interval):
+
+    series = make_series(olRecursYearly, datetime.date(2030, 1, 1), interval=interval,
+            day_of_month=15, month_of_year=3)
+
+    assert dates(series, 3) == [datetime.date(year, 3, 15) for year in (2030, 2031, 2032)]
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_day_of_month_past_the_end_of_a_month_is_its_last_day():
+
+    series = make_series(olRecursMonthly, datetime.date(2030, 1, 1), day_of_month=31)
+
+    assert dates(series, 4) == [datetime.date(2030, 1, 31), datetime.date(2030, 2, 28),
+                                datetime.date(2030, 3, 31), datetime.date(2030, 4, 30)]
+
+#---------------------------------------------------------------------------------------------------
+
+def test_exceptions_move_and_delete_occurrences(dt_monday, at):
+
+    # Daily for a week : Tuesday deleted, Wednesday moved to Saturday afternoon.
+    series = make_series(olRecursDaily, dt_monday.date(), pattern_end=at(6, 0).date(),
+            exceptions={at(1, 0).date(): None,
+                        at(2, 0).date(): (at(5, 14), at(5, 15), "moved")})
+
+    occurrences = series.occurrences(dt_monday, at(7, 0))
+
+    assert [(occurrence.Start, occurrence.Subject) for occurrence in occurrences] \
+            == [(at(0, 9), "series"), (at(3, 9), "series"), (at(4, 9), "series"),
+                (at(5, 9), "series"), (at(5, 14), "moved"), (at(6, 9), "series")]
+    assert all(occurrence.IsRecurring and occurrence.EntryID == "S1"
+            for occurrence in occurrences)
+
+#---------------------------------------------------------------------------------------------------
+
+def test_the_horizon_grows_by_doubling(dt_monday, at):
+
+    series = make_series(olRecursDaily, dt_monday.date())
+
+    series.occurrences(dt_monday, at(10, 0))
+    assert series.horizon == at(10, 0)
+
+    # Asking a day more expands twice as far, so the next days need no expansion.
+    occurrences = series.occurrences(at(10, 0), at(11, 0))
+    assert series.horizon == at(20, 0)
+    assert [occurrence.Start for occurrence in occurrences] == [at(10, 9)]
+
+    series.occurrences(at(11, 0), at(19, 0))
+    assert series.horizon == at(20, 0)
+
+#---------------------------------------------------------------------------------------------------
+
+def test_what_ends_at_the_end_of_a_range_is_left_out(dt_monday, at):
+
+    series = make_series(olRecursDaily, dt_monday.date())
+
+    assert [occurrence.Start for occurrence in series.occurrences(dt_monday, at(2, 10))] \
+            == [at(0, 9), at(1, 9)]
+    assert [occurrence.Start for occurrence in series.occurrences(dt_monday, at(2, 10, 1))] \
+            == [at(0, 9), at(1, 9), at(2, 9)]
+
+#---------------------------------------------------------------------------------------------------
+
+def test_restrictions_are_compiled_to_dasl_once(dt_monday, at):
+
+    compile_restriction.cache_clear()
+
+    restriction = compile_restriction(dt_monday, at(7, 0), None, "it's focus", False)
+
+    assert restriction == "@SQL=" \
+            f"\"urn:schemas:calendar:dtstart\" >= {dasl_time(dt_monday)} AND " \
+            f"\"urn:schemas:calendar:dtend\" < {dasl_time(at(7, 0))} AND " \
+            "\"urn:schemas:httpmail:subject\" <> 'it''s focus' AND " \
+            "\"http://schemas.microsoft.com/mapi/id/" \
+            "{00062002-0000-0000-C000-000000000046}/8223000B\" = 0"
+    assert compile_restriction(None, None, "focus", None, True).startswith(
+            "@SQL=\"urn:schemas:httpmail:subject\" = 'focus' AND ")
+
+    assert compile_restriction(dt_monday, at(7, 0), None, "it's focus", False) is restriction
+    assert compile_restriction.cache_info().hits == 1
+
+#---------------------------------------------------------------------------------------------------
+
+def test_dasl_times_are_in_utc():
+
+    dt = datetime.datetime(2030, 1, 7, 9, 30,
+            tzinfo=datetime.timezone(datetime.timedelta(hours=2)))
+
+    assert dasl_time(dt) == "'2030-01-07 07:30'"
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize("projected", (False, True))
+def test_the_series_of_the_stand_in_block_as_single_appointments(projected, dt_monday, at,
+        meetings, make_engine, focus_blocks):
+
+    # Meetings from 8:00 to 17:00 on weekdays, as series of one hour each, and as singles.
+    # Tuesday 8:00 is deleted, Wednesday 16:00 moved to 17:00.
+    exceptions = {8  : {at(1, 0).date(): None},
+                  16 : {at(2, 0).date(): (at(2, 17), at(2, 18), "meeting")}}
+    series = [make_series(olRecursDaily, dt_monday.date(), pattern_end=at(4, 0).date(),
+            hour=hour, subject="meeting", entry_id=f"S{hour}",
+            exceptions=exceptions.get(hour)) for hour in range(8, 17)]
+    apps = [app for i_day in range(5) for app in meetings(i_day)
+            if (i_day, app.Start.hour) not in ((1, 8), (2, 16))]
+    apps.append(cb_memory_appointment(at(2, 17), 60, "meeting"))
+
+    blocks = []
+    engine, backend = make_engine([], projected)
+    backend.load_series(series)
+    engine.block(dt_monday, 7)
+    blocks.append(focus_blocks(backend))
+    engine, backend = make_engine(apps, projected)
+    engine.block(dt_monday, 7)
+    blocks.append(focus_blocks(backend))
+
+    assert blocks[0] == blocks[1]
+    assert (at(0, 17), 60) in blocks[0]
+
+#---------------------------------------------------------------------------------------------------
+
+def test_deleting_an_occurrence_makes_it_an_exception(dt_monday, at):
+
+    backend = cb_backend_memory()
+    backend.load_series([make_series(olRecursDaily, dt_monday.date())])
+    occurrence = backend.query_range(at(1, 0), at(2, 0))[0]
+
+    backend.delete(occurrence)
+
+    assert backend.find("S1", at(1, 9)) is None
+    assert [app.Start for app in backend.query_range(dt_monday, at(3, 0))] \
+            == [at(0, 9), at(2, 9)]
+    assert backend.series["S1"].exceptions == {at(1, 0).date(): None}
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+#---------------------------------------------------------------------------------------------------
+
+# cb_refresh_scheduler, driven by a cb_virtual_clock : run with pytest.
+
+import datetime
+import random
+import time
+
+import pytest
+
+from cb_scheduler import cb_refresh_scheduler
+from cb_scheduler import cb_virtual_clock
+from cb_scheduler import max_factor
+from cb_scheduler import min_factor
+
+#---------------------------------------------------------------------------------------------------
+
+base_seconds = 15*60
+jitter       = 0.1
+
+# A Monday morning, local time (as the scheduler tells days).
+t_start = time.mktime(datetime.datetime(2030, 1, 7, 8, 0).timetuple())
+today   = datetime.date(2030, 1, 7)
+
+#---------------------------------------------------------------------------------------------------
+
+class cb_fixed_rng:
+
+    '''
+    Stand-in for random.Random : uniform() always at the low (-1), middle (0) or high (1)
+    end of its range.
+    '''
+
+    def __init__(self, at):
+
+        self.at = at
+
+    def uniform(self, a, b):
+
+        return (a + b) / 2 + self.at * (b - a) / 2
+
+#---------------------------------------------------------------------------------------------------
+
+def make_scheduler(rng=None):
+
+    clock = cb_virtual_clock(t_start)
+    scheduler = cb_refresh_scheduler(base_seconds, jitter=jitter, clock=clock,
+            rng=rng if rng is not None else random.Random(0))
+
+    return scheduler, clock
+
+def day(i):
+
+    return today + datetime.timedelta(days=i)
+
+def all_due(scheduler, clock, nr_days):
+
+    '''
+    Plans nr_days and moves the clock until all of them are due, as after a start.
+    '''
+
+    scheduler.plan(nr_days)
+    clock.advance(jitter * (1 + jitter) * base_seconds * 48)
+    return scheduler.due()
+
+#---------------------------------------------------------------------------------------------------
+
+def test_new_days_are_due_right_away():
+
+    scheduler, clock = make_scheduler()
+
+    scheduler.plan(30)
+    assert scheduler.due() == []
+
+    clock.advance(jitter * (1 + jitter) * base_seconds * 48)
+    assert scheduler.due() == [day(i) for i in range(30)]
+
+#---------------------------------------------------------------------------------------------------
+
+def test_tiers():
+
+    scheduler, clock = make_scheduler()
+    all_due(scheduler, clock, 30)
+
+    intervals = scheduler.intervals()
+    for i in range(30):
+        factor = 1 if i < 2 else 4 if i < 7 else 16 if i < 21 else 48
+        assert intervals[day(i)] == base_seconds * factor, i
+
+#---------------------------------------------------------------------------------------------------
+
+def test_near_days_come_back_first():
+
+    scheduler, clock = make_scheduler()
+    all_due(scheduler, clock, 30)
+
+    clock.advance((1 + jitter) * base_seconds)
+    assert scheduler.due() == [day(0), day(1)]
+
+    clock.advance((1 + jitter) * base_seconds * 4)
+    assert scheduler.due() == [day(i) for i in range(7)]
+
+#---------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize("at", (-1, 0, 1))
+def test_jitter_at_its_bounds(at):
+
+    scheduler, clock = make_scheduler(cb_fixed_rng(at))
+    assert all_due(scheduler, clock, 1) == [day(0)]
+
+    assert scheduler.seconds_until_next() == pytest.approx(base_seconds * (1 + at * jitter))
+
+#---------------------------------------------------------------------------------------------------
+
+def test_jitter_stays_within_bounds():
+
+    scheduler, clock = make_scheduler(random.Random(1))
+    all_due(scheduler, clock, 60)
+
+    now = clock()
+    for (due, interval) in scheduler.days.values():
+        assert interval * (1 - jitter) <= due - now <= interval * (1 + jitter)
+
+#---------------------------------------------------------------------------------------------------
+
+def test_changed_days_come_more_often_within_the_tier():
+
+    scheduler, clock = make_scheduler(cb_fixed_rng(0))
+    all_due(scheduler, clock, 1)
+
+    scheduler.done([day(0)], {day(0)})
+    assert scheduler.intervals()[day(0)] == base_seconds * min_factor
+    scheduler.done([day(0)], {day(0)})
+    assert scheduler.intervals()[day(0)] == base_seconds * min_factor
+    assert scheduler.seconds_until_next() == pytest.approx(base_seconds * min_factor)
+
+#---------------------------------------------------------------------------------------------------
+
+def test_unchanged_days_come_less_often_within_the_tier():
+
+    scheduler, clock = make_scheduler(cb_fixed_rng(0))
+    all_due(scheduler, clock, 1)
+
+    scheduler.done([day(0)], set())
+    assert scheduler.intervals()[day(0)] == base_seconds * 1.5
+    for _ in range(10):
+        scheduler.done([day(0)], set())
+    assert scheduler.intervals()[day(0)] == base_seconds * max_factor
+
+#---------------------------------------------------------------------------------------------------
+
+def test_plan_drops_past_days_and_adds_new_ones():
+
+    scheduler, clock = make_scheduler()
+    all_due(scheduler, clock, 3)
+
+    clock.advance(24*60*60)
+    scheduler.plan(3)
+
+    assert list(scheduler.intervals()) == [day(1), day(2), day(3)]
+    clock.advance(jitter * (1 + jitter) * base_seconds * 4)
+    assert day(3) in scheduler.due()
+
+#---------------------------------------------------------------------------------------------------
+
+def test_done_ignores_days_not_planned():
+
+    scheduler, clock = make_scheduler()
+    all_due(scheduler, clock, 3)
+
+    scheduler.done([day(10)], {day(10)})
+    assert day(10) not in scheduler.intervals()
+
+#---------------------------------------------------------------------------------------------------
+
+def test_nothing_planned():
+
+    scheduler, clock = make_scheduler()
+
+    assert scheduler.seconds_until_next() is None
+    assert scheduler.due() == []
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+#---------------------------------------------------------------------------------------------------
+
+# The column-projected reads (cb_table), against the stand-in Table of cb_backend_memory :
+# run with pytest (fixtures in conftest).
+
+import datetime
+
+from cb_backend_memory import cb_backend_memory
+from cb_backend_memory import cb_memory_appointment
+from cb_synthetic      import synthetic_calendar
+from cb_table          import cb_memory_table
+from cb_table          import cb_row
+from cb_table          import project
+from cb_table          import read_rows
+
+#---------------------------------------------------------------------------------------------------
+
+def as_tuples(apps):
+
+    return [(app.EntryID, app.Start, app.End, app.Duration, app.Subject, app.BusyStatus,
+             app.MeetingStatus) for app in apps]
+
+#---------------------------------------------------------------------------------------------------
+
+def test_projected_reads_give_the_same_appointments(dt_monday):
+
+    dt_end = dt_monday + datetime.timedelta(days=28)
+    apps = {}
+    for projected in (False, True):
+        backend = cb_backend_memory(projected)
+        backend.load(synthetic_calendar(dt_monday, 28))
+        apps[projected] = backend.query_range(dt_monday, dt_end, not_subject="focus")
+
+    assert apps[True]
+    assert as_tuples(apps[True]) == as_tuples(apps[False])
+    assert all(type(app) is cb_row for app in apps[True])
+
+#---------------------------------------------------------------------------------------------------
+
+def test_rows_are_slotted_records(dt_monday):
+
+    row = cb_row("E1", dt_monday, dt_monday + datetime.timedelta(minutes=90), "one", 2, 0,
+            dt_monday)
+
+    assert row.Duration == 90
+    assert not row.IsRecurring
+    assert not hasattr(row, "__dict__")
+
+#---------------------------------------------------------------------------------------------------
+
+def test_rows_are_read_in_batches_of_the_projected_columns(dt_monday):
+
+    apps = [cb_memory_appointment(dt_monday + datetime.timedelta(hours=hour), 30, f"m{hour}")
+            for hour in range(7)]
+    table = cb_memory_table(apps)
+    project(table, ("Subject", "Duration"))
+
+    rows = read_rows(table, batch_size=3)
+
+    assert rows == [(f"m{hour}", 30) for hour in range(7)]
+    assert table.nr_reads == 3
+
+#---------------------------------------------------------------------------------------------------
+
+def test_writes_find_the_item_of_a_row(dt_monday, meetings, make_engine):
+
+    apps = meetings(0)
+    engine, backend = make_engine(apps, projected=True)
+
+    engine.block(dt_monday, 1)
+    assert backend.nr_creates == 1
+
+    # Not overbooked any more : the focus block, read back as a cb_row, gets deleted.
+    for app in apps[:2]:
+        backend.remove(app)
+    engine.block(dt_monday, 1)
+
+    assert backend.nr_deletes == 1
+    assert [app.Subject for app in backend.appointments] == ["meeting"] * 7
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
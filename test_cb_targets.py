@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+#---------------------------------------------------------------------------------------------------
+
+# cb_targets, blocking the other calendars : run with pytest (fixtures in conftest).
+
+import threading
+
+import pytest
+
+from cb_targets import cb_target
+from cb_targets import cb_target_pool
+
+#---------------------------------------------------------------------------------------------------
+
+def no_log(text):
+
+    pass
+
+#---------------------------------------------------------------------------------------------------
+
+def test_each_target_is_blocked_on_an_engine_of_its_own(dt_monday, config, meetings,
+        make_engine, focus_blocks):
+
+    backends = {}
+
+    def make_target_engine(target, log):
+        engine, backends[target.name] = make_engine(meetings(0) + meetings(1))
+        return engine
+
+    targets = [cb_target(name, f"{name}@example.com", config, 2) for name in ("alice", "bob")]
+    pool = cb_target_pool(make_target_engine)
+    try:
+        results = pool.run(targets, dt_monday, no_log)
+    finally:
+        pool.shutdown()
+
+    assert sorted(result.name for result in results if result.ok) == ["alice", "bob"]
+    for backend in backends.values():
+        assert len(focus_blocks(backend)) == 2
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_failing_target_does_not_stop_the_others(dt_monday, config, make_engine):
+
+    def make_target_engine(target, log):
+        if target.name == "alice":
+            raise ValueError("cannot resolve mailbox")
+        return make_engine([])[0]
+
+    targets = [cb_target(name, f"{name}@example.com", config, 1) for name in ("alice", "bob")]
+    pool = cb_target_pool(make_target_engine)
+    try:
+        results = {result.name: result for result in pool.run(targets, dt_monday, no_log)}
+    finally:
+        pool.shutdown()
+
+    assert not results["alice"].ok and "cannot resolve mailbox" in results["alice"].error
+    assert results["bob"].ok
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_slow_target_is_skipped_until_it_is_done(dt_monday, config, make_engine):
+
+    release = threading.Event()
+
+    def make_target_engine(target, log):
+        release.wait(5)
+        return make_engine([])[0]
+
+    target = cb_target("alice", "alice@example.com", config, 1)
+    pool = cb_target_pool(make_target_engine, timeout_seconds=0.05)
+    try:
+        first = pool.start([target], dt_monday, no_log)
+        assert "timed out" in pool.wait(first)[0].error
+
+        second = pool.run([target], dt_monday, no_log)
+        assert "still running from before" in second[0].error
+
+        release.set()
+        [result] = pool.wait(first)
+        assert result.ok
+        assert pool.run([target], dt_monday, no_log)[0].ok
+    finally:
+        release.set()
+        pool.shutdown()
+
+#---------------------------------------------------------------------------------------------------
+
+def test_targets_without_mailbox_are_skipped(tmp_path):
+
+    pytest.importorskip("PySide2")
+
+    from PySide2.QtCore import QSettings
+
+    from cb_common import read_targets
+
+    usersettings = QSettings(str(tmp_path / "cb_outlook.ini"), QSettings.IniFormat)
+    usersettings.setValue("free_slots", 4)
+    usersettings.beginWriteArray("targets")
+    for i, (name, mailbox) in enumerate((("alice", "alice@example.com"), ("own", ""),
+            ("bob", "bob@example.com"))):
+        usersettings.setArrayIndex(i)
+        usersettings.setValue("name", name)
+        usersettings.setValue("mailbox", mailbox)
+        if name == "bob":
+            usersettings.setValue("free_slots", 2)
+    usersettings.endArray()
+
+    targets = read_targets(usersettings)
+
+    assert [(target.name, target.mailbox) for target in targets] \
+            == [("alice", "alice@example.com"), ("bob", "bob@example.com")]
+    # What a target does not have is taken from our own settings.
+    assert targets[0].config[3] - targets[1].config[3] == 2
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
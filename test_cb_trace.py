@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+$BeginLicense$
+
+(C) 2022 by Camiel Bouchier (camiel@bouchier.be)
+
+This file is part of cb_outlook.
+All rights reserved.
+You are granted a non-exclusive and non-transferable license to use this
+software for personal or internal business purposes.
+
+THIS SOFTWARE IS PROVIDED "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL Camiel Bouchier BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+$EndLicense$
+
+"""
+#---------------------------------------------------------------------------------------------------
+
+#---------------------------------------------------------------------------------------------------
+
+# cb_trace, the spans and their export : run with pytest.
+
+import json
+
+import pytest
+
+from cb_trace import cb_tracer
+from cb_trace import traced
+from cb_trace import traced_slot
+from cb_trace import tracer
+
+#---------------------------------------------------------------------------------------------------
+
+@traced
+def add(a, b=0):
+
+    return a + b
+
+@traced_slot
+def on_clicked(self):
+
+    return self
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_traced_function_gets_all_its_arguments():
+
+    assert add(1, 2) == 3
+    with pytest.raises(TypeError):
+        add(1, 2, 3)
+
+#---------------------------------------------------------------------------------------------------
+
+def test_a_traced_slot_drops_the_arguments_it_does_not_take():
+
+    # As clicked(checked) would call it.
+    assert on_clicked("window", False) == "window"
+
+#---------------------------------------------------------------------------------------------------
+
+def test_spans_are_only_recorded_when_enabled(monkeypatch):
+
+    monkeypatch.setattr(tracer, "events", type(tracer.events)(maxlen=10))
+
+    add(1)
+    assert len(tracer.events) == 0
+
+    tracer.enable()
+    try:
+        add(1)
+        with tracer.span("block", nr=3):
+            pass
+    finally:
+        tracer.enable(False)
+
+    assert [(event["name"], event.get("args")) for event in tracer.events] \
+            == [("add", None), ("block", {"nr": "3"})]
+
+#---------------------------------------------------------------------------------------------------
+
+def test_the_export_is_chrome_trace_json(tmp_path):
+
+    own_tracer = cb_tracer(max_events=2)
+    own_tracer.enable()
+    for name in ("one", "two", "three"):
+        with own_tracer.span(name):
+            pass
+
+    filename = str(tmp_path / "trace.json")
+    own_tracer.export(filename)
+    with open(filename, "r", encoding="utf-8") as f:
+        trace = json.load(f)
+
+    assert [event["name"] for event in trace["traceEvents"] if event["ph"] == "X"] \
+            == ["two", "three"]
+    assert any(event["ph"] == "M" for event in trace["traceEvents"])
+
+#---------------------------------------------------------------------------------------------------
+
+# vim: syntax=python ts=4 sw=4 sts=4 sr et columns=100 lines=45
@@ -104,10 +104,26 @@ class Ui_cb_mainwindow(object):
 
         self.gridLayout.addWidget(self.label_6, 5, 1, 1, 1)
 
+        self.combo_box_slot_minutes = QComboBox(self.tab)
+        self.combo_box_slot_minutes.addItem("")
+        self.combo_box_slot_minutes.addItem("")
+        self.combo_box_slot_minutes.addItem("")
+        self.combo_box_slot_minutes.addItem("")
+        self.combo_box_slot_minutes.addItem("")
+        self.combo_box_slot_minutes.addItem("")
+        self.combo_box_slot_minutes.setObjectName(u"combo_box_slot_minutes")
+
+        self.gridLayout.addWidget(self.combo_box_slot_minutes, 6, 0, 1, 1)
+
+        self.label_10 = QLabel(self.tab)
+        self.label_10.setObjectName(u"label_10")
+
+        self.gridLayout.addWidget(self.label_10, 6, 1, 1, 1)
+
         self.pushbutton_block_now = QPushButton(self.tab)
         self.pushbutton_block_now.setObjectName(u"pushbutton_block_now")
 
-        self.gridLayout.addWidget(self.pushbutton_block_now, 6, 0, 1, 1)
+        self.gridLayout.addWidget(self.pushbutton_block_now, 7, 0, 1, 1)
 
 
         self.horizontalLayout.addLayout(self.gridLayout)
@@ -185,6 +201,12 @@ class Ui_cb_mainwindow(object):
 
         self.verticalLayout_3.addWidget(self.tabWidget)
 
+        self.line_edit_log_filter = QLineEdit(self.centralwidget)
+        self.line_edit_log_filter.setObjectName(u"line_edit_log_filter")
+        self.line_edit_log_filter.setClearButtonEnabled(True)
+
+        self.verticalLayout_3.addWidget(self.line_edit_log_filter)
+
         self.textedit_log = QPlainTextEdit(self.centralwidget)
         self.textedit_log.setObjectName(u"textedit_log")
         sizePolicy1 = QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
@@ -231,12 +253,20 @@ class Ui_cb_mainwindow(object):
         self.action_quit.setText(QCoreApplication.translate("cb_mainwindow", u"Quit", None))
         self.label.setText(QCoreApplication.translate("cb_mainwindow", u"Start of day", None))
         self.label_2.setText(QCoreApplication.translate("cb_mainwindow", u"End of day", None))
-        self.label_3.setText(QCoreApplication.translate("cb_mainwindow", u"Requested free slots of 30'", None))
+        self.label_3.setText(QCoreApplication.translate("cb_mainwindow", u"Requested free slots", None))
         self.label_4.setText(QCoreApplication.translate("cb_mainwindow", u"Nr of days lookahead", None))
         self.line_edit_focus_string.setPlaceholderText(QCoreApplication.translate("cb_mainwindow", u"cb: focus time", None))
         self.label_5.setText(QCoreApplication.translate("cb_mainwindow", u"Focus string", None))
         self.checkbox_each_hour.setText("")
         self.label_6.setText(QCoreApplication.translate("cb_mainwindow", u"Run each hour", None))
+        self.combo_box_slot_minutes.setItemText(0, QCoreApplication.translate("cb_mainwindow", u"5", None))
+        self.combo_box_slot_minutes.setItemText(1, QCoreApplication.translate("cb_mainwindow", u"10", None))
+        self.combo_box_slot_minutes.setItemText(2, QCoreApplication.translate("cb_mainwindow", u"15", None))
+        self.combo_box_slot_minutes.setItemText(3, QCoreApplication.translate("cb_mainwindow", u"20", None))
+        self.combo_box_slot_minutes.setItemText(4, QCoreApplication.translate("cb_mainwindow", u"30", None))
+        self.combo_box_slot_minutes.setItemText(5, QCoreApplication.translate("cb_mainwindow", u"60", None))
+
+        self.label_10.setText(QCoreApplication.translate("cb_mainwindow", u"Slot size (minutes)", None))
         self.pushbutton_block_now.setText(QCoreApplication.translate("cb_mainwindow", u"Run now", None))
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.tab), QCoreApplication.translate("cb_mainwindow", u"Block calendar", None))
         self.label_7.setText(QCoreApplication.translate("cb_mainwindow", u"Start date", None))
@@ -244,6 +274,7 @@ class Ui_cb_mainwindow(object):
         self.label_9.setText(QCoreApplication.translate("cb_mainwindow", u"Message", None))
         self.pushbutton_empty_now.setText(QCoreApplication.translate("cb_mainwindow", u"Empty now", None))
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.tab_2), QCoreApplication.translate("cb_mainwindow", u"Empty calendar", None))
+        self.line_edit_log_filter.setPlaceholderText(QCoreApplication.translate("cb_mainwindow", u"Filter log", None))
         self.menuFile.setTitle(QCoreApplication.translate("cb_mainwindow", u"File", None))
         self.menuHelp.setTitle(QCoreApplication.translate("cb_mainwindow", u"Help", None))
     # retranslateUi